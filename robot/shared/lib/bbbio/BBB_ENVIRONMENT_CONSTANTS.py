@@ -0,0 +1,43 @@
+# Names of the environment variables that configure bbb_io_manager, which are
+# set by the user or by the test manager before running the tests
+
+# When this environment variable is set (e.g. by the PersistentRunner), the
+# connection to the BBB is kept open between suite executions in the same
+# process and is only closed when the process exits
+PERSISTENT_CONNECTION_ENV_VAR = "ACE_PERSISTENT_BBB_CONNECTION"
+
+# When these environment variables are set (e.g. by the TestManager when
+# running a pool of test stations), they override the IP address and port
+# number of the BBB defined in the ace_bbsm module
+BBB_IP_ADDRESS_ENV_VAR = "ACE_BBB_IP_ADDRESS"
+BBB_PORT_ENV_VAR = "ACE_BBB_PORT"
+
+# When this environment variable is set, the BBB simulator (see
+# bbb_simulator.py) is used instead of a real BBB. The simulator must already
+# be running
+BBB_SIMULATOR_ENV_VAR = "ACE_BBB_SIMULATOR"
+
+# When this environment variable is set to the address of a BBB broker (see
+# bbb_broker.py) as 'host:port', the tests attach to the warm BBB connection
+# held by the broker instead of connecting to the BBB themselves. The broker
+# must already be running
+BBB_BROKER_ENV_VAR = "ACE_BBB_BROKER"
+
+# When this environment variable is set, the duration of each stage of the
+# requests sent to the BBB and their sizes are recorded (see
+# bbb_io_instrumentation.py). Use 'log_bbb_request_timings' (e.g. in the suite
+# teardown) to add a summary to the log and the suite metadata
+INSTRUMENTATION_ENV_VAR = "ACE_BBB_INSTRUMENTATION"
+# If set, the request timings are also enabled, and the stage durations of
+# every request are appended to this file as JSON lines, e.g. for Benchmark.py
+INSTRUMENTATION_FILE_ENV_VAR = "ACE_BBB_INSTRUMENTATION_FILE"
+
+# When this environment variable is set to "compact", the compact wire format
+# (see bbb_wire_format.py) is used instead of JSON, if both the client and the
+# BBB support it
+WIRE_FORMAT_ENV_VAR = "ACE_BBB_WIRE_FORMAT"
+
+# When this environment variable is set, the redundant output specifications
+# of every request (see bbb_io_optimizer.py) are removed after the request has
+# been validated
+OPTIMIZE_ENV_VAR = "ACE_BBB_OPTIMIZE"
@@ -0,0 +1,128 @@
+"""
+A local broker process that holds a warm connection to a BBB, so that
+successive robot runs (e.g. in repeat mode) attach to it over a local socket
+instead of connecting to the BBB themselves, and a network blip is ridden out
+by the broker (see bbb_connection.py) rather than failing the run.
+
+The broker serves the same protocol as the BBB simulator (see
+bbb_simulator.py), including the compact wire format, and forwards the IO
+specifications of every request to the BBB as JSON, one request at a time.
+
+Run this file to start a broker for the BBB at the ace_bbsm default address,
+or at --bbb-ip-address/--bbb-port, e.g.:
+
+    python bbb_broker.py --port 8100 --bbb-ip-address 192.168.7.2 --bbb-port 8000
+
+then run the tests with the ACE_BBB_BROKER environment variable set to the
+address of the broker, e.g. 127.0.0.1:8100.
+"""
+import argparse
+import json
+import threading
+
+from ace_bbsm import Client
+
+import bbb_simulator
+from bbb_connection import BBBConnectionManager
+
+DEFAULT_BROKER_PORT = 8100
+
+
+class BBBBrokerServer(bbb_simulator.BBBSimulatorServer):
+    """
+    A BBBSimulatorServer that forwards the IO specifications to a BBB instead
+    of applying them to a device model
+    """
+
+    def __init__(self, connection_manager, host=bbb_simulator.DEFAULT_HOST,
+                 port=DEFAULT_BROKER_PORT):
+        """
+        :param connection_manager: The connected BBBConnectionManager of the
+            BBB
+        :param host: The address to listen on
+        :param port: The port to listen on, or 0 for any free port
+        """
+        super().__init__(None, host, port)
+        self.connection_manager = connection_manager
+        self.__bbb_lock = threading.Lock()
+
+    def run_io_specifications(self, io_specifications):
+        """
+        :param io_specifications: The list of IO specification dicts of a
+            single request
+        :return: The list of input data dicts returned by the BBB, or a dict
+            with the ERROR_KEY
+        """
+        with self.__bbb_lock:
+            self.request_count += 1
+            try:
+                return json.loads(
+                    self.connection_manager.json_request_response_bbb(
+                        json.dumps(io_specifications)))
+            except (OSError, ValueError) as e:
+                return {bbb_simulator.ERROR_KEY:
+                        "The broker could not reach the BBB: {}".format(e)}
+            finally:
+                for message, level in self.connection_manager.pop_messages():
+                    print("{}: {}".format(level, message), flush=True)
+
+
+class BBBBrokerClient(bbb_simulator.BBBSimulatorClient):
+    """
+    Sends IO specifications to a BBBBrokerServer, which serves the same
+    protocol as the BBB simulator
+    """
+
+    def connect_to_bbb(self, ip_address=bbb_simulator.DEFAULT_HOST,
+                       port=DEFAULT_BROKER_PORT):
+        super().connect_to_bbb(ip_address, port)
+
+
+def parse_broker_address(broker_address):
+    """
+    :param broker_address: The address of the broker, as 'host:port' or
+        just 'port'
+    :return: A tuple of the host and port number of the broker
+    """
+    host, _, port = broker_address.rpartition(":")
+    return host or bbb_simulator.DEFAULT_HOST, int(port)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Holds a connection to a BBB that successive robot runs "
+                    "attach to")
+    parser.add_argument("--host", default=bbb_simulator.DEFAULT_HOST,
+                        help="The address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_BROKER_PORT,
+                        help="The port to listen on (0 for any free port)")
+    parser.add_argument("--bbb-ip-address",
+                        help="The IP address of the BBB, if not the ace_bbsm "
+                             "default")
+    parser.add_argument("--bbb-port", type=int,
+                        help="The port number of the BBB, if not the ace_bbsm "
+                             "default")
+    parser.add_argument("--simulator", action="store_true",
+                        help="Connect to a BBB simulator instead of a BBB")
+    args = parser.parse_args()
+    if bool(args.bbb_ip_address) != bool(args.bbb_port):
+        parser.error("--bbb-ip-address and --bbb-port must be given together")
+
+    upstream_client = bbb_simulator.BBBSimulatorClient() if args.simulator \
+        else Client()
+    bbb_connection_manager = BBBConnectionManager(upstream_client)
+    if args.bbb_ip_address:
+        bbb_connection_manager.connect_to_bbb(args.bbb_ip_address,
+                                              args.bbb_port)
+    else:
+        bbb_connection_manager.connect_to_bbb()
+    server = BBBBrokerServer(bbb_connection_manager, args.host, args.port)
+    print("Brokering the BBB on {}:{}".format(server.host, server.port),
+          flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        bbb_connection_manager.disconnect_from_bbb()
@@ -0,0 +1,181 @@
+"""
+Keeps the connection to the BBB alive over long runs. The
+BBBConnectionManager wraps a client (e.g. the ace_bbsm Client) and, when a
+request fails because the connection has dropped, reconnects with an
+exponential backoff and sends the request again.
+
+Sending a request again is safe because the BBB sets all of its IOs to
+inputs at the start of every request, so a request never depends on a
+previous (possibly half run) one.
+
+The requests are sent from a worker thread (see bbb_queued_client.py), and
+robot drops the messages logged from any thread other than its own, so the
+connection messages are kept until the caller logs them (see 'pop_messages').
+"""
+import collections
+import time
+
+# The delay before the first reconnect attempt, doubled after every failed
+# attempt up to RECONNECT_MAX_DELAY
+RECONNECT_INITIAL_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30.0
+# How long to keep trying to reconnect before giving up, e.g. long enough to
+# ride out a network blip or a BBB reboot during an overnight run
+RECONNECT_TIMEOUT = 300.0
+
+# An empty request, which the BBB answers with an empty list
+HEALTH_CHECK_REQUEST = "[]"
+
+
+class BBBConnectionManager:
+    """
+    Has the same methods as the ace_bbsm Client (and the methods used for the
+    compact wire format), so it can be used wherever a client is expected
+    """
+
+    def __init__(self, client, reconnect_timeout=RECONNECT_TIMEOUT,
+                 initial_delay=RECONNECT_INITIAL_DELAY,
+                 max_delay=RECONNECT_MAX_DELAY):
+        """
+        :param client: The client used to communicate with the BBB
+        :param reconnect_timeout: How long to keep trying to reconnect, in
+            seconds
+        :param initial_delay: The delay before the first reconnect attempt,
+            in seconds
+        :param max_delay: The maximum delay between reconnect attempts, in
+            seconds
+        """
+        self.client = client
+        self.reconnect_timeout = reconnect_timeout
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.reconnect_count = 0
+        # the arguments of the last connect_to_bbb call, used to reconnect
+        self.__endpoint = None
+        # the wire format negotiated for the connection, negotiated again
+        # after reconnecting
+        self.__wire_format = None
+        # (message, robot log level) tuples that have not been logged yet
+        self.__messages = collections.deque()
+
+    def connect_to_bbb(self, *endpoint):
+        """
+        :param endpoint: Optional IP address and port number of the BBB, see
+            the client's connect_to_bbb
+        """
+        self.client.connect_to_bbb(*endpoint)
+        self.__endpoint = endpoint
+        self.__wire_format = None
+
+    def disconnect_from_bbb(self):
+        self.__endpoint = None
+        self.__wire_format = None
+        self.client.disconnect_from_bbb()
+
+    def negotiate_wire_format(self, wire_format):
+        """
+        :return: True if the BBB accepted the wire format, False if the
+            client or the BBB does not support it
+        """
+        if not hasattr(self.client, "negotiate_wire_format"):
+            return False
+        accepted = self.__run_with_reconnect(
+            self.client.negotiate_wire_format, wire_format)
+        self.__wire_format = wire_format if accepted else None
+        return accepted
+
+    def json_request_response_bbb(self, json_to_send):
+        return self.__run_with_reconnect(self.client.json_request_response_bbb,
+                                         json_to_send)
+
+    def compact_request_response_bbb(self, payload):
+        return self.__run_with_reconnect(
+            self.client.compact_request_response_bbb, payload)
+
+    def check_connection(self):
+        """
+        Sends an empty request to check that the BBB still answers
+
+        :return: True if the BBB answered, otherwise False
+        """
+        if self.__wire_format is not None:
+            # the empty request is JSON, so it cannot be sent once another
+            # wire format has been negotiated; an empty compact request is
+            # answered with an empty list as well
+            send_empty_request = self.client.compact_request_response_bbb
+            empty_request = b""
+        else:
+            send_empty_request = self.client.json_request_response_bbb
+            empty_request = HEALTH_CHECK_REQUEST
+        try:
+            send_empty_request(empty_request)
+        except (OSError, ValueError):
+            return False
+        return True
+
+    def ensure_connected(self):
+        """
+        Checks that the BBB still answers, and reconnects if it does not,
+        e.g. before reusing a connection that has been idle for a while
+        """
+        if not self.check_connection():
+            self.__reconnect()
+
+    def pop_messages(self):
+        """
+        :return: The list of (message, robot log level) tuples about the
+            connection (e.g. reconnecting to the BBB) since the last call,
+            oldest first
+        """
+        messages = []
+        while self.__messages:
+            messages.append(self.__messages.popleft())
+        return messages
+
+    def __log(self, message, level="INFO"):
+        self.__messages.append((message, level))
+
+    def __run_with_reconnect(self, request_response, request):
+        try:
+            return request_response(request)
+        except OSError as e:
+            self.__log("Lost the connection to the BBB ({}), "
+                       "reconnecting".format(e), "WARN")
+        self.__reconnect()
+        return request_response(request)
+
+    def __reconnect(self):
+        """
+        Reconnects to the BBB, waiting twice as long after every failed
+        attempt, until RECONNECT_TIMEOUT has elapsed
+        """
+        if self.__endpoint is None:
+            raise ConnectionError("Cannot reconnect to a BBB that was never "
+                                  "connected")
+        deadline = time.monotonic() + self.reconnect_timeout
+        delay = self.initial_delay
+        while True:
+            try:
+                self.client.disconnect_from_bbb()
+            except Exception:
+                # the old connection is already broken, it only needs to be
+                # cleaned up
+                pass
+            try:
+                self.client.connect_to_bbb(*self.__endpoint)
+                break
+            except OSError as e:
+                if time.monotonic() + delay > deadline:
+                    raise ConnectionError(
+                        "Could not reconnect to the BBB within {} seconds: "
+                        "{}".format(self.reconnect_timeout, e))
+                self.__log("Could not reconnect to the BBB ({}), retrying "
+                           "in {} seconds".format(e, delay))
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_delay)
+        if self.__wire_format is not None and \
+                not self.client.negotiate_wire_format(self.__wire_format):
+            raise ConnectionError("The BBB no longer accepts the {} wire "
+                                  "format".format(self.__wire_format))
+        self.reconnect_count += 1
+        self.__log("Reconnected to the BBB")
@@ -0,0 +1,83 @@
+"""
+Tracks the last known state of the device under test between requests, so
+that a request that would not change it (e.g. setting IOs that are already
+inputs back to inputs before every test) can be skipped.
+
+The BBB sets all of its IOs to inputs at the start of every request, so the
+BBB pins that may still be driven are the digital outputs of the last
+request. An I2C register keeps the value written by a request until it is
+written again, so the state of the I2C devices is the last value written to
+each register. The state is unknown after connecting to the BBB, and after a
+request that failed or had to reconnect, as the request may have been only
+partly run, or the device may have been reset.
+"""
+from ace_bbsm import BBB_IO_CONSTANTS
+
+
+def get_device_effect(io_specifications):
+    """
+    :param io_specifications: The list of IO specifications of a request
+    :return: A tuple of the I2C register writes of the request, as a tuple of
+        ((I2C bus, chip address, data address), data) tuples in the order
+        they are written, and the frozenset of the BBB pins that the request
+        drives
+    """
+    i2c_writes = []
+    driven_pins = set()
+    for spec in io_specifications:
+        if spec[BBB_IO_CONSTANTS.SPEC_TYPE] != \
+                BBB_IO_CONSTANTS.SPEC_TYPE_OUTPUT:
+            continue
+        if spec[BBB_IO_CONSTANTS.OUTPUT_TYPE] == BBB_IO_CONSTANTS.I2C:
+            i2c_writes.append(((spec[BBB_IO_CONSTANTS.I2CBUS],
+                                spec[BBB_IO_CONSTANTS.I2C_CHIP_ADDRESS],
+                                spec[BBB_IO_CONSTANTS.I2C_DATA_ADDRESS]),
+                               spec[BBB_IO_CONSTANTS.I2C_DATA]))
+        else:
+            driven_pins.add(spec[BBB_IO_CONSTANTS.PIN_NUMBER])
+    return tuple(i2c_writes), frozenset(driven_pins)
+
+
+class DeviceState:
+    def __init__(self):
+        self.is_known = False
+        # (I2C bus, chip address, data address) -> the data last written to
+        # the register
+        self.i2c_registers = {}
+        # the BBB pins driven by the last request
+        self.driven_pins = frozenset()
+
+    def invalidate(self):
+        """
+        Forgets the state, e.g. after a request that failed
+        """
+        self.is_known = False
+        self.i2c_registers.clear()
+        self.driven_pins = frozenset()
+
+    def update(self, device_effect):
+        """
+        Applies the effect of a request that has been run completely
+
+        :param device_effect: The effect of the request, see
+            'get_device_effect'
+        """
+        i2c_writes, driven_pins = device_effect
+        self.i2c_registers.update(i2c_writes)
+        self.driven_pins = driven_pins
+        self.is_known = True
+
+    def is_unchanged_by(self, device_effect):
+        """
+        :param device_effect: The effect of a request, see
+            'get_device_effect'
+        :return: True if the state is known and the request would not change
+            any I2C register or drive any BBB pin. The BBB pins driven by the
+            last request are not considered, as the BBB sets them to inputs
+            at the start of the next request anyway
+        """
+        i2c_writes, driven_pins = device_effect
+        if not self.is_known or driven_pins:
+            return False
+        return all(self.i2c_registers.get(register) == data
+                   for register, data in i2c_writes)
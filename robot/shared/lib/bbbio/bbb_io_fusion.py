@@ -0,0 +1,217 @@
+"""
+Fuses IO specification programs that are electrically independent into a
+single request, so that e.g. the pass-through checks of several connectors
+are run by one round trip to the BBB instead of one round trip each.
+
+Two programs are independent when:
+- they have the same I2C specifications, in the same order, so that the
+  devices on the I2C buses are in the same state for both
+- they set each of the shared output pins (e.g. the enables of the level
+  shifters and line drivers) to the same value, or both leave it unset
+- they have no other pin in common, whether as an output or an input, so
+  that no program drives a pin that another program reads, and every input
+  value returned by the BBB belongs to exactly one program
+and the fused IO specifications are accepted by the suite validator, which
+checks the contention rules of the cape under test.
+
+A program can only be fused if its IO specifications are its I2C
+specifications, then its digital outputs, then its inputs, which is the order
+in which the fused IO specifications are sent.
+
+See bbb_io_manager.plan_io_specification_program_fusion
+"""
+from ace_bbsm import BBB_IO_CONSTANTS
+
+from bbb_io_program import IOSpecProgram
+
+# The order of the kinds of IO specifications in a program that can be fused
+_I2C_SPECS = 0
+_OUTPUT_SPECS = 1
+_INPUT_SPECS = 2
+
+
+def _get_spec_kind(spec):
+    """
+    :return: The kind of the IO specification 'spec', or None if it cannot
+        be fused
+    """
+    if spec[BBB_IO_CONSTANTS.SPEC_TYPE] == BBB_IO_CONSTANTS.SPEC_TYPE_INPUT:
+        return _INPUT_SPECS
+    if spec[BBB_IO_CONSTANTS.OUTPUT_TYPE] == BBB_IO_CONSTANTS.I2C:
+        return _I2C_SPECS
+    if spec[BBB_IO_CONSTANTS.OUTPUT_TYPE] == BBB_IO_CONSTANTS.DIGITAL_3V3:
+        return _OUTPUT_SPECS
+    return None
+
+
+class _FusableProgram:
+    """
+    The IO specifications of a program split by kind
+    """
+
+    def __init__(self, program_key, i2c_specs, shared_outputs, output_specs,
+                 input_specs):
+        self.program_key = program_key
+        self.i2c_specs = i2c_specs
+        # shared output pin number -> value
+        self.shared_outputs = shared_outputs
+        self.output_specs = output_specs
+        self.input_specs = input_specs
+        self.pins = frozenset(spec[BBB_IO_CONSTANTS.PIN_NUMBER]
+                              for spec in output_specs + input_specs)
+
+    @staticmethod
+    def parse(program_key, program, shared_output_pins):
+        """
+        :return: The _FusableProgram of the IOSpecProgram 'program', or None
+            if it cannot be fused
+        """
+        i2c_specs = []
+        shared_outputs = {}
+        output_specs = []
+        input_specs = []
+        previous_kind = _I2C_SPECS
+        for spec in program.io_specifications:
+            kind = _get_spec_kind(spec)
+            if kind is None or kind < previous_kind:
+                return None
+            previous_kind = kind
+            if kind == _I2C_SPECS:
+                i2c_specs.append(spec)
+                continue
+            pin_number = spec[BBB_IO_CONSTANTS.PIN_NUMBER]
+            if pin_number in shared_output_pins:
+                if kind == _INPUT_SPECS or pin_number in shared_outputs:
+                    return None
+                shared_outputs[pin_number] = \
+                    spec[BBB_IO_CONSTANTS.OUTPUT_VALUE]
+            elif kind == _OUTPUT_SPECS:
+                output_specs.append(spec)
+            else:
+                input_specs.append(spec)
+        return _FusableProgram(program_key, i2c_specs, shared_outputs,
+                               output_specs, input_specs)
+
+
+class FusedProgram:
+    """
+    An IOSpecProgram that runs the IO specifications of several independent
+    programs in a single request
+    """
+
+    def __init__(self, fusable_programs, io_specifications):
+        self.program_keys = [fusable_program.program_key
+                             for fusable_program in fusable_programs]
+        self.program = IOSpecProgram(io_specifications)
+        self.__input_counts = [len(fusable_program.input_specs)
+                               for fusable_program in fusable_programs]
+
+    def split_returned_data(self, returned_data):
+        """
+        :param returned_data: The list of input data returned by the BBB for
+            the fused program
+        :return: A dict of each program key to the part of the returned data
+            that was requested by the input specifications of the program
+        """
+        if len(returned_data) != sum(self.__input_counts):
+            raise AssertionError(
+                "The BBB returned {} input values for a fused request with "
+                "{} input specifications".format(len(returned_data),
+                                                 sum(self.__input_counts)))
+        returned_data_by_key = {}
+        start = 0
+        for program_key, input_count in zip(self.program_keys,
+                                            self.__input_counts):
+            returned_data_by_key[program_key] = \
+                returned_data[start:start + input_count]
+            start += input_count
+        return returned_data_by_key
+
+
+class IOSpecFusionPlanner:
+    def __init__(self, suite_validator=None, shared_output_pins=()):
+        """
+        :param suite_validator: Optional function that validates the fused IO
+            specifications for the suite, and raises an AssertionError if
+            they are not valid
+        :param shared_output_pins: The pin numbers of the outputs that
+            independent programs may both set, to the same value
+        """
+        self.suite_validator = suite_validator
+        self.shared_output_pins = frozenset(shared_output_pins)
+        # lists of _FusablePrograms, each of which is fused into one request
+        self.__groups = []
+
+    def add_program(self, program_key, program):
+        """
+        Adds the IOSpecProgram 'program' to the first group of programs that
+        it is independent of, or to a new group
+
+        :param program_key: The key of the program
+        :param program: The compiled IOSpecProgram
+        :return: True if the program can be fused, False if it must be run
+            on its own
+        """
+        fusable_program = _FusableProgram.parse(program_key, program,
+                                                self.shared_output_pins)
+        if fusable_program is None:
+            return False
+        for group in self.__groups:
+            if self.__is_independent(group, fusable_program):
+                group.append(fusable_program)
+                return True
+        self.__groups.append([fusable_program])
+        return True
+
+    def __is_independent(self, group, fusable_program):
+        """
+        :return: True if the 'fusable_program' is independent of every
+            program in the 'group', including under the suite validator
+        """
+        first_program = group[0]
+        if fusable_program.i2c_specs != first_program.i2c_specs:
+            return False
+        if fusable_program.shared_outputs != first_program.shared_outputs:
+            return False
+        if any(not fusable_program.pins.isdisjoint(grouped_program.pins)
+               for grouped_program in group):
+            return False
+        if self.suite_validator is not None:
+            try:
+                self.suite_validator(
+                    self.__fuse_io_specifications(group + [fusable_program]))
+            except AssertionError:
+                return False
+        return True
+
+    @staticmethod
+    def __fuse_io_specifications(fusable_programs):
+        """
+        :return: The IO specifications that run all of the
+            'fusable_programs' at once: the I2C specifications that they have
+            in common, then the outputs of each program, then the shared
+            outputs, then the inputs of each program
+        """
+        first_program = fusable_programs[0]
+        io_specifications = list(first_program.i2c_specs)
+        for fusable_program in fusable_programs:
+            io_specifications.extend(fusable_program.output_specs)
+        for pin_number, value in first_program.shared_outputs.items():
+            io_specifications.append({
+                BBB_IO_CONSTANTS.SPEC_TYPE: BBB_IO_CONSTANTS.SPEC_TYPE_OUTPUT,
+                BBB_IO_CONSTANTS.OUTPUT_TYPE: BBB_IO_CONSTANTS.DIGITAL_3V3,
+                BBB_IO_CONSTANTS.PIN_NUMBER: pin_number,
+                BBB_IO_CONSTANTS.OUTPUT_VALUE: value
+            })
+        for fusable_program in fusable_programs:
+            io_specifications.extend(fusable_program.input_specs)
+        return io_specifications
+
+    def plan(self):
+        """
+        :return: The list of FusedPrograms of every group of more than one
+            program. The programs that are in no FusedProgram gain nothing
+            from being fused, and are run on their own
+        """
+        return [FusedProgram(group, self.__fuse_io_specifications(group))
+                for group in self.__groups if len(group) > 1]
@@ -0,0 +1,156 @@
+"""
+Records how long each stage of the requests sent to the BBB by bbb_io_manager
+takes, and how many bytes are sent and received, so that a slow BBB or
+network link can be told apart from slow validation.
+
+The stages of a request are:
+- spec_build: building the IO specifications (the specify_bbb_* functions)
+- validation: the suite level validation of the IO specifications
+- serialize: converting the IO specifications to the wire format (JSON or
+  compact, see bbb_wire_format)
+- network: sending the request to the BBB and waiting for its response
+- deserialize: converting the response from the wire format
+
+Only the most recent requests are kept (see REQUEST_BUFFER_SIZE).
+"""
+import math
+import time
+from collections import deque
+
+SPEC_BUILD_STAGE = "spec_build"
+VALIDATION_STAGE = "validation"
+SERIALIZE_STAGE = "serialize"
+NETWORK_STAGE = "network"
+DESERIALIZE_STAGE = "deserialize"
+STAGES = [SPEC_BUILD_STAGE, VALIDATION_STAGE, SERIALIZE_STAGE, NETWORK_STAGE,
+          DESERIALIZE_STAGE]
+
+# The number of most recent requests that are kept
+REQUEST_BUFFER_SIZE = 10000
+
+
+class RequestRecord:
+    __slots__ = ["stage_seconds", "sent_bytes", "received_bytes"]
+
+    def __init__(self, stage_seconds, sent_bytes, received_bytes):
+        """
+        :param stage_seconds: The duration of each stage, in the order of
+            STAGES
+        :param sent_bytes: The size of the request
+        :param received_bytes: The size of the response
+        """
+        self.stage_seconds = stage_seconds
+        self.sent_bytes = sent_bytes
+        self.received_bytes = received_bytes
+
+
+def get_percentile(sorted_values, percentile):
+    """
+    :param sorted_values: A non-empty sorted list of values
+    :param percentile: The percentile to get, between 0 and 100
+    :return: The nearest-rank percentile of the values
+    """
+    rank = math.ceil(percentile / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+class RequestRecorder:
+    def __init__(self, buffer_size=REQUEST_BUFFER_SIZE):
+        self.requests = deque(maxlen=buffer_size)
+        # the total number of requests, including the ones no longer kept
+        self.request_count = 0
+        # time spent building and validating the IO specifications of the
+        # next request
+        self.pending_spec_build_seconds = 0.0
+        self.pending_validation_seconds = 0.0
+
+    def add_spec_build_time(self, start_time):
+        """
+        :param start_time: The time.perf_counter() when building an IO
+            specification started
+        """
+        self.pending_spec_build_seconds += time.perf_counter() - start_time
+
+    def add_validation_time(self, start_time):
+        """
+        :param start_time: The time.perf_counter() when validating the IO
+            specifications started
+        """
+        self.pending_validation_seconds += time.perf_counter() - start_time
+
+    def record_request(self, serialize_seconds, network_seconds,
+                       deserialize_seconds, sent_bytes, received_bytes):
+        """
+        Records a request, along with the spec build and validation time
+        added since the previous request
+        """
+        self.requests.append(RequestRecord(
+            (self.pending_spec_build_seconds, self.pending_validation_seconds,
+             serialize_seconds, network_seconds, deserialize_seconds),
+            sent_bytes, received_bytes))
+        self.request_count += 1
+        self.pending_spec_build_seconds = 0.0
+        self.pending_validation_seconds = 0.0
+
+    def reset(self):
+        self.requests.clear()
+        self.request_count = 0
+        self.pending_spec_build_seconds = 0.0
+        self.pending_validation_seconds = 0.0
+
+    def get_summary(self):
+        """
+        :return: A dict with the mean, p50, p95 and max duration (in ms) of
+            each stage and the total byte counts of the kept requests, or None
+            if no requests have been recorded
+        """
+        if not self.requests:
+            return None
+        summary = {
+            "request_count": self.request_count,
+            "kept_request_count": len(self.requests),
+            "sent_bytes": sum(request.sent_bytes
+                              for request in self.requests),
+            "received_bytes": sum(request.received_bytes
+                                  for request in self.requests),
+            "stages": {}
+        }
+        for stage_index, stage in enumerate(STAGES):
+            durations_ms = sorted(
+                request.stage_seconds[stage_index] * 1000
+                for request in self.requests)
+            summary["stages"][stage] = {
+                "mean_ms": sum(durations_ms) / len(durations_ms),
+                "p50_ms": get_percentile(durations_ms, 50),
+                "p95_ms": get_percentile(durations_ms, 95),
+                "max_ms": durations_ms[-1]
+            }
+        return summary
+
+    def get_request_stage_durations(self):
+        """
+        :return: A list of the kept requests, oldest first, each as a dict of
+            the duration (in ms) of each stage by stage name
+        """
+        return [{stage: seconds * 1000
+                 for stage, seconds in zip(STAGES, request.stage_seconds)}
+                for request in self.requests]
+
+    def get_summary_str(self):
+        """
+        :return: A one line summary of the recorded requests, e.g. for the
+            suite metadata
+        """
+        summary = self.get_summary()
+        if summary is None:
+            return "No BBB requests recorded"
+        stage_strs = [
+            "{} p50 {:.2f} ms / p95 {:.2f} ms / max {:.2f} ms".format(
+                stage, stage_summary["p50_ms"], stage_summary["p95_ms"],
+                stage_summary["max_ms"])
+            for stage, stage_summary in summary["stages"].items()]
+        return "{} requests (last {}: {} bytes sent, {} bytes received) | " \
+               "{}".format(summary["request_count"],
+                           summary["kept_request_count"],
+                           summary["sent_bytes"], summary["received_bytes"],
+                           " | ".join(stage_strs))
@@ -3,12 +3,30 @@ A series of functions that manages communication between the Beagle Bone Black (
 allows the users to control inputs and outputs on the BBB
 """
 
+import atexit
+import difflib
 import json
+import os
+import statistics
+import time
 
 from ace_bbsm import BBB_IO_CONSTANTS, Client
 
 import bbb_io_validation
+import bbb_wire_format
+from BBB_ENVIRONMENT_CONSTANTS import (
+    BBB_BROKER_ENV_VAR, BBB_IP_ADDRESS_ENV_VAR, BBB_PORT_ENV_VAR,
+    BBB_SIMULATOR_ENV_VAR, INSTRUMENTATION_ENV_VAR,
+    INSTRUMENTATION_FILE_ENV_VAR, OPTIMIZE_ENV_VAR,
+    PERSISTENT_CONNECTION_ENV_VAR, WIRE_FORMAT_ENV_VAR)
+from bbb_queued_client import BBBServerError, QueuedBBBClient
+from bbb_connection import BBBConnectionManager
+from bbb_io_fusion import IOSpecFusionPlanner
+from bbb_io_instrumentation import RequestRecorder
+from bbb_io_optimizer import optimize_io_specifications
+from bbb_io_program import IOSpecProgram
 from robot.api import logger
+from robot.libraries.BuiltIn import BuiltIn
 
 # Sample JSON that will be sent to the BBB when send_io_specifications_to_bbb()
 # is called:
@@ -49,33 +67,167 @@ from robot.api import logger
 """
 
 
-class BBBServerError(Exception):
-    def __init__(self, server_message):
-        super().__init__(server_message)
+# The environment variables that configure this module are defined in
+# BBB_ENVIRONMENT_CONSTANTS.py
+
+# The suite metadata that 'log_bbb_request_timings' adds the summary of the
+# request timings to
+REQUEST_TIMINGS_METADATA_NAME = "BBB Request Timings"
+
+# The message logged with the statistics of an analog input, which the result
+# store of the test manager reads back from the output xml (see
+# resultmanager/xml_parser.py), with the pin number and the JSON statistics
+ANALOG_STATISTICS_MESSAGE_FORMAT = "Analog input {}: {}"
+
+io_specification_groups = []
+bbb_return_data_groups = []
+# program key -> IOSpecProgram, kept for the life of the process so that
+# e.g. the iterations of the PersistentRunner reuse the compiled programs
+io_specification_programs = {}
+# program key -> the FusedProgram that runs it, see
+# 'plan_io_specification_program_fusion'
+fused_programs_by_key = {}
+# program key -> the returned data of the last fused request that ran the
+# program, until it is used by 'run_io_specification_program'
+fused_returned_data = {}
+is_connected = False
+request_recorder = None
+if os.environ.get(INSTRUMENTATION_ENV_VAR) or \
+        os.environ.get(INSTRUMENTATION_FILE_ENV_VAR):
+    request_recorder = RequestRecorder()
+
+
+def _create_client():
+    """
+    :return: The client used to communicate with the BBB, i.e. a
+        BBBBrokerClient if the BBB_BROKER_ENV_VAR environment variable is set,
+        a BBBSimulatorClient if the BBB_SIMULATOR_ENV_VAR environment variable
+        is set, otherwise the ace_bbsm Client. The client reconnects to the
+        BBB if the connection drops (see bbb_connection.py)
+    """
+    # the broker and simulator modules are only loaded when they are used,
+    # so that they are not part of the runs on the hardware
+    if os.environ.get(BBB_BROKER_ENV_VAR):
+        import bbb_broker
+        return BBBConnectionManager(bbb_broker.BBBBrokerClient())
+    if os.environ.get(BBB_SIMULATOR_ENV_VAR):
+        import bbb_simulator
+        return BBBConnectionManager(bbb_simulator.BBBSimulatorClient())
+    return BBBConnectionManager(Client())
+
+
+client = _create_client()
+bbb_client = QueuedBBBClient(client, request_recorder)
+# the IO specifications and returned data of the keywords are the ones of the
+# module level QueuedBBBClient
+io_to_send = bbb_client.io_to_send
+bbb_return_data = bbb_client.bbb_return_data
+
+
+def is_persistent_connection():
+    """
+    :return: True if the BBB connection should be kept open between suite
+        executions, otherwise False
+    """
+    return bool(os.environ.get(PERSISTENT_CONNECTION_ENV_VAR))
 
 
-io_to_send = []
-bbb_return_data = []
-client = Client()
+def get_bbb_endpoint():
+    """
+    :return: A tuple of the IP address and port number of the BBB (or of the
+        BBB broker) given by the environment, or None if the ace_bbsm defaults
+        should be used
+    """
+    broker_address = os.environ.get(BBB_BROKER_ENV_VAR)
+    if broker_address:
+        import bbb_broker
+        return bbb_broker.parse_broker_address(broker_address)
+    ip_address = os.environ.get(BBB_IP_ADDRESS_ENV_VAR)
+    if not ip_address:
+        return None
+    return ip_address, int(os.environ[BBB_PORT_ENV_VAR])
 
 
 def connect_to_bbb():
     """
     Connects to the BBB using the IP address and port number defined
-    in the ace_bbsm module.
+    in the ace_bbsm module (or the bbb_simulator module when the simulator is
+    used), or the ones given by the environment (see 'get_bbb_endpoint').
 
-    The BBB must not already be connected when function is called.
+    The BBB must not already be connected when function is called, unless
+    the connection is persistent, in which case the already open connection
+    is reused.
     """
-    client.connect_to_bbb()
+    global is_connected
+    if is_connected and is_persistent_connection():
+        logger.info("Reusing persistent BBB connection")
+        # the connection may have dropped while it was idle, and the device
+        # under test may have been changed by someone else in the meantime
+        try:
+            client.ensure_connected()
+        finally:
+            _log_connection_messages()
+        bbb_client.device_state.invalidate()
+        reset_bbb_io_specifications()
+        return
+    endpoint = get_bbb_endpoint()
+    if endpoint is None:
+        bbb_client.connect()
+    else:
+        logger.info("Connecting to BBB at {}:{}".format(*endpoint))
+        bbb_client.connect(*endpoint)
+    is_connected = True
+    _negotiate_wire_format()
+    if is_persistent_connection():
+        atexit.register(close_persistent_connection)
     reset_bbb_io_specifications()
 
 
+def _negotiate_wire_format():
+    """
+    Asks the BBB to use the wire format requested by the WIRE_FORMAT_ENV_VAR
+    environment variable for the new connection. JSON is used if no wire
+    format is requested, or if the client or the BBB does not support the
+    requested wire format
+    """
+    requested_wire_format = os.environ.get(WIRE_FORMAT_ENV_VAR)
+    if requested_wire_format != bbb_wire_format.COMPACT_WIRE_FORMAT:
+        return
+    try:
+        is_accepted = bbb_client.negotiate_wire_format(requested_wire_format)
+    finally:
+        _log_connection_messages()
+    if is_accepted:
+        logger.info("Using the {} wire format".format(requested_wire_format))
+    else:
+        logger.info("The BBB client or the BBB does not support the {} wire "
+                    "format, using JSON".format(requested_wire_format))
+
+
 def disconnect_from_bbb():
     """
     Disconnects from the BBB. The BBB must be connected when this function
     is called.
+
+    If the connection is persistent, the connection is left open for the
+    next suite execution and is closed when the process exits.
     """
-    client.disconnect_from_bbb()
+    global is_connected
+    if is_persistent_connection():
+        logger.info("Keeping persistent BBB connection open")
+        return
+    bbb_client.disconnect()
+    is_connected = False
+
+
+def close_persistent_connection():
+    """
+    Closes a persistent BBB connection, if it is still open
+    """
+    global is_connected
+    if is_connected:
+        bbb_client.disconnect()
+        is_connected = False
 
 
 def reset_bbb_io_specifications():
@@ -103,6 +255,8 @@ def specify_bbb_digital_output(pin_number, value):
         output
     :param value: The value for the signal that should be output on the BBB
     """
+    if request_recorder is not None:
+        start_time = time.perf_counter()
     bbb_io_validation.validate_bbb_output(
         pin_number, BBB_IO_CONSTANTS.DIGITAL_3V3, value)
     io_to_send.append({
@@ -111,6 +265,8 @@ def specify_bbb_digital_output(pin_number, value):
         BBB_IO_CONSTANTS.PIN_NUMBER: pin_number,
         BBB_IO_CONSTANTS.OUTPUT_VALUE: value
     })
+    if request_recorder is not None:
+        request_recorder.add_spec_build_time(start_time)
 
 
 I2C_KEYS = {BBB_IO_CONSTANTS.I2CBUS, BBB_IO_CONSTANTS.I2C_CHIP_ADDRESS,
@@ -153,6 +309,8 @@ def specify_bbb_i2c_output(i2cbus, chip_address, data_address, data):
     :param data: str: The data to be sent via I2C, representing a hex value.
         Can also be an empty str
     """
+    if request_recorder is not None:
+        start_time = time.perf_counter()
     bbb_io_validation.validate_i2c(i2cbus, chip_address, data_address, data)
     io_to_send.append({
         BBB_IO_CONSTANTS.SPEC_TYPE: BBB_IO_CONSTANTS.SPEC_TYPE_OUTPUT,
@@ -162,6 +320,8 @@ def specify_bbb_i2c_output(i2cbus, chip_address, data_address, data):
         BBB_IO_CONSTANTS.I2C_DATA_ADDRESS: data_address,
         BBB_IO_CONSTANTS.I2C_DATA: data
     })
+    if request_recorder is not None:
+        request_recorder.add_spec_build_time(start_time)
 
 
 def specify_bbb_i2c_output_dict(i2cset_parameters):
@@ -192,6 +352,8 @@ def specify_bbb_digital_input(pin_number):
 
     :param pin_number: The pin number on which the BBB will have a digital input
     """
+    if request_recorder is not None:
+        start_time = time.perf_counter()
     bbb_io_validation.validate_bbb_input(pin_number,
                                          BBB_IO_CONSTANTS.DIGITAL_3V3)
     io_to_send.append({
@@ -199,6 +361,8 @@ def specify_bbb_digital_input(pin_number):
         BBB_IO_CONSTANTS.INPUT_TYPE: BBB_IO_CONSTANTS.DIGITAL_3V3,
         BBB_IO_CONSTANTS.PIN_NUMBER: pin_number
     })
+    if request_recorder is not None:
+        request_recorder.add_spec_build_time(start_time)
 
 
 def specify_bbb_analog_input(pin_number):
@@ -209,6 +373,8 @@ def specify_bbb_analog_input(pin_number):
 
     :param pin_number: The pin number on which the BBB will have an analog input
     """
+    if request_recorder is not None:
+        start_time = time.perf_counter()
     bbb_io_validation.validate_bbb_input(pin_number,
                                          BBB_IO_CONSTANTS.ANALOG_1V8)
     io_to_send.append({
@@ -216,6 +382,27 @@ def specify_bbb_analog_input(pin_number):
         BBB_IO_CONSTANTS.INPUT_TYPE: BBB_IO_CONSTANTS.ANALOG_1V8,
         BBB_IO_CONSTANTS.PIN_NUMBER: pin_number
     })
+    if request_recorder is not None:
+        request_recorder.add_spec_build_time(start_time)
+
+
+def specify_bbb_analog_input_samples(pin_number, sample_count):
+    """
+    Updates the 'io_to_send' so that when 'send_io_specifications_to_BBB' is
+    called, 'sample_count' analog values of the given pin_number are returned.
+    The samples are read back to back in the same request, so they cost a
+    single round trip. Use 'get_bbb_analog_input_statistics' to make threshold
+    decisions on the samples rather than on a single noisy reading
+
+    :param pin_number: The pin number on which the BBB will have an analog input
+    :param sample_count: The number of analog values to read
+    """
+    sample_count = int(sample_count)
+    if sample_count < 1:
+        raise AssertionError("At least one analog sample must be read, not "
+                             "{}".format(sample_count))
+    for _ in range(sample_count):
+        specify_bbb_analog_input(pin_number)
 
 
 def send_io_specifications_to_bbb(suite_validator):
@@ -237,16 +424,467 @@ def send_io_specifications_to_bbb(suite_validator):
                              "reset_bbb_return_data() before sending new IO "
                              "specification")
     if suite_validator is not None:
+        if request_recorder is not None:
+            start_time = time.perf_counter()
+        suite_validator(io_to_send)
+        if request_recorder is not None:
+            request_recorder.add_validation_time(start_time)
+    bbb_return_data.extend(_request_response_bbb(
+        _optimize_io_specifications(io_to_send)))
+    return bbb_return_data.returned_data
+
+
+def submit_io_specifications_to_bbb(suite_validator):
+    """
+    Validates and submits the current IO specifications like
+    'send_io_specifications_to_bbb', but returns as soon as the request is
+    queued, so that e.g. the IO specifications of the next test can be built
+    while the BBB runs them. 'io_to_send' is reset for the next request.
+
+    Call 'receive_io_specifications_from_bbb' with the returned request ID to
+    wait for the BBB and load its returned data into 'bbb_return_data'
+
+    :param suite_validator: See 'send_io_specifications_to_bbb'
+    :return: The ID of the submitted request
+    """
+    if suite_validator is not None:
+        if request_recorder is not None:
+            start_time = time.perf_counter()
+        suite_validator(io_to_send)
+        if request_recorder is not None:
+            request_recorder.add_validation_time(start_time)
+    request_id = bbb_client.submit(_optimize_io_specifications(io_to_send))
+    io_to_send.clear()
+    return request_id
+
+
+def receive_io_specifications_from_bbb(request_id):
+    """
+    Waits for the BBB to run the request submitted by
+    'submit_io_specifications_to_bbb' and replaces the 'bbb_return_data' with
+    the data it returned, so that 'get_bbb_input_value' can be used on it
+
+    :param request_id: The ID returned by 'submit_io_specifications_to_bbb'
+    :return: The outputs on the BBB requested in the specify_bbb_input calls
+    """
+    returned_data = _wait_for_bbb_request(int(request_id))
+    reset_bbb_return_data()
+    bbb_return_data.extend(returned_data)
+    return bbb_return_data.returned_data
+
+
+def _optimize_io_specifications(io_specifications):
+    """
+    Removes the redundant output specifications of a validated request if
+    the OPTIMIZE_ENV_VAR environment variable is set, and logs the removed
+    specifications at debug level
+
+    :param io_specifications: The list of validated IO specifications
+    :return: The list of IO specifications to send
+    """
+    if not os.environ.get(OPTIMIZE_ENV_VAR):
+        return io_specifications
+    optimized_specifications = optimize_io_specifications(io_specifications)
+    if len(optimized_specifications) != len(io_specifications):
+        diff = difflib.unified_diff(
+            [json.dumps(spec, sort_keys=True) for spec in io_specifications],
+            [json.dumps(spec, sort_keys=True)
+             for spec in optimized_specifications],
+            "original", "optimized", lineterm="")
+        logger.debug("Optimized {} IO specifications to {}:\n{}".format(
+            len(io_specifications), len(optimized_specifications),
+            "\n".join(diff)))
+    return optimized_specifications
+
+
+def _request_response_bbb(io_specifications):
+    """
+    Sends the 'io_specifications' to the BBB in a single request
+
+    :param io_specifications: The list of IO specifications to send
+    :return: The list of input values returned by the BBB, in the same order
+        as the input specifications
+    """
+    return _wait_for_bbb_request(bbb_client.submit(io_specifications))
+
+
+def _wait_for_bbb_request(request_id):
+    """
+    Blocks until the BBB has run the request 'request_id'
+
+    :param request_id: The ID of a request submitted to the 'bbb_client'
+    :return: The list of input values returned by the BBB
+    """
+    try:
+        return bbb_client.wait(request_id)
+    except BBBServerError as error:
+        logger.warn(str(error))
+        raise
+    finally:
+        _log_connection_messages()
+
+
+def _log_connection_messages():
+    """
+    Logs the messages of the BBBConnectionManager, e.g. about reconnecting to
+    the BBB during a request. The requests are run by the worker thread of
+    the 'bbb_client', and robot only logs the messages of its own thread
+    """
+    for message, level in client.pop_messages():
+        logger.write(message, level)
+
+
+def is_io_specification_program_compiled(program_key):
+    """
+    :param program_key: The key of the program, see
+        'compile_io_specification_program'
+    :return: True if a program has been compiled for 'program_key'
+    """
+    return program_key in io_specification_programs
+
+
+def compile_io_specification_program(program_key, suite_validator):
+    """
+    Validates the current 'io_to_send' once and compiles it into an
+    IOSpecProgram that 'run_io_specification_program' can send any number of
+    times without building, validating or serializing the IO specifications
+    again. 'io_to_send' is reset afterwards.
+
+    The 'program_key' must identify everything that the IO specifications
+    depend on (e.g. the suite, the test pattern and its pins and values), as
+    the program is reused by every later run with the same key
+
+    :param program_key: The key of the program
+    :param suite_validator: See 'send_io_specifications_to_bbb'
+    """
+    if not io_to_send:
+        raise AssertionError("Cannot compile an empty IO specification "
+                             "program")
+    if suite_validator is not None:
+        if request_recorder is not None:
+            start_time = time.perf_counter()
         suite_validator(io_to_send)
-    json_to_send = json.dumps(io_to_send)
-    response = client.json_request_response_bbb(json_to_send)
-    returned_data = json.loads(response)
-    if 'Error' in returned_data:
-        logger.warn(returned_data['Error'])
-        raise BBBServerError(returned_data['Error'])
+        if request_recorder is not None:
+            request_recorder.add_validation_time(start_time)
+    io_specification_programs[program_key] = IOSpecProgram(
+        _optimize_io_specifications(io_to_send))
+    io_to_send.clear()
+
+
+def run_io_specification_program(program_key):
+    """
+    Sends the IO specification program compiled for 'program_key' to the BBB,
+    like 'send_io_specifications_to_bbb'
+
+    :param program_key: The key of the program, see
+        'compile_io_specification_program'
+    :return: The outputs on the BBB requested by the input specifications of
+        the program
+    """
+    if bbb_return_data:
+        raise AssertionError("Must call reset_bbb_io_specifications() or "
+                             "reset_bbb_return_data() before sending new IO "
+                             "specification")
+    if io_to_send:
+        raise AssertionError("The IO specifications specified since the last "
+                             "reset would not be sent with the IO "
+                             "specification program")
+    try:
+        program = io_specification_programs[program_key]
+    except KeyError:
+        raise AssertionError("No IO specification program compiled for "
+                             "'{}'".format(program_key))
+    fused_program = fused_programs_by_key.get(program_key)
+    if fused_program is None:
+        bbb_return_data.extend(_wait_for_bbb_request(
+            bbb_client.submit_program(program)))
     else:
-        bbb_return_data.extend(returned_data)
-        return bbb_return_data
+        if program_key not in fused_returned_data:
+            _run_fused_program(fused_program)
+        else:
+            logger.info("Using the input values returned by an earlier "
+                        "request that was fused with this program")
+        bbb_return_data.extend(fused_returned_data.pop(program_key))
+    return bbb_return_data.returned_data
+
+
+def run_io_specification_program_unless_redundant(program_key):
+    """
+    Runs the IO specification program compiled for 'program_key' like
+    'run_io_specification_program', unless the last known state of the
+    device under test shows that it would not change anything: it would only
+    write I2C registers that already have the same values, and would not
+    drive any BBB pins. E.g. setting IOs that are already inputs back to
+    inputs before every test. A skipped program is logged.
+
+    The state is only known for requests that have been run completely since
+    connecting to the BBB, so the program is always run after a failed
+    request or a reconnect
+
+    :param program_key: The key of the program, see
+        'compile_io_specification_program'
+    :return: True if the program was run, False if it was skipped
+    """
+    # the program is run anyway if IO specifications have been specified,
+    # so that 'run_io_specification_program' reports the error
+    if io_to_send or not _is_program_redundant(program_key):
+        run_io_specification_program(program_key)
+        return True
+    return False
+
+
+def get_io_specification_program_unless_redundant(program_key):
+    """
+    Gets the IO specifications of the program compiled for 'program_key',
+    e.g. to send them at the start of the next request as the
+    'reset_prelude' of 'send_queued_io_specification_groups_to_bbb' instead
+    of in a request of their own. Like
+    'run_io_specification_program_unless_redundant', no IO specifications
+    are returned (and this is logged) if the program would not change the
+    last known state of the device under test
+
+    :param program_key: The key of the program, see
+        'compile_io_specification_program'
+    :return: A list of copies of the IO specifications of the program, or an
+        empty list if it is redundant
+    """
+    if _is_program_redundant(program_key):
+        return []
+    return io_specification_programs[program_key].io_specifications
+
+
+def _is_program_redundant(program_key):
+    """
+    :return: True if the program compiled for 'program_key' would not change
+        the last known state of the device under test, in which case its
+        skipping is logged
+    """
+    try:
+        program = io_specification_programs[program_key]
+    except KeyError:
+        raise AssertionError("No IO specification program compiled for "
+                             "'{}'".format(program_key))
+    device_state = bbb_client.device_state
+    if bbb_client.get_in_flight_count() or \
+            not device_state.is_unchanged_by(program.device_effect):
+        return False
+    message = "Skipped the IO specification program '{}', as the device " \
+              "is already in the state that it sets".format(program_key)
+    if device_state.driven_pins:
+        message += ". The BBB pins {} driven by the last request are set " \
+                   "to inputs at the start of the next request".format(
+                       ", ".join(sorted(device_state.driven_pins)))
+    logger.info(message)
+    return True
+
+
+def _run_fused_program(fused_program):
+    """
+    Runs the FusedProgram and keeps the input values returned for each of its
+    programs until they are run
+
+    :param fused_program: The FusedProgram to run
+    """
+    returned_data = _wait_for_bbb_request(
+        bbb_client.submit_program(fused_program.program))
+    fused_returned_data.update(
+        fused_program.split_returned_data(returned_data))
+    logger.info("Ran {} fused IO specification programs in a single "
+                "request".format(len(fused_program.program_keys)))
+
+
+def reset_io_specification_programs():
+    """
+    Removes all of the compiled IO specification programs and their fusion
+    plan
+    """
+    io_specification_programs.clear()
+    reset_io_specification_program_fusion()
+
+
+def plan_io_specification_program_fusion(suite_validator, shared_output_pins,
+                                         *program_keys):
+    """
+    Plans which of the compiled programs 'program_keys' are electrically
+    independent (see bbb_io_fusion.py), so that
+    'run_io_specification_program' runs the independent programs in a single
+    request to the BBB. The request is sent when the first of its programs is
+    run, and the input values of each of the other programs are kept until
+    that program is run, so every test still checks its own input values.
+
+    The programs are run in the state that the first of them is run in, so
+    each of them must only depend on the state that every program is run in
+    (e.g. after all of the IOs have been set back to inputs)
+
+    :param suite_validator: See 'send_io_specifications_to_bbb'. Programs
+        are only fused if the fused IO specifications are valid for the suite
+    :param shared_output_pins: The pin numbers of the outputs that
+        independent programs may both set, to the same value
+    :param program_keys: The keys of the compiled programs that may be fused
+    :return: The number of requests that the fused programs are run in
+    """
+    reset_io_specification_program_fusion()
+    planner = IOSpecFusionPlanner(suite_validator, shared_output_pins)
+    for program_key in program_keys:
+        try:
+            program = io_specification_programs[program_key]
+        except KeyError:
+            raise AssertionError("No IO specification program compiled for "
+                                 "'{}'".format(program_key))
+        if not planner.add_program(program_key, program):
+            logger.info("The IO specification program '{}' cannot be "
+                        "fused".format(program_key))
+    fused_programs = planner.plan()
+    for fused_program in fused_programs:
+        for program_key in fused_program.program_keys:
+            fused_programs_by_key[program_key] = fused_program
+        logger.info("Fused the IO specification programs {}".format(
+            fused_program.program_keys))
+    return len(fused_programs)
+
+
+def reset_io_specification_program_fusion():
+    """
+    Removes the fusion plan, and the input values of fused requests that
+    have not been used yet, so that every program is run on its own
+    """
+    fused_programs_by_key.clear()
+    fused_returned_data.clear()
+
+
+def queue_bbb_io_specification_group():
+    """
+    Moves the current 'io_to_send' into a new IO specification group. All
+    queued groups are sent to the BBB in a single request when
+    'send_queued_io_specification_groups_to_bbb' is called.
+
+    Each group should be independent of the other groups, i.e. it should
+    start with a reset prelude (such as setting all IO Expander IOs to
+    inputs, see the 'reset_prelude' of
+    'send_queued_io_specification_groups_to_bbb') rather than relying on the
+    state left by a previous group
+    """
+    if not io_to_send:
+        raise AssertionError("Cannot queue an empty IO specification group")
+    io_specification_groups.append(list(io_to_send))
+    io_to_send.clear()
+
+
+def reset_bbb_io_specification_groups():
+    """
+    Resets the queued IO specification groups and their returned data
+    """
+    io_specification_groups.clear()
+    bbb_return_data_groups.clear()
+
+
+def send_queued_io_specification_groups_to_bbb(suite_validator,
+                                               reset_prelude=None):
+    """
+    Sends all IO specification groups queued by
+    'queue_bbb_io_specification_group' to the BBB in a single request.
+
+    Use 'select_bbb_io_specification_group_results' afterwards to load the
+    results of one of the groups into 'bbb_return_data'
+
+    :param suite_validator: A function that validates a single IO
+        specification group for the given suite. See
+        'send_io_specifications_to_bbb'
+    :param reset_prelude: Optional list of IO specifications that are added
+        to the start of every group, see 'send_io_specification_groups_to_bbb'
+    :return: The number of groups that were sent
+    """
+    if bbb_return_data_groups:
+        raise AssertionError("Must call reset_bbb_io_specification_groups() "
+                             "before sending new IO specification groups")
+    bbb_return_data_groups.extend(send_io_specification_groups_to_bbb(
+        io_specification_groups, suite_validator, reset_prelude))
+    io_specification_groups.clear()
+    return len(bbb_return_data_groups)
+
+
+def select_bbb_io_specification_group_results(group_index):
+    """
+    Replaces the 'bbb_return_data' with the data returned for the
+    IO specification group at 'group_index' (zero indexed, in the order
+    that the groups were queued), so that 'get_bbb_input_value' can be
+    used on the results of that group
+
+    :param group_index: The index of the group whose results are selected
+    """
+    reset_bbb_return_data()
+    bbb_return_data.extend(bbb_return_data_groups[int(group_index)])
+
+
+def send_io_specification_groups_to_bbb(io_specification_groups_to_send,
+                                        suite_validator, reset_prelude=None):
+    """
+    Sends several independent IO specification groups to the BBB in one
+    framed request and demultiplexes the returned data back into one list
+    per group.
+
+    The BBB sets all of its IOs to inputs when it receives a request. To keep
+    the groups independent within a single request, the BBB pins that were
+    driven by the previous group are set back to inputs (by reading them)
+    before the next group starts. The values read for these framing inputs
+    are discarded.
+
+    :param io_specification_groups_to_send: A list of IO specification lists.
+        Each group is validated on its own
+    :param suite_validator: A function that validates a single IO
+        specification group for the given suite, or None to skip suite level
+        validation
+    :param reset_prelude: Optional list of IO specifications (e.g. I2C
+        specifications that set the IO Expander IOs back to inputs) that are
+        added to the start of every group
+    :return: A list with the returned data for each group, in the same order
+        as 'io_specification_groups_to_send'
+    """
+    framed_specifications = []
+    # for each input specification in the frame, the index of the group that
+    # the returned value belongs to, or None for framing inputs
+    input_owners = []
+    previously_driven_pins = []
+    for group_index, group in enumerate(io_specification_groups_to_send):
+        group_specifications = list(reset_prelude or []) + list(group)
+        if suite_validator is not None:
+            if request_recorder is not None:
+                start_time = time.perf_counter()
+            suite_validator(group_specifications)
+            if request_recorder is not None:
+                request_recorder.add_validation_time(start_time)
+        group_specifications = _optimize_io_specifications(
+            group_specifications)
+        for pin_number in previously_driven_pins:
+            framed_specifications.append({
+                BBB_IO_CONSTANTS.SPEC_TYPE: BBB_IO_CONSTANTS.SPEC_TYPE_INPUT,
+                BBB_IO_CONSTANTS.INPUT_TYPE: BBB_IO_CONSTANTS.DIGITAL_3V3,
+                BBB_IO_CONSTANTS.PIN_NUMBER: pin_number
+            })
+            input_owners.append(None)
+        previously_driven_pins = []
+        for spec in group_specifications:
+            framed_specifications.append(spec)
+            if spec[BBB_IO_CONSTANTS.SPEC_TYPE] == \
+                    BBB_IO_CONSTANTS.SPEC_TYPE_INPUT:
+                input_owners.append(group_index)
+            elif spec[BBB_IO_CONSTANTS.OUTPUT_TYPE] == \
+                    BBB_IO_CONSTANTS.DIGITAL_3V3 and \
+                    spec[BBB_IO_CONSTANTS.PIN_NUMBER] not in \
+                    previously_driven_pins:
+                previously_driven_pins.append(
+                    spec[BBB_IO_CONSTANTS.PIN_NUMBER])
+
+    returned_data = _request_response_bbb(framed_specifications)
+    if len(returned_data) != len(input_owners):
+        raise BBBServerError(
+            "Expected {} input values from the BBB but received {}".format(
+                len(input_owners), len(returned_data)))
+    returned_data_groups = [[] for _ in io_specification_groups_to_send]
+    for owner, data in zip(input_owners, returned_data):
+        if owner is not None:
+            returned_data_groups[owner].append(data)
+    return returned_data_groups
 
 
 def get_bbb_input_value(pin_number):
@@ -258,17 +896,72 @@ def get_bbb_input_value(pin_number):
     or the return data will be empty as the BBB will not have ever received the
     IO specifications
 
-    Return the value or values in a list, even if there is only one value
+    Return the value or values in a list, even if there is only one value.
+    Analog values are returned as floats
 
     :param pin_number: The pin name on which the BBB has received input
     :return: A list of values of the specified input to the BBB
     """
-    input_dicts = filter(
-        lambda data: data[BBB_IO_CONSTANTS.PIN_NUMBER] == pin_number,
-        bbb_return_data)
-    input_values = list(map(
-        lambda data: data[BBB_IO_CONSTANTS.INPUT_VALUE],
-        input_dicts))
+    input_values = bbb_return_data.get_input_values(pin_number)
     if not input_values:
         raise AssertionError("No values for the given pin_number")
     return input_values
+
+
+def get_bbb_input_values(*pin_numbers):
+    """
+    Retrieves the values on each of the inputs 'pin_numbers' within the
+    'bbb_return_data', so that the values of many pins can be retrieved with a
+    single keyword. See 'get_bbb_input_value'
+
+    :param pin_numbers: The pin names on which the BBB has received input
+    :return: A dict with the list of values of each of the 'pin_numbers'
+    """
+    return {pin_number: get_bbb_input_value(pin_number)
+            for pin_number in pin_numbers}
+
+
+def get_bbb_analog_input_statistics(pin_number):
+    """
+    Retrieves the statistics of the analog values on the input 'pin_number'
+    within the 'bbb_return_data', e.g. of the samples specified by
+    'specify_bbb_analog_input_samples'
+
+    :param pin_number: The pin name on which the BBB has received analog input
+    :return: A dict with the 'sample_count', 'minimum', 'maximum', 'mean' and
+        'stddev' (population standard deviation) of the analog values
+    """
+    input_values = get_bbb_input_value(pin_number)
+    analog_statistics = {
+        "sample_count": len(input_values),
+        "minimum": min(input_values),
+        "maximum": max(input_values),
+        "mean": statistics.mean(input_values),
+        "stddev": statistics.pstdev(input_values)
+    }
+    logger.info(ANALOG_STATISTICS_MESSAGE_FORMAT.format(
+        pin_number, json.dumps(analog_statistics)))
+    return analog_statistics
+
+
+def log_bbb_request_timings():
+    """
+    Logs a summary of the duration of each stage of the requests sent to the
+    BBB since this function was last called, and adds it to the metadata of
+    the current suite (so that it is shown in the report).
+
+    Does nothing unless the INSTRUMENTATION_ENV_VAR or the
+    INSTRUMENTATION_FILE_ENV_VAR environment variable is set
+    """
+    if request_recorder is None:
+        return
+    summary_str = request_recorder.get_summary_str()
+    logger.info(summary_str)
+    BuiltIn().set_suite_metadata(REQUEST_TIMINGS_METADATA_NAME, summary_str)
+    instrumentation_file_path = os.environ.get(INSTRUMENTATION_FILE_ENV_VAR)
+    if instrumentation_file_path:
+        with open(instrumentation_file_path, 'a') as instrumentation_file:
+            for stage_durations in \
+                    request_recorder.get_request_stage_durations():
+                instrumentation_file.write(json.dumps(stage_durations) + "\n")
+    request_recorder.reset()
@@ -0,0 +1,63 @@
+"""
+A peephole optimizer for the IO specifications of a request, which removes
+the output specifications that cannot change what the request does, so that
+the BBB runs fewer (slow) i2cset commands and pin writes:
+- an output that writes the value that the pin or I2C register already has
+  from an earlier output of the same request, e.g. the enables of the level
+  shifters and line drivers specified by several composed keywords
+- an output that is immediately overwritten by the next specification,
+  which writes the same pin or I2C register
+
+The input specifications are never removed or reordered, and outputs are
+never moved across an input, so every input reads the same state as before
+and the returned data is unchanged. Outputs are not moved across other
+outputs either, as the order in which e.g. the IO Expander registers are
+written matters to the device under test.
+"""
+from ace_bbsm import BBB_IO_CONSTANTS
+
+
+def _get_output_target(spec):
+    """
+    :return: The pin number or (I2C bus, chip address, data address) that
+        the output specification 'spec' writes, and the value it writes
+    """
+    if spec[BBB_IO_CONSTANTS.OUTPUT_TYPE] == BBB_IO_CONSTANTS.I2C:
+        return (spec[BBB_IO_CONSTANTS.I2CBUS],
+                spec[BBB_IO_CONSTANTS.I2C_CHIP_ADDRESS],
+                spec[BBB_IO_CONSTANTS.I2C_DATA_ADDRESS]), \
+            spec[BBB_IO_CONSTANTS.I2C_DATA]
+    return spec[BBB_IO_CONSTANTS.PIN_NUMBER], \
+        spec[BBB_IO_CONSTANTS.OUTPUT_VALUE]
+
+
+def optimize_io_specifications(io_specifications):
+    """
+    :param io_specifications: The list of validated IO specifications of a
+        request
+    :return: A new list of the IO specifications that have an effect, in
+        the same order
+    """
+    optimized_specifications = []
+    # pin number or I2C register -> the value written to it by the request
+    written_values = {}
+    # the target of the last optimized specification, if it is an output
+    last_output_target = None
+    for spec in io_specifications:
+        if spec[BBB_IO_CONSTANTS.SPEC_TYPE] != \
+                BBB_IO_CONSTANTS.SPEC_TYPE_OUTPUT:
+            # reading a pin makes it an input
+            written_values.pop(spec[BBB_IO_CONSTANTS.PIN_NUMBER], None)
+            optimized_specifications.append(spec)
+            last_output_target = None
+            continue
+        target, value = _get_output_target(spec)
+        if target in written_values and written_values[target] == value:
+            continue
+        if target == last_output_target:
+            # the previous output is overwritten before anything else happens
+            optimized_specifications.pop()
+        written_values[target] = value
+        optimized_specifications.append(spec)
+        last_output_target = target
+    return optimized_specifications
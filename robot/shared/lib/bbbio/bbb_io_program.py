@@ -0,0 +1,57 @@
+"""
+IO specification programs: a sequence of IO specifications that has been
+validated and serialized once, so that a test pattern that is run many times
+(e.g. in continuous mode) only has to send the already serialized request.
+
+See bbb_io_manager.compile_io_specification_program
+"""
+import json
+
+import bbb_wire_format
+from bbb_device_state import get_device_effect
+
+
+class IOSpecProgram:
+    __slots__ = ["__io_specifications", "__json_request", "__compact_request",
+                 "__device_effect"]
+
+    def __init__(self, io_specifications):
+        """
+        :param io_specifications: The list of IO specifications of the
+            program. They must already be validated, and are copied so that
+            the program cannot change afterwards
+        """
+        self.__io_specifications = tuple(dict(spec)
+                                         for spec in io_specifications)
+        self.__json_request = json.dumps(list(self.__io_specifications))
+        # only encoded if the compact wire format is used
+        self.__compact_request = None
+        self.__device_effect = get_device_effect(self.__io_specifications)
+
+    @property
+    def io_specifications(self):
+        """
+        :return: A copy of the IO specifications of the program
+        """
+        return [dict(spec) for spec in self.__io_specifications]
+
+    @property
+    def device_effect(self):
+        """
+        :return: The effect of the program on the device under test, see
+            bbb_device_state.get_device_effect
+        """
+        return self.__device_effect
+
+    def get_request(self, wire_format):
+        """
+        :param wire_format: One of the bbb_wire_format wire formats
+        :return: The serialized request of the program in the 'wire_format'
+        """
+        if wire_format == bbb_wire_format.COMPACT_WIRE_FORMAT:
+            if self.__compact_request is None:
+                self.__compact_request = \
+                    bbb_wire_format.encode_io_specifications(
+                        self.__io_specifications)
+            return self.__compact_request
+        return self.__json_request
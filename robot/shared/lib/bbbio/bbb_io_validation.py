@@ -1,7 +1,46 @@
+import functools
+
 from ace_bbsm import BBB_IO_CONSTANTS
 
 import BBB_IO_VALIDATION_CONSTANTS
 
+# The capabilities of a BBB pin, as bits of its capability bitmask
+DIGITAL_INPUT_CAPABILITY = 0x1
+DIGITAL_OUTPUT_CAPABILITY = 0x2
+ANALOG_INPUT_CAPABILITY = 0x4
+
+
+def _build_pin_capabilities():
+    """
+    :return: A dict of each BBB pin number to its capability bitmask
+    """
+    pin_capabilities = {}
+    for pin_number in BBB_IO_VALIDATION_CONSTANTS.DIGITAL_PINS:
+        pin_capabilities[pin_number] = pin_capabilities.get(pin_number, 0) | \
+            DIGITAL_INPUT_CAPABILITY | DIGITAL_OUTPUT_CAPABILITY
+    for pin_number in BBB_IO_VALIDATION_CONSTANTS.ANALOG_PINS:
+        pin_capabilities[pin_number] = pin_capabilities.get(pin_number, 0) | \
+            ANALOG_INPUT_CAPABILITY
+    return pin_capabilities
+
+
+# Built once, so that validating a pin is a single dict lookup
+PIN_CAPABILITIES = _build_pin_capabilities()
+I2C_BUSES = frozenset(BBB_IO_VALIDATION_CONSTANTS.I2C_BUSES)
+DIGITAL_OUTPUT_VALUES = frozenset([BBB_IO_CONSTANTS.DIGITAL_LOW,
+                                   BBB_IO_CONSTANTS.DIGITAL_HIGH])
+
+
+def _is_in(value, values):
+    """
+    :return: True if 'value' is in the frozenset or dict 'values'. An
+        unhashable value (e.g. a list given by robot) is in neither
+    """
+    try:
+        return value in values
+    except TypeError:
+        return False
+
 
 def validate_pin_type(pin_number, pin_type, is_output):
     """
@@ -14,12 +53,16 @@ def validate_pin_type(pin_number, pin_type, is_output):
     :return: None, if the pin type is valid. Otherwise raises an
         AssertionError
     """
+    pin_capabilities = PIN_CAPABILITIES[pin_number] \
+        if _is_in(pin_number, PIN_CAPABILITIES) else 0
     if pin_type == BBB_IO_CONSTANTS.DIGITAL_3V3:
-        if pin_number not in BBB_IO_VALIDATION_CONSTANTS.DIGITAL_PINS:
+        required_capability = DIGITAL_OUTPUT_CAPABILITY if is_output \
+            else DIGITAL_INPUT_CAPABILITY
+        if not pin_capabilities & required_capability:
             raise AssertionError(
                 "Cannot specify pin '{}' as a digital pin".format(pin_number))
     elif pin_type == BBB_IO_CONSTANTS.ANALOG_1V8:
-        if pin_number not in BBB_IO_VALIDATION_CONSTANTS.ANALOG_PINS:
+        if not pin_capabilities & ANALOG_INPUT_CAPABILITY:
             raise AssertionError(
                 "Cannot specify pin '{}' as an analog pin".format(pin_number))
         elif is_output:
@@ -40,8 +83,7 @@ def validate_bbb_output_value(output_type, value):
         raises an AssertionError
     """
     if output_type == BBB_IO_CONSTANTS.DIGITAL_3V3:
-        if value not in [BBB_IO_CONSTANTS.DIGITAL_LOW,
-                         BBB_IO_CONSTANTS.DIGITAL_HIGH]:
+        if not _is_in(value, DIGITAL_OUTPUT_VALUES):
             raise ValueError("'{}' is not a valid digital output value".format(
                 value))
     else:
@@ -49,6 +91,20 @@ def validate_bbb_output_value(output_type, value):
     return True
 
 
+def _run_cached(cached_validator, validator, *args):
+    """
+    Runs the 'cached_validator' (the functools.lru_cache of 'validator') on
+    the 'args', or the 'validator' itself if an argument is unhashable (e.g.
+    a list given by robot), so that an invalid argument always raises the
+    validation error rather than a TypeError from the cache
+    """
+    try:
+        hash(args)
+    except TypeError:
+        return validator(*args)
+    return cached_validator(*args)
+
+
 def validate_bbb_output(pin_number, output_type, value):
     """
     Validates that the given 'pin_number' can output 'output_type'
@@ -60,13 +116,23 @@ def validate_bbb_output(pin_number, output_type, value):
     :return: None, if the value is valid for the output type on the given
         pin. Otherwise raises an AssertionError
     """
+    _run_cached(_cached_validate_bbb_output, _validate_bbb_output,
+                pin_number, output_type, value)
+
+
+def _validate_bbb_output(pin_number, output_type, value):
     validate_pin_type(pin_number, output_type, is_output=True)
     validate_bbb_output_value(output_type, value)
 
 
+_cached_validate_bbb_output = functools.lru_cache(maxsize=None)(
+    _validate_bbb_output)
+
+
 def validate_i2c(i2cbus, chip_address, data_address, data):
     """
-    Validates that given I2C parameters are valid for the BBB
+    Validates that given I2C parameters are valid for the BBB. Valid
+    parameters are cached, so the hex values are only parsed once
 
     :param i2cbus: str: The I2C bus (e.g. "2")
     :param chip_address: str: the chip address (e.g. 0x27)
@@ -75,7 +141,12 @@ def validate_i2c(i2cbus, chip_address, data_address, data):
     :return: None, if the I2C parameters are valid for the BBB. Otherwise
         raises an AssertionError
     """
-    if i2cbus not in BBB_IO_VALIDATION_CONSTANTS.I2C_BUSES:
+    _run_cached(_cached_validate_i2c, _validate_i2c,
+                i2cbus, chip_address, data_address, data)
+
+
+def _validate_i2c(i2cbus, chip_address, data_address, data):
+    if not _is_in(i2cbus, I2C_BUSES):
         raise ValueError("i2cbus '{}' does not exist".format(
             i2cbus
         ))
@@ -95,6 +166,10 @@ def validate_i2c(i2cbus, chip_address, data_address, data):
             raise ValueError("I2C data must be non-negative")
 
 
+# bounded, as unlike the pins there are many possible I2C parameters
+_cached_validate_i2c = functools.lru_cache(maxsize=4096)(_validate_i2c)
+
+
 def validate_bbb_input(pin_number, input_type):
     """
     Validates that the given 'pin_number' can input 'input_type' on the BBB
@@ -104,4 +179,13 @@ def validate_bbb_input(pin_number, input_type):
     :return: None, if the input type is valid for the given
         pin. Otherwise raises an AssertionError
     """
+    _run_cached(_cached_validate_bbb_input, _validate_bbb_input,
+                pin_number, input_type)
+
+
+def _validate_bbb_input(pin_number, input_type):
     validate_pin_type(pin_number, input_type, is_output=False)
+
+
+_cached_validate_bbb_input = functools.lru_cache(maxsize=None)(
+    _validate_bbb_input)
@@ -0,0 +1,239 @@
+"""
+A client that queues the IO specifications sent to the BBB and sends them
+from a single background worker thread, so that the caller is not blocked
+while the BBB runs them and host side work (such as building and validating
+the IO specifications of the next test, or evaluating and logging the results
+of the previous one) overlaps with the BBB IO.
+
+Each QueuedBBBClient has its own connection, IO specifications and returned
+data. Requests are given increasing request IDs when they are submitted, and
+several requests can be queued at once, but they are not pipelined: the BBB
+runs one request at a time, so the worker sends each request only once the
+response of the previous one has been received. The returned data of a
+request can be waited for, or awaited from an asyncio event loop.
+
+bbb_io_manager keeps a module level QueuedBBBClient, and its keywords are
+synchronous wrappers over it.
+"""
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bbb_wire_format
+from bbb_device_state import DeviceState, get_device_effect
+from bbb_return_data import IndexedReturnData
+
+
+class BBBServerError(Exception):
+    def __init__(self, server_message):
+        super().__init__(server_message)
+
+
+class QueuedBBBClient:
+    def __init__(self, client, request_recorder=None):
+        """
+        :param client: The synchronous client used to communicate with the
+            BBB, e.g. the ace_bbsm Client or a BBBSimulatorClient
+        :param request_recorder: Optional RequestRecorder that records the
+            timing of every request
+        """
+        self.client = client
+        self.request_recorder = request_recorder
+        self.wire_format = bbb_wire_format.JSON_WIRE_FORMAT
+        self.io_to_send = []
+        self.bbb_return_data = IndexedReturnData()
+        # the state of the device under test after the last request that was
+        # run, updated by the worker thread
+        self.device_state = DeviceState()
+        # the BBB runs one request at a time, so a single worker sends the
+        # requests in the order they were submitted
+        self.__executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="bbb_request")
+        self.__lock = threading.Lock()
+        self.__next_request_id = 0
+        # request ID -> concurrent.futures.Future of the returned data
+        self.__pending_requests = {}
+
+    def connect(self, ip_address=None, port=None):
+        """
+        Connects to the BBB at 'ip_address' and 'port', or at the default
+        address of the client if no address is given
+
+        :param ip_address: Optional IP address of the BBB
+        :param port: Optional port number of the BBB
+        """
+        if ip_address is None:
+            self.client.connect_to_bbb()
+        else:
+            self.client.connect_to_bbb(ip_address, port)
+        self.wire_format = bbb_wire_format.JSON_WIRE_FORMAT
+        self.device_state.invalidate()
+
+    def disconnect(self):
+        """
+        Waits for the requests in flight to complete, then disconnects from
+        the BBB. The returned data of the completed requests can still be
+        received
+        """
+        with self.__lock:
+            pending_futures = list(self.__pending_requests.values())
+        for future in pending_futures:
+            future.exception()
+        self.client.disconnect_from_bbb()
+        self.wire_format = bbb_wire_format.JSON_WIRE_FORMAT
+        self.device_state.invalidate()
+
+    def negotiate_wire_format(self, requested_wire_format):
+        """
+        Asks the BBB to use 'requested_wire_format' for this connection
+
+        :param requested_wire_format: One of the bbb_wire_format wire formats
+        :return: True if the wire format is used, False if the client or the
+            BBB does not support it, in which case JSON is used
+        """
+        self.wire_format = bbb_wire_format.JSON_WIRE_FORMAT
+        if requested_wire_format == bbb_wire_format.JSON_WIRE_FORMAT:
+            return True
+        if not hasattr(self.client, "negotiate_wire_format"):
+            return False
+        if not self.client.negotiate_wire_format(requested_wire_format):
+            return False
+        self.wire_format = requested_wire_format
+        return True
+
+    def submit(self, io_specifications):
+        """
+        Queues the 'io_specifications' to be sent to the BBB in a single
+        request, without waiting for the BBB to run them
+
+        :param io_specifications: The list of IO specifications to send. The
+            list is copied, so it can be reused for the next request
+        :return: The ID of the request, to pass to 'receive' or 'wait'
+        """
+        return self.__submit(self.__request_response, list(io_specifications))
+
+    def submit_program(self, program):
+        """
+        Queues the already serialized request of an IOSpecProgram to be sent
+        to the BBB. See 'submit'
+
+        :param program: The IOSpecProgram to send
+        :return: The ID of the request, to pass to 'receive' or 'wait'
+        """
+        return self.__submit(self.__request_response_program, program)
+
+    def __submit(self, request_response, request):
+        with self.__lock:
+            request_id = self.__next_request_id
+            self.__next_request_id += 1
+            self.__pending_requests[request_id] = self.__executor.submit(
+                request_response, request)
+        return request_id
+
+    def get_in_flight_count(self):
+        """
+        :return: The number of submitted requests whose returned data has not
+            been received yet
+        """
+        with self.__lock:
+            return len(self.__pending_requests)
+
+    def __pop_request(self, request_id):
+        with self.__lock:
+            try:
+                return self.__pending_requests.pop(request_id)
+            except KeyError:
+                raise AssertionError(
+                    "No BBB request in flight with ID {}".format(request_id))
+
+    async def receive(self, request_id):
+        """
+        Waits for the BBB to run the request 'request_id' without blocking the
+        event loop
+
+        :param request_id: The ID returned by 'submit'
+        :return: The list of input values returned by the BBB, in the same
+            order as the input specifications
+        """
+        return await asyncio.wrap_future(self.__pop_request(request_id))
+
+    async def request_response(self, io_specifications):
+        """
+        Sends the 'io_specifications' to the BBB in a single request and
+        waits for its response without blocking the event loop. See 'submit'
+        """
+        return await self.receive(self.submit(io_specifications))
+
+    def wait(self, request_id):
+        """
+        Blocks until the BBB has run the request 'request_id', for callers
+        that are not running an event loop. See 'receive'
+        """
+        return self.__pop_request(request_id).result()
+
+    def __request_response(self, io_specifications):
+        """
+        Sends the 'io_specifications' to the BBB and waits for its response.
+        Runs on the worker thread
+        """
+        serialize_start_time = time.perf_counter()
+        if self.wire_format == bbb_wire_format.COMPACT_WIRE_FORMAT:
+            request = bbb_wire_format.encode_io_specifications(
+                io_specifications)
+        else:
+            request = json.dumps(io_specifications)
+        return self.__send_request(request, serialize_start_time,
+                                   get_device_effect(io_specifications))
+
+    def __request_response_program(self, program):
+        """
+        Sends the serialized request of the IOSpecProgram 'program' to the BBB
+        and waits for its response. Runs on the worker thread
+        """
+        serialize_start_time = time.perf_counter()
+        return self.__send_request(program.get_request(self.wire_format),
+                                   serialize_start_time, program.device_effect)
+
+    def __send_request(self, request, serialize_start_time, device_effect):
+        """
+        :param request: The serialized request, in the current wire format
+        :param serialize_start_time: The time.perf_counter() when serializing
+            the request started
+        :param device_effect: The effect of the request on the device under
+            test, see bbb_device_state.get_device_effect
+        :return: The list of input values returned by the BBB
+        """
+        # a reconnect (see bbb_connection.py) may mean that the BBB and the
+        # device under test have been reset
+        reconnect_count = getattr(self.client, "reconnect_count", 0)
+        network_start_time = time.perf_counter()
+        try:
+            if self.wire_format == bbb_wire_format.COMPACT_WIRE_FORMAT:
+                response = self.client.compact_request_response_bbb(request)
+                deserialize_start_time = time.perf_counter()
+                returned_data = bbb_wire_format.decode_returned_data(response)
+            else:
+                response = self.client.json_request_response_bbb(request)
+                deserialize_start_time = time.perf_counter()
+                returned_data = json.loads(response)
+        except Exception:
+            self.device_state.invalidate()
+            raise
+        if self.request_recorder is not None:
+            # the JSON is ASCII, so the length of either format is its size
+            # in bytes
+            self.request_recorder.record_request(
+                network_start_time - serialize_start_time,
+                deserialize_start_time - network_start_time,
+                time.perf_counter() - deserialize_start_time,
+                len(request), len(response))
+        if bbb_wire_format.ERROR_KEY in returned_data:
+            self.device_state.invalidate()
+            raise BBBServerError(returned_data[bbb_wire_format.ERROR_KEY])
+        if getattr(self.client, "reconnect_count", 0) != reconnect_count:
+            self.device_state.invalidate()
+        else:
+            self.device_state.update(device_effect)
+        return returned_data
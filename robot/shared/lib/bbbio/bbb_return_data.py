@@ -0,0 +1,54 @@
+"""
+Stores the input data returned by the BBB indexed by pin number, so that the
+values of a pin can be looked up without going through all of the returned
+data, e.g. for tests that sample the same analog input many times.
+"""
+from ace_bbsm import BBB_IO_CONSTANTS
+
+
+class IndexedReturnData:
+    def __init__(self):
+        # the input data dicts in the order they were returned by the BBB
+        self.returned_data = []
+        # pin number -> the values of the pin, in the order they were
+        # returned by the BBB
+        self.values_by_pin = {}
+
+    def __len__(self):
+        return len(self.returned_data)
+
+    def __iter__(self):
+        return iter(self.returned_data)
+
+    def __getitem__(self, index):
+        return self.returned_data[index]
+
+    def extend(self, returned_data):
+        """
+        Adds the input data returned by the BBB. Analog values are converted
+        to floats here, so that every lookup gets the converted value
+
+        :param returned_data: A list of input data dicts returned by the BBB
+        """
+        for data in returned_data:
+            if data.get(BBB_IO_CONSTANTS.INPUT_TYPE) == \
+                    BBB_IO_CONSTANTS.ANALOG_1V8:
+                data = dict(data)
+                data[BBB_IO_CONSTANTS.INPUT_VALUE] = float(
+                    data[BBB_IO_CONSTANTS.INPUT_VALUE])
+            self.returned_data.append(data)
+            self.values_by_pin.setdefault(
+                data[BBB_IO_CONSTANTS.PIN_NUMBER], []).append(
+                data[BBB_IO_CONSTANTS.INPUT_VALUE])
+
+    def clear(self):
+        self.returned_data.clear()
+        self.values_by_pin.clear()
+
+    def get_input_values(self, pin_number):
+        """
+        :param pin_number: The pin name on which the BBB has received input
+        :return: A list of the values of the pin, or an empty list if the BBB
+            has not returned any values for the pin
+        """
+        return list(self.values_by_pin.get(pin_number, []))
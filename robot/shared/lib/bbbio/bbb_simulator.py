@@ -0,0 +1,384 @@
+"""
+A local stand-in for the BBB server, used to run suites without a BeagleBone
+and a circuit card, e.g. to benchmark suite throughput on a machine with no
+hardware attached.
+
+The BBBSimulatorServer accepts the same JSON IO specifications as the BBB
+server and returns the same JSON input data (or {"Error": message}). The
+circuit card attached to the simulated BBB is modelled by a BBBDeviceModel
+subclass, which computes the value of each requested input from the outputs
+driven so far (see e.g. suites/bnc_card/bnc_card_simulator.py).
+
+Each request and response is sent as a single line of JSON, unless the
+compact wire format has been negotiated (see bbb_wire_format.py). The
+BBBSimulatorClient has the same methods as the ace_bbsm Client, and is used
+by bbb_io_manager instead of the ace_bbsm Client when the
+BBB_ENVIRONMENT_CONSTANTS.BBB_SIMULATOR_ENV_VAR environment variable is set.
+"""
+import json
+import random
+import socket
+import threading
+import time
+
+from ace_bbsm import BBB_IO_CONSTANTS
+
+import bbb_wire_format
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+ERROR_KEY = bbb_wire_format.ERROR_KEY
+
+
+class BBBSimulatorError(Exception):
+    """
+    Raised by a BBBDeviceModel for an IO specification that the BBB server
+    would reject. The message is returned to the client as an error response
+    """
+    pass
+
+
+class BBBDeviceModel:
+    """
+    Models the BBB pins and the circuit card attached to them.
+
+    The BBB sets all of its IOs to inputs when it receives a request, and
+    then applies the IO specifications of the request in order, so an input
+    only sees the outputs that were specified before it.
+
+    This base class models a BBB with nothing attached to it: digital inputs
+    read low, analog inputs read 0 and there are no I2C devices. Subclasses
+    override 'read_digital_input', 'read_analog_input' and 'write_i2c'
+    """
+
+    def __init__(self):
+        # the value of each BBB pin that is currently an output
+        self.driven_pins = {}
+
+    def reset_bbb_ios(self):
+        self.driven_pins.clear()
+
+    def set_digital_output(self, pin_number, value):
+        if value not in (BBB_IO_CONSTANTS.DIGITAL_LOW,
+                         BBB_IO_CONSTANTS.DIGITAL_HIGH):
+            raise BBBSimulatorError(
+                "Invalid digital output value {} for pin {}".format(
+                    value, pin_number))
+        self.driven_pins[pin_number] = value
+
+    def set_input(self, pin_number):
+        self.driven_pins.pop(pin_number, None)
+
+    def get_driven_value(self, pin_number):
+        """
+        :return: The value output on 'pin_number' by the BBB, or None if the
+            pin is an input
+        """
+        return self.driven_pins.get(pin_number)
+
+    def read_digital_input(self, pin_number):
+        """
+        :return: The digital value ("0" or "1") on the BBB input 'pin_number'
+        """
+        return BBB_IO_CONSTANTS.DIGITAL_LOW
+
+    def read_analog_input(self, pin_number):
+        """
+        :return: The analog value (normalized between 0 and 1) on the BBB
+            input 'pin_number'
+        """
+        return 0.0
+
+    def write_i2c(self, i2cbus, chip_address, data_address, data):
+        """
+        Writes 'data' to the register at 'data_address' of the I2C device
+        at 'chip_address' on 'i2cbus'. All arguments are ints
+        """
+        raise BBBSimulatorError(
+            "No I2C device at address {:#04x} on bus {}".format(
+                chip_address, i2cbus))
+
+    def run_io_specifications(self, io_specifications):
+        """
+        Applies the 'io_specifications' of a single request
+
+        :param io_specifications: The list of IO specification dicts sent by
+            the client
+        :return: The list of input data dicts, in the same order as the input
+            specifications
+        """
+        self.reset_bbb_ios()
+        returned_data = []
+        for spec in io_specifications:
+            try:
+                spec_type = spec[BBB_IO_CONSTANTS.SPEC_TYPE]
+                if spec_type == BBB_IO_CONSTANTS.SPEC_TYPE_OUTPUT:
+                    self.__run_output_specification(spec)
+                elif spec_type == BBB_IO_CONSTANTS.SPEC_TYPE_INPUT:
+                    returned_data.append(self.__run_input_specification(spec))
+                else:
+                    raise BBBSimulatorError(
+                        "Invalid spec type {}".format(spec_type))
+            except KeyError as e:
+                raise BBBSimulatorError(
+                    "IO specification {} is missing the {} value".format(
+                        spec, e))
+        return returned_data
+
+    def __run_output_specification(self, spec):
+        output_type = spec[BBB_IO_CONSTANTS.OUTPUT_TYPE]
+        if output_type == BBB_IO_CONSTANTS.DIGITAL_3V3:
+            self.set_digital_output(spec[BBB_IO_CONSTANTS.PIN_NUMBER],
+                                    spec[BBB_IO_CONSTANTS.OUTPUT_VALUE])
+        elif output_type == BBB_IO_CONSTANTS.I2C:
+            try:
+                i2c_values = [
+                    int(spec[BBB_IO_CONSTANTS.I2CBUS]),
+                    int(spec[BBB_IO_CONSTANTS.I2C_CHIP_ADDRESS], 16),
+                    int(spec[BBB_IO_CONSTANTS.I2C_DATA_ADDRESS], 16),
+                    int(spec[BBB_IO_CONSTANTS.I2C_DATA], 16)
+                ]
+            except (TypeError, ValueError):
+                raise BBBSimulatorError(
+                    "Invalid I2C specification {}".format(spec))
+            self.write_i2c(*i2c_values)
+        else:
+            raise BBBSimulatorError(
+                "Invalid output type {}".format(output_type))
+
+    def __run_input_specification(self, spec):
+        input_type = spec[BBB_IO_CONSTANTS.INPUT_TYPE]
+        pin_number = spec[BBB_IO_CONSTANTS.PIN_NUMBER]
+        self.set_input(pin_number)
+        if input_type == BBB_IO_CONSTANTS.DIGITAL_3V3:
+            input_value = self.read_digital_input(pin_number)
+        elif input_type == BBB_IO_CONSTANTS.ANALOG_1V8:
+            input_value = self.read_analog_input(pin_number)
+        else:
+            raise BBBSimulatorError(
+                "Invalid input type {}".format(input_type))
+        return {
+            BBB_IO_CONSTANTS.INPUT_TYPE: input_type,
+            BBB_IO_CONSTANTS.PIN_NUMBER: pin_number,
+            BBB_IO_CONSTANTS.INPUT_VALUE: input_value
+        }
+
+
+class BBBSimulatorServer:
+    """
+    Serves the requests of any number of BBBSimulatorClients using a single
+    BBBDeviceModel, i.e. all clients share the same simulated BBB and
+    circuit card, and requests are applied one at a time.
+
+    Every response is delayed by 'latency' seconds plus a uniformly
+    distributed random delay of up to +/- 'jitter' seconds to simulate the
+    network and the time taken by the BBB to apply the IO specifications
+    """
+
+    def __init__(self, device_model, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 latency=0.0, jitter=0.0, seed=None):
+        """
+        :param device_model: The BBBDeviceModel of the simulated BBB
+        :param host: The address to listen on
+        :param port: The port to listen on, or 0 for any free port (see
+            'self.port')
+        :param latency: The mean delay of each response, in seconds
+        :param jitter: The maximum random deviation from 'latency', in seconds
+        :param seed: Optional seed of the random delays
+        """
+        self.device_model = device_model
+        self.latency = latency
+        self.jitter = jitter
+        self.request_count = 0
+        self.__random = random.Random(seed)
+        self.__device_lock = threading.Lock()
+        self.__server_socket = socket.socket(socket.AF_INET,
+                                             socket.SOCK_STREAM)
+        self.__server_socket.setsockopt(socket.SOL_SOCKET,
+                                        socket.SO_REUSEADDR, 1)
+        self.__server_socket.bind((host, port))
+        self.__server_socket.listen()
+        self.host = host
+        self.port = self.__server_socket.getsockname()[1]
+        self.__accept_thread = None
+        self.__closed = False
+
+    def start(self):
+        """
+        Starts accepting connections in a background thread
+        """
+        self.__accept_thread = threading.Thread(target=self.serve_forever,
+                                                daemon=True)
+        self.__accept_thread.start()
+
+    def serve_forever(self):
+        """
+        Accepts connections until the server is closed
+        """
+        while True:
+            try:
+                connection, _ = self.__server_socket.accept()
+            except OSError:
+                # server socket has been closed
+                return
+            if self.__closed:
+                connection.close()
+                return
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self.__serve_connection,
+                             args=(connection,), daemon=True).start()
+
+    def close(self):
+        self.__closed = True
+        # wakes up the thread blocked in accept()
+        try:
+            socket.create_connection((self.host, self.port), 1).close()
+        except OSError:
+            pass
+        self.__server_socket.close()
+        if self.__accept_thread is not None:
+            self.__accept_thread.join()
+
+    def run_io_specifications(self, io_specifications):
+        """
+        :param io_specifications: The list of IO specification dicts of a
+            single request
+        :return: The list of input data dicts, or a dict with the ERROR_KEY
+        """
+        try:
+            with self.__device_lock:
+                self.request_count += 1
+                return self.device_model.run_io_specifications(
+                    io_specifications)
+        except BBBSimulatorError as e:
+            return {ERROR_KEY: str(e)}
+
+    def handle_json_request(self, request):
+        """
+        :param request: The JSON IO specifications of a single request, or a
+            wire format negotiation request
+        :return: A tuple of the JSON response to the request and the wire
+            format to use for the following requests
+        """
+        try:
+            io_specifications = json.loads(request)
+        except ValueError as e:
+            return json.dumps({ERROR_KEY: str(e)}), \
+                bbb_wire_format.JSON_WIRE_FORMAT
+        if isinstance(io_specifications, dict) and \
+                bbb_wire_format.WIRE_FORMAT_KEY in io_specifications:
+            wire_format = io_specifications[bbb_wire_format.WIRE_FORMAT_KEY]
+            if wire_format not in (bbb_wire_format.JSON_WIRE_FORMAT,
+                                   bbb_wire_format.COMPACT_WIRE_FORMAT):
+                return json.dumps({ERROR_KEY: "Unsupported wire format {}"
+                                  .format(wire_format)}), \
+                    bbb_wire_format.JSON_WIRE_FORMAT
+            return json.dumps({bbb_wire_format.WIRE_FORMAT_KEY: wire_format}), \
+                wire_format
+        if not isinstance(io_specifications, list):
+            returned_data = {ERROR_KEY: "IO specifications must be a list"}
+        else:
+            returned_data = self.run_io_specifications(io_specifications)
+        return json.dumps(returned_data), bbb_wire_format.JSON_WIRE_FORMAT
+
+    def handle_compact_request(self, request):
+        """
+        :param request: bytes: The compact IO specifications of a single
+            request
+        :return: bytes: The compact response to the request
+        """
+        try:
+            io_specifications = bbb_wire_format.decode_io_specifications(
+                request)
+        except bbb_wire_format.WireFormatError as e:
+            return bbb_wire_format.encode_returned_data({ERROR_KEY: str(e)})
+        return bbb_wire_format.encode_returned_data(
+            self.run_io_specifications(io_specifications))
+
+    def __get_delay(self):
+        return max(0.0, self.latency +
+                   self.__random.uniform(-self.jitter, self.jitter))
+
+    def __serve_connection(self, connection):
+        wire_format = bbb_wire_format.JSON_WIRE_FORMAT
+        with connection, connection.makefile('rb') as requests:
+            while True:
+                if wire_format == bbb_wire_format.COMPACT_WIRE_FORMAT:
+                    request = bbb_wire_format.read_frame(requests)
+                    if request is None:
+                        return
+                    response = bbb_wire_format.frame(
+                        self.handle_compact_request(request))
+                else:
+                    request = requests.readline()
+                    if not request:
+                        return
+                    if not request.strip():
+                        continue
+                    response, wire_format = self.handle_json_request(
+                        request.decode('utf-8'))
+                    response = (response + "\n").encode('utf-8')
+                delay = self.__get_delay()
+                if delay:
+                    time.sleep(delay)
+                try:
+                    connection.sendall(response)
+                except OSError:
+                    # client has disconnected
+                    return
+
+
+class BBBSimulatorClient:
+    """
+    Sends IO specifications to a BBBSimulatorServer. Has the same methods
+    as the ace_bbsm Client, plus the methods used for the compact wire format
+    """
+
+    def __init__(self):
+        self.__socket = None
+        self.__responses = None
+
+    def connect_to_bbb(self, ip_address=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.__socket = socket.create_connection((ip_address, int(port)))
+        self.__socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.__responses = self.__socket.makefile('rb')
+
+    def disconnect_from_bbb(self):
+        self.__responses.close()
+        self.__socket.close()
+        self.__responses = None
+        self.__socket = None
+
+    def json_request_response_bbb(self, json_to_send):
+        """
+        :param json_to_send: The JSON IO specifications to send
+        :return: The JSON response of the simulated BBB
+        """
+        self.__socket.sendall((json_to_send + "\n").encode('utf-8'))
+        response = self.__responses.readline()
+        if not response:
+            raise ConnectionError("The BBB simulator closed the connection")
+        return response.decode('utf-8')
+
+    def negotiate_wire_format(self, wire_format):
+        """
+        Asks the BBB to use 'wire_format' for the following requests on this
+        connection
+
+        :return: True if the BBB accepted the wire format
+        """
+        response = json.loads(self.json_request_response_bbb(json.dumps(
+            {bbb_wire_format.WIRE_FORMAT_KEY: wire_format})))
+        return isinstance(response, dict) and \
+            response.get(bbb_wire_format.WIRE_FORMAT_KEY) == wire_format
+
+    def compact_request_response_bbb(self, payload):
+        """
+        :param payload: bytes: The compact IO specifications to send
+        :return: bytes: The compact response of the simulated BBB
+        """
+        self.__socket.sendall(bbb_wire_format.frame(payload))
+        response = bbb_wire_format.read_frame(self.__responses)
+        if response is None:
+            raise ConnectionError("The BBB simulator closed the connection")
+        return response
@@ -0,0 +1,284 @@
+"""
+A compact binary encoding of the IO specifications sent to the BBB and of the
+input data returned by the BBB, used instead of JSON when both the client and
+the BBB server support it (see
+BBB_ENVIRONMENT_CONSTANTS.WIRE_FORMAT_ENV_VAR).
+
+The wire format is negotiated on each connection by sending the JSON request
+{"wire_format": "compact"}. A server that supports the compact wire format
+replies with the same JSON and then expects every following message to be a
+frame: a 4 byte big-endian payload length followed by the payload. Any other
+reply (e.g. an error from a server that does not know the request) means that
+JSON is kept for the connection.
+
+A request payload is a sequence of IO specification records. Each record
+starts with an opcode byte:
+- DIGITAL_OUTPUT_OPCODE, pin code, value (0 or 1)
+- I2C_OUTPUT_OPCODE, i2cbus, chip address, data address, data
+- I2C_OUTPUT_NO_DATA_OPCODE, i2cbus, chip address, data address
+- DIGITAL_INPUT_OPCODE, pin code
+- ANALOG_INPUT_OPCODE, pin code
+where every field is a single unsigned byte and the pin code of pin Px_y is
+(x - 8) * PINS_PER_HEADER + (y - 1).
+
+A response payload starts with a status byte. For OK_STATUS, it is followed
+by one record per input specification: the input opcode, the pin code and the
+value (one byte for a digital value, a little-endian float32 for an analog
+value). For ERROR_STATUS, it is followed by the UTF-8 error message.
+"""
+import struct
+
+from ace_bbsm import BBB_IO_CONSTANTS
+
+JSON_WIRE_FORMAT = "json"
+COMPACT_WIRE_FORMAT = "compact"
+WIRE_FORMAT_KEY = "wire_format"
+# Must match bbb_io_manager's check for server errors
+ERROR_KEY = "Error"
+
+FRAME_HEADER = struct.Struct(">I")
+
+# ---- OPCODES ----
+DIGITAL_OUTPUT_OPCODE = 0
+I2C_OUTPUT_OPCODE = 1
+I2C_OUTPUT_NO_DATA_OPCODE = 2
+DIGITAL_INPUT_OPCODE = 3
+ANALOG_INPUT_OPCODE = 4
+
+# ---- RESPONSE STATUSES ----
+OK_STATUS = 0
+ERROR_STATUS = 1
+
+# ---- PINS ----
+PIN_HEADERS = [8, 9]
+PINS_PER_HEADER = 46
+PIN_NUMBERS = ["P{}_{}".format(header, pin)
+               for header in PIN_HEADERS
+               for pin in range(1, PINS_PER_HEADER + 1)]
+PIN_CODES = {pin_number: pin_code
+             for pin_code, pin_number in enumerate(PIN_NUMBERS)}
+
+DIGITAL_VALUES = [BBB_IO_CONSTANTS.DIGITAL_LOW, BBB_IO_CONSTANTS.DIGITAL_HIGH]
+DIGITAL_VALUE_CODES = {value: code for code, value in enumerate(DIGITAL_VALUES)}
+
+DIGITAL_OUTPUT_RECORD = struct.Struct("BBB")
+I2C_OUTPUT_RECORD = struct.Struct("BBBBB")
+I2C_OUTPUT_NO_DATA_RECORD = struct.Struct("BBBB")
+INPUT_RECORD = struct.Struct("BB")
+DIGITAL_INPUT_VALUE_RECORD = struct.Struct("BBB")
+ANALOG_INPUT_VALUE_RECORD = struct.Struct("<BBf")
+
+
+class WireFormatError(ValueError):
+    pass
+
+
+def frame(payload):
+    """
+    :param payload: bytes: The payload of a message
+    :return: bytes: The message framed with its length
+    """
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def read_frame(binary_file):
+    """
+    Reads a single framed message
+
+    :param binary_file: A file object opened in binary mode (e.g. from
+        socket.makefile('rb'))
+    :return: bytes: The payload of the message, or None if the file ended
+        before the message
+    """
+    header = binary_file.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        return None
+    payload_length = FRAME_HEADER.unpack(header)[0]
+    payload = binary_file.read(payload_length)
+    if len(payload) < payload_length:
+        return None
+    return payload
+
+
+def _get_pin_code(pin_number):
+    try:
+        return PIN_CODES[pin_number]
+    except KeyError:
+        raise WireFormatError("Pin {} cannot be encoded".format(pin_number))
+
+
+def _get_pin_number(pin_code):
+    try:
+        return PIN_NUMBERS[pin_code]
+    except IndexError:
+        raise WireFormatError("Invalid pin code {}".format(pin_code))
+
+
+def encode_io_specifications(io_specifications):
+    """
+    :param io_specifications: The list of IO specification dicts to send to
+        the BBB (as built by bbb_io_manager)
+    :return: bytes: The request payload
+    """
+    payload = bytearray()
+    for spec in io_specifications:
+        if spec[BBB_IO_CONSTANTS.SPEC_TYPE] == \
+                BBB_IO_CONSTANTS.SPEC_TYPE_OUTPUT:
+            output_type = spec[BBB_IO_CONSTANTS.OUTPUT_TYPE]
+            if output_type == BBB_IO_CONSTANTS.DIGITAL_3V3:
+                payload += DIGITAL_OUTPUT_RECORD.pack(
+                    DIGITAL_OUTPUT_OPCODE,
+                    _get_pin_code(spec[BBB_IO_CONSTANTS.PIN_NUMBER]),
+                    DIGITAL_VALUE_CODES[spec[BBB_IO_CONSTANTS.OUTPUT_VALUE]])
+            elif output_type == BBB_IO_CONSTANTS.I2C:
+                i2c_fields = (int(spec[BBB_IO_CONSTANTS.I2CBUS]),
+                              int(spec[BBB_IO_CONSTANTS.I2C_CHIP_ADDRESS], 16),
+                              int(spec[BBB_IO_CONSTANTS.I2C_DATA_ADDRESS], 16))
+                if spec[BBB_IO_CONSTANTS.I2C_DATA] == "":
+                    payload += I2C_OUTPUT_NO_DATA_RECORD.pack(
+                        I2C_OUTPUT_NO_DATA_OPCODE, *i2c_fields)
+                else:
+                    payload += I2C_OUTPUT_RECORD.pack(
+                        I2C_OUTPUT_OPCODE, *i2c_fields,
+                        int(spec[BBB_IO_CONSTANTS.I2C_DATA], 16))
+            else:
+                raise WireFormatError(
+                    "Output type {} cannot be encoded".format(output_type))
+        else:
+            input_type = spec[BBB_IO_CONSTANTS.INPUT_TYPE]
+            if input_type == BBB_IO_CONSTANTS.DIGITAL_3V3:
+                opcode = DIGITAL_INPUT_OPCODE
+            elif input_type == BBB_IO_CONSTANTS.ANALOG_1V8:
+                opcode = ANALOG_INPUT_OPCODE
+            else:
+                raise WireFormatError(
+                    "Input type {} cannot be encoded".format(input_type))
+            payload += INPUT_RECORD.pack(
+                opcode, _get_pin_code(spec[BBB_IO_CONSTANTS.PIN_NUMBER]))
+    return bytes(payload)
+
+
+def decode_io_specifications(payload):
+    """
+    :param payload: bytes: A request payload
+    :return: The list of IO specification dicts in the request, in the same
+        form as they are sent in JSON
+    """
+    io_specifications = []
+    offset = 0
+    try:
+        while offset < len(payload):
+            opcode = payload[offset]
+            if opcode == DIGITAL_OUTPUT_OPCODE:
+                _, pin_code, value_code = DIGITAL_OUTPUT_RECORD.unpack_from(
+                    payload, offset)
+                offset += DIGITAL_OUTPUT_RECORD.size
+                io_specifications.append({
+                    BBB_IO_CONSTANTS.SPEC_TYPE:
+                        BBB_IO_CONSTANTS.SPEC_TYPE_OUTPUT,
+                    BBB_IO_CONSTANTS.OUTPUT_TYPE: BBB_IO_CONSTANTS.DIGITAL_3V3,
+                    BBB_IO_CONSTANTS.PIN_NUMBER: _get_pin_number(pin_code),
+                    BBB_IO_CONSTANTS.OUTPUT_VALUE: DIGITAL_VALUES[value_code]
+                })
+            elif opcode in (I2C_OUTPUT_OPCODE, I2C_OUTPUT_NO_DATA_OPCODE):
+                if opcode == I2C_OUTPUT_OPCODE:
+                    _, i2cbus, chip_address, data_address, data = \
+                        I2C_OUTPUT_RECORD.unpack_from(payload, offset)
+                    offset += I2C_OUTPUT_RECORD.size
+                    data = "{:#04x}".format(data)
+                else:
+                    _, i2cbus, chip_address, data_address = \
+                        I2C_OUTPUT_NO_DATA_RECORD.unpack_from(payload, offset)
+                    offset += I2C_OUTPUT_NO_DATA_RECORD.size
+                    data = ""
+                io_specifications.append({
+                    BBB_IO_CONSTANTS.SPEC_TYPE:
+                        BBB_IO_CONSTANTS.SPEC_TYPE_OUTPUT,
+                    BBB_IO_CONSTANTS.OUTPUT_TYPE: BBB_IO_CONSTANTS.I2C,
+                    BBB_IO_CONSTANTS.I2CBUS: str(i2cbus),
+                    BBB_IO_CONSTANTS.I2C_CHIP_ADDRESS:
+                        "{:#04x}".format(chip_address),
+                    BBB_IO_CONSTANTS.I2C_DATA_ADDRESS:
+                        "{:#04x}".format(data_address),
+                    BBB_IO_CONSTANTS.I2C_DATA: data
+                })
+            elif opcode in (DIGITAL_INPUT_OPCODE, ANALOG_INPUT_OPCODE):
+                _, pin_code = INPUT_RECORD.unpack_from(payload, offset)
+                offset += INPUT_RECORD.size
+                io_specifications.append({
+                    BBB_IO_CONSTANTS.SPEC_TYPE: BBB_IO_CONSTANTS.SPEC_TYPE_INPUT,
+                    BBB_IO_CONSTANTS.INPUT_TYPE:
+                        BBB_IO_CONSTANTS.DIGITAL_3V3
+                        if opcode == DIGITAL_INPUT_OPCODE
+                        else BBB_IO_CONSTANTS.ANALOG_1V8,
+                    BBB_IO_CONSTANTS.PIN_NUMBER: _get_pin_number(pin_code)
+                })
+            else:
+                raise WireFormatError("Invalid opcode {}".format(opcode))
+    except (struct.error, IndexError):
+        raise WireFormatError("Truncated IO specification at byte {}".format(
+            offset))
+    return io_specifications
+
+
+def encode_returned_data(returned_data):
+    """
+    :param returned_data: The list of input data dicts returned by the BBB,
+        or a dict with the ERROR_KEY
+    :return: bytes: The response payload
+    """
+    if isinstance(returned_data, dict):
+        return bytes([ERROR_STATUS]) + \
+            str(returned_data[ERROR_KEY]).encode('utf-8')
+    payload = bytearray([OK_STATUS])
+    for data in returned_data:
+        pin_code = _get_pin_code(data[BBB_IO_CONSTANTS.PIN_NUMBER])
+        if data[BBB_IO_CONSTANTS.INPUT_TYPE] == BBB_IO_CONSTANTS.DIGITAL_3V3:
+            payload += DIGITAL_INPUT_VALUE_RECORD.pack(
+                DIGITAL_INPUT_OPCODE, pin_code,
+                DIGITAL_VALUE_CODES[data[BBB_IO_CONSTANTS.INPUT_VALUE]])
+        else:
+            payload += ANALOG_INPUT_VALUE_RECORD.pack(
+                ANALOG_INPUT_OPCODE, pin_code,
+                float(data[BBB_IO_CONSTANTS.INPUT_VALUE]))
+    return bytes(payload)
+
+
+def decode_returned_data(payload):
+    """
+    :param payload: bytes: A response payload
+    :return: The list of input data dicts returned by the BBB, in the same
+        form as they are received in JSON, or a dict with the ERROR_KEY
+    """
+    if not payload:
+        raise WireFormatError("Empty response")
+    if payload[0] == ERROR_STATUS:
+        return {ERROR_KEY: payload[1:].decode('utf-8')}
+    returned_data = []
+    offset = 1
+    try:
+        while offset < len(payload):
+            if payload[offset] == DIGITAL_INPUT_OPCODE:
+                _, pin_code, value_code = \
+                    DIGITAL_INPUT_VALUE_RECORD.unpack_from(payload, offset)
+                offset += DIGITAL_INPUT_VALUE_RECORD.size
+                input_type = BBB_IO_CONSTANTS.DIGITAL_3V3
+                input_value = DIGITAL_VALUES[value_code]
+            elif payload[offset] == ANALOG_INPUT_OPCODE:
+                _, pin_code, input_value = \
+                    ANALOG_INPUT_VALUE_RECORD.unpack_from(payload, offset)
+                offset += ANALOG_INPUT_VALUE_RECORD.size
+                input_type = BBB_IO_CONSTANTS.ANALOG_1V8
+                # float32 has about 7 significant digits
+                input_value = round(input_value, 6)
+            else:
+                raise WireFormatError("Invalid opcode {}".format(
+                    payload[offset]))
+            returned_data.append({
+                BBB_IO_CONSTANTS.INPUT_TYPE: input_type,
+                BBB_IO_CONSTANTS.PIN_NUMBER: _get_pin_number(pin_code),
+                BBB_IO_CONSTANTS.INPUT_VALUE: input_value
+            })
+    except (struct.error, IndexError):
+        raise WireFormatError("Truncated input data at byte {}".format(offset))
+    return returned_data
@@ -0,0 +1,400 @@
+"""
+Measures where the time of a suite run goes by running a suite repeatedly
+against the BBB simulator (see bbbio/bbb_simulator.py).
+
+Every run of the suite is a separate robot process, as in a normal
+(non persistent) run of the TestManager. The following phases are timed:
+- robot_startup: from starting the robot process until the suite starts,
+  i.e. interpreter and robot startup, suite parsing and library imports
+- suite_parse: parsing the suite on its own (in this process)
+- test: each test, including its setup and teardown
+- keyword: <name>: each call of a bbb_io_manager keyword, e.g. the BBB
+  connection or the validation and round trip of the IO specifications
+- request: <stage>: each stage of every request sent to the BBB, i.e.
+  building, validating and serializing the IO specifications, the round trip
+  to the BBB and deserializing the response (see
+  bbbio/bbb_io_instrumentation.py)
+- robot_shutdown: from the end of the suite until the robot process exits,
+  i.e. writing the output, log and report files
+- suite_run: the whole robot process
+- excel_report: generating the excel report of a suite run
+- rebot: consolidating the output files of all the suite runs (once)
+
+The latency histogram (p50/p95/max) of every phase and the test throughput
+are printed and written to a JSON file so that the results of different
+commits can be compared.
+
+Run from robot/shared/testmanager with the same PYTHONPATH as RunTests.bat:
+
+    python Benchmark.py --iterations 10 --latency-ms 2 --output benchmark.json
+"""
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from robot.running import TestSuiteBuilder
+
+import ConfigManager
+import Listener
+import ProgressChannel
+from TestManager import TestManager
+from bbbio import BBB_ENVIRONMENT_CONSTANTS
+from manual import MANUAL_TEST_CONSTANTS
+from resultmanager.xml2excel import Xml2Excel, BATCH_SERIAL_FILENAME
+
+# The simulator of a suite is <suite_name>_simulator.py in the suite directory
+SIMULATOR_SCRIPT_FORMAT = "{}_simulator.py"
+# The file in the output directory of an iteration that the stage durations of
+# the BBB requests are written to
+BBB_INSTRUMENTATION_FILE_NAME = "bbb_requests.jsonl"
+# bbb_io_manager keywords are timed individually
+TIMED_KEYWORD_LIBRARY = "bbb_io_manager"
+
+DEFAULT_SUITE_NAME = "bnc_card"
+DEFAULT_ITERATIONS = 5
+DEFAULT_OUTPUT_FILE_NAME = "benchmark.json"
+
+# ---- PHASES ----
+ROBOT_STARTUP_PHASE = "robot_startup"
+SUITE_PARSE_PHASE = "suite_parse"
+TEST_PHASE = "test"
+KEYWORD_PHASE_FORMAT = "keyword: {}"
+REQUEST_STAGE_PHASE_FORMAT = "request: {}"
+ROBOT_SHUTDOWN_PHASE = "robot_shutdown"
+SUITE_RUN_PHASE = "suite_run"
+EXCEL_REPORT_PHASE = "excel_report"
+REBOT_PHASE = "rebot"
+
+
+def get_percentile(sorted_samples, percentile):
+    """
+    :param sorted_samples: A non-empty sorted list of samples
+    :param percentile: The percentile to get, between 0 and 100
+    :return: The nearest-rank percentile of the samples
+    """
+    rank = math.ceil(percentile / 100 * len(sorted_samples))
+    return sorted_samples[max(rank, 1) - 1]
+
+
+class PhaseTimings:
+    """
+    The durations (in ms) of every timed phase, in the order the phases were
+    first timed
+    """
+
+    def __init__(self):
+        self.samples = {}
+
+    def add(self, phase, elapsed_ms):
+        self.samples.setdefault(phase, []).append(elapsed_ms)
+
+    def add_since(self, phase, start_time):
+        """
+        :param start_time: The time.perf_counter() at the start of the phase
+        """
+        self.add(phase, (time.perf_counter() - start_time) * 1000)
+
+    def get_summary(self):
+        """
+        :return: A dict of the histogram of each phase, by phase name
+        """
+        summary = {}
+        for phase, samples in self.samples.items():
+            sorted_samples = sorted(samples)
+            summary[phase] = {
+                "count": len(samples),
+                "total_ms": sum(samples),
+                "mean_ms": sum(samples) / len(samples),
+                "p50_ms": get_percentile(sorted_samples, 50),
+                "p95_ms": get_percentile(sorted_samples, 95),
+                "max_ms": sorted_samples[-1]
+            }
+        return summary
+
+
+class Benchmark:
+    def __init__(self, robot_directory, suite_name, iterations,
+                 output_directory, latency_ms=0.0, jitter_ms=0.0):
+        """
+        :param robot_directory: The 'robot' directory of the framework
+        :param suite_name: The name of the suite to run
+        :param iterations: The number of times to run the suite
+        :param output_directory: The directory to write the robot output
+            files to
+        :param latency_ms: The mean response delay of the simulated BBB
+        :param jitter_ms: The maximum random deviation from 'latency_ms'
+        """
+        self.suite_name = suite_name
+        self.bbbio_directory = os.path.join(robot_directory, "shared", "lib",
+                                            "bbbio")
+        self.suite_directory = os.path.join(robot_directory, "suites",
+                                            suite_name)
+        self.iterations = iterations
+        self.output_directory = output_directory
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.timings = PhaseTimings()
+        self.test_count = 0
+        self.test_fail_count = 0
+        self.simulator_process = None
+        self.__simulator_port = None
+        self.__suite_start_time = None
+        self.__suite_end_time = None
+        self.__suite_depth = 0
+
+    def run(self):
+        """
+        Runs the benchmark
+
+        :return: The results of the benchmark, as a JSON serializable dict
+        """
+        self.start_simulator()
+        iteration_output_directories = []
+        try:
+            for iteration in range(self.iterations):
+                print("Running iteration {} of {}".format(iteration + 1,
+                                                          self.iterations),
+                      flush=True)
+                iteration_output_directory = os.path.join(
+                    self.output_directory, "iteration-{}".format(iteration))
+                iteration_output_directories.append(iteration_output_directory)
+                self.time_suite_parse()
+                self.run_iteration(iteration_output_directory)
+                self.time_excel_report(iteration_output_directory)
+        finally:
+            self.stop_simulator()
+        self.time_rebot(iteration_output_directories)
+        return self.get_results()
+
+    def start_simulator(self):
+        """
+        Starts the simulator of the suite in its own process, on any free port
+        """
+        simulator_script = os.path.join(
+            self.suite_directory, SIMULATOR_SCRIPT_FORMAT.format(
+                self.suite_name))
+        if not os.path.isfile(simulator_script):
+            raise AssertionError("Suite {} has no simulator {}".format(
+                self.suite_name, simulator_script))
+        environment = dict(os.environ)
+        environment["PYTHONPATH"] = os.pathsep.join(
+            [self.suite_directory, self.bbbio_directory,
+             environment.get("PYTHONPATH", "")])
+        self.simulator_process = subprocess.Popen(
+            [sys.executable, simulator_script, "--port", "0",
+             "--latency-ms", str(self.latency_ms),
+             "--jitter-ms", str(self.jitter_ms)],
+            stdout=subprocess.PIPE, env=environment, universal_newlines=True)
+        # e.g. "Simulating a BBB with a BNC card at 127.0.0.1:54321"
+        started_line = self.simulator_process.stdout.readline()
+        if not started_line:
+            raise AssertionError("The simulator could not be started")
+        self.__simulator_port = int(started_line.strip().rsplit(":", 1)[1])
+
+    def stop_simulator(self):
+        if self.simulator_process is not None:
+            self.simulator_process.terminate()
+            self.simulator_process.wait()
+
+    def generate_robot_args(self, iteration_output_directory):
+        config = {
+            ConfigManager.CONFIG_SUITE_NAME: self.suite_name,
+            ConfigManager.CONFIG_DIR_PATH: self.output_directory,
+            ConfigManager.CONFIG_PART_NUMBER: "000-0000-000",
+            ConfigManager.CONFIG_BATCH_MO_NUMBER: "00000000",
+            ConfigManager.CONFIG_SERIAL_NUMBER: "000",
+            ConfigManager.CONFIG_WORK_ORDER_JOB_NUMBER: "0000000000",
+            ConfigManager.CONFIG_STAFF_NAME: "Benchmark",
+            ConfigManager.CONFIG_INCLUDE_MANUAL_TESTS: False,
+            ConfigManager.CONFIG_REPEAT_TESTS: False
+        }
+        subprocess_args = TestManager.ROBOT_COMMAND + [
+            "--outputdir", iteration_output_directory,
+            "--doc", json.dumps(config),
+            "--listener", Listener.__file__,
+            "--console", "dotted"]
+        subprocess_args.extend(TestManager.generate_exclude_tags_subprocess_args(
+            [MANUAL_TEST_CONSTANTS.MANUAL_TEST_TAG]))
+        subprocess_args.append(self.suite_directory)
+        return subprocess_args
+
+    def run_iteration(self, iteration_output_directory):
+        """
+        Runs the suite once in a new robot process, timing the phases of the
+        run from the progress events sent by the robot process
+        """
+        self.__suite_start_time = None
+        self.__suite_end_time = None
+        self.__suite_depth = 0
+        progress_server = ProgressChannel.ProgressServer(
+            self.handle_progress_event)
+        environment = progress_server.get_client_environment()
+        environment[BBB_ENVIRONMENT_CONSTANTS.BBB_SIMULATOR_ENV_VAR] = "1"
+        environment[BBB_ENVIRONMENT_CONSTANTS.BBB_IP_ADDRESS_ENV_VAR] = \
+            "127.0.0.1"
+        environment[BBB_ENVIRONMENT_CONSTANTS.BBB_PORT_ENV_VAR] = \
+            str(self.__simulator_port)
+        instrumentation_file_path = os.path.join(
+            iteration_output_directory, BBB_INSTRUMENTATION_FILE_NAME)
+        environment[BBB_ENVIRONMENT_CONSTANTS.INSTRUMENTATION_FILE_ENV_VAR] = \
+            instrumentation_file_path
+
+        start_time = time.perf_counter()
+        try:
+            subprocess.run(self.generate_robot_args(iteration_output_directory),
+                           env=environment, check=False)
+            end_time = time.perf_counter()
+        finally:
+            progress_server.close()
+
+        self.timings.add(SUITE_RUN_PHASE, (end_time - start_time) * 1000)
+        self.add_request_stage_timings(instrumentation_file_path)
+        if self.__suite_start_time is None or self.__suite_end_time is None:
+            print("The suite was not run, so only the duration of the robot "
+                  "process was timed")
+            return
+        self.timings.add(ROBOT_STARTUP_PHASE,
+                         (self.__suite_start_time - start_time) * 1000)
+        self.timings.add(ROBOT_SHUTDOWN_PHASE,
+                         (end_time - self.__suite_end_time) * 1000)
+
+    def handle_progress_event(self, event):
+        event_type = event[ProgressChannel.EVENT_TYPE]
+        if event_type == ProgressChannel.START_SUITE:
+            if self.__suite_depth == 0:
+                self.__suite_start_time = time.perf_counter()
+            self.__suite_depth += 1
+        elif event_type == ProgressChannel.END_SUITE:
+            self.__suite_depth -= 1
+            if self.__suite_depth == 0:
+                self.__suite_end_time = time.perf_counter()
+        elif event_type == ProgressChannel.END_TEST:
+            self.test_count += 1
+            if event['status'] != ProgressChannel.PASS_STATUS:
+                self.test_fail_count += 1
+            self.timings.add(TEST_PHASE, event['duration_ms'])
+        elif event_type == ProgressChannel.END_KEYWORD:
+            if event['library'] == TIMED_KEYWORD_LIBRARY:
+                self.timings.add(KEYWORD_PHASE_FORMAT.format(event['name']),
+                                 event['duration_ms'])
+
+    def add_request_stage_timings(self, instrumentation_file_path):
+        """
+        Adds the duration of each stage of the BBB requests of an iteration,
+        as written by bbb_io_manager.log_bbb_request_timings
+
+        :param instrumentation_file_path: The JSON lines file of the
+            iteration, which does not exist if the suite did not log its
+            request timings
+        """
+        if not os.path.isfile(instrumentation_file_path):
+            return
+        with open(instrumentation_file_path) as instrumentation_file:
+            for line in instrumentation_file:
+                for stage, duration_ms in json.loads(line).items():
+                    self.timings.add(REQUEST_STAGE_PHASE_FORMAT.format(stage),
+                                     duration_ms)
+
+    def time_suite_parse(self):
+        start_time = time.perf_counter()
+        TestSuiteBuilder().build(self.suite_directory)
+        self.timings.add_since(SUITE_PARSE_PHASE, start_time)
+
+    def time_excel_report(self, iteration_output_directory):
+        start_time = time.perf_counter()
+        Xml2Excel(iteration_output_directory, iteration_output_directory,
+                  BATCH_SERIAL_FILENAME).run()
+        self.timings.add_since(EXCEL_REPORT_PHASE, start_time)
+
+    def time_rebot(self, iteration_output_directories):
+        rebot_args = [sys.executable, "-m", "robot.rebot",
+                      "--outputdir", self.output_directory,
+                      "--name", self.suite_name]
+        rebot_args.extend(os.path.join(directory, "output.xml")
+                          for directory in iteration_output_directories)
+        start_time = time.perf_counter()
+        subprocess.run(rebot_args, stdout=subprocess.DEVNULL, check=False)
+        self.timings.add_since(REBOT_PHASE, start_time)
+
+    def get_results(self):
+        suite_run_ms = sum(self.timings.samples.get(SUITE_RUN_PHASE, []))
+        tests_per_second = 0.0
+        if suite_run_ms:
+            tests_per_second = self.test_count / (suite_run_ms / 1000)
+        return {
+            "suite_name": self.suite_name,
+            "iterations": self.iterations,
+            "latency_ms": self.latency_ms,
+            "jitter_ms": self.jitter_ms,
+            "commit": get_commit(),
+            "test_count": self.test_count,
+            "test_fail_count": self.test_fail_count,
+            "tests_per_second": tests_per_second,
+            "phases": self.timings.get_summary()
+        }
+
+
+def get_commit():
+    """
+    :return: The git commit of the framework, or None if it is unknown
+    """
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"],
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL,
+                                universal_newlines=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def print_results(results):
+    print("\n{:<58}{:>7}{:>11}{:>11}{:>11}".format(
+        "Phase", "Count", "p50 (ms)", "p95 (ms)", "Max (ms)"))
+    for phase, histogram in results["phases"].items():
+        print("{:<58}{:>7}{:>11.2f}{:>11.2f}{:>11.2f}".format(
+            phase, histogram["count"], histogram["p50_ms"],
+            histogram["p95_ms"], histogram["max_ms"]))
+    print("\n{} tests ({} failed) at {:.2f} tests/s".format(
+        results["test_count"], results["test_fail_count"],
+        results["tests_per_second"]))
+    if results["test_fail_count"]:
+        print("Warning: some tests failed, so the timings may not be "
+              "representative")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark a suite against the BBB simulator")
+    parser.add_argument("--suite", default=DEFAULT_SUITE_NAME,
+                        help="The name of the suite to run")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS,
+                        help="The number of times to run the suite")
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="The mean response delay of the simulated BBB")
+    parser.add_argument("--jitter-ms", type=float, default=0.0,
+                        help="The maximum random deviation from the latency")
+    parser.add_argument("--output-dir",
+                        help="The directory to write the robot output files "
+                             "to (a temporary directory by default)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_FILE_NAME,
+                        help="The JSON file to write the results to")
+    args = parser.parse_args()
+
+    robot_directory = os.path.dirname(os.path.dirname(
+        os.path.dirname(os.path.abspath(__file__))))
+    output_directory = args.output_dir or tempfile.mkdtemp(
+        prefix="ace-benchmark-")
+    benchmark = Benchmark(robot_directory, args.suite, args.iterations,
+                          output_directory, args.latency_ms, args.jitter_ms)
+    benchmark_results = benchmark.run()
+    print_results(benchmark_results)
+    with open(args.output, 'w') as output_file:
+        json.dump(benchmark_results, output_file, indent=2)
+    print("\nThe results are stored in {} and the robot output files in "
+          "{}".format(args.output, output_directory))
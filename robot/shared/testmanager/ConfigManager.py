@@ -158,9 +158,14 @@ class ConfigManager:
     def save_config_as_default(self):
         self.save_config(self.__config_file_abspath)
 
-    def save_config(self, config_file_output_path):
+    def save_config(self, config_file_output_path, overrides=None):
+        """
+        :param config_file_output_path: The path to save the config to
+        :param overrides: Optional dict of config values to save in place of
+            the current config values (e.g. the serial number of a station)
+        """
         config_file = open(config_file_output_path, 'w')
-        config_file.write(json.dumps(self.__config))
+        config_file.write(json.dumps(self.get_config(overrides)))
         config_file.close()
 
     def get_default_config(self):
@@ -327,7 +332,18 @@ class ConfigManager:
         else:
             return default
 
-    def get_log_config_str(self):
+    def get_config(self, overrides=None):
+        """
+        :param overrides: Optional dict of config values to use in place of
+            the current config values
+        :return: A copy of the current config with the 'overrides' applied
+        """
+        config = dict(self.__config)
+        if overrides is not None:
+            config.update(overrides)
+        return config
+
+    def get_log_config_str(self, overrides=None):
         if self.__config == {}:
             self.get_default_config()
-        return json.dumps(self.__config)
+        return json.dumps(self.get_config(overrides))
@@ -1,13 +1,27 @@
+import hashlib
 import os
+import re
 import subprocess
 import sys
 
+REQUIREMENTS_FILE_NAME = "requirements.txt"
+DEPENDENCY_STAMP_FILE_NAME = "dependencies.stamp"
+# matches the distribution name at the start of a requirements.txt line
+REQUIREMENT_NAME_RE_PATTERN = r'^\s*([A-Za-z0-9][A-Za-z0-9._-]*)'
+
 
 class DependencyManager:
 
     @staticmethod
-    def install_dependencies():
-        """Verifies dependencies needed for robot framework are installed"""
+    def install_dependencies(stamp_file_abspath=None):
+        """
+        Verifies dependencies needed for robot framework are installed
+
+        :param stamp_file_abspath: Optional path to the stamp file holding a
+            hash of requirements.txt and of the installed versions of the
+            required distributions, as of the last pip install. When the hash
+            has not changed, pip is not run again.
+        """
 
         # check python version and verify we are using Python 3
         if sys.version[0] < '3':
@@ -28,13 +42,68 @@ class DependencyManager:
 
         print("Python 3 and pip is installed")
 
+        requirements_file_path = os.path.join(os.path.curdir,
+                                              REQUIREMENTS_FILE_NAME)
+        if stamp_file_abspath is not None and \
+                DependencyManager.read_stamp(stamp_file_abspath) == \
+                DependencyManager.get_dependency_stamp(requirements_file_path):
+            print("Dependencies are unchanged since they were last installed")
+            return
+
         # upgrade/install dependencies such as robot framework
         subprocess.run(["python", "-m", "pip", "install", "-q", "--user",
                         "--no-warn-script-location", "-r",
-                        os.path.join(os.path.curdir, "requirements.txt")],
+                        requirements_file_path],
                        shell=True, check=True)
         print("Robot framework is installed and up to date")
         print("PyQT5 is installed and up to date")
+        if stamp_file_abspath is not None:
+            DependencyManager.write_stamp(
+                stamp_file_abspath,
+                DependencyManager.get_dependency_stamp(requirements_file_path))
+
+    @staticmethod
+    def get_dependency_stamp(requirements_file_path):
+        """
+        Computes a hash of the requirements file, the python interpreter and
+        the installed version of every distribution in the requirements file
+
+        :param requirements_file_path: The path to requirements.txt
+        :return: str: The hex digest of the hash
+        """
+        # imported here as it is only available from python 3.8
+        from importlib import metadata
+
+        with open(requirements_file_path, 'rb') as requirements_file:
+            requirements = requirements_file.read()
+        stamp_hash = hashlib.sha256(requirements)
+        stamp_hash.update(sys.executable.encode('utf-8'))
+        stamp_hash.update(sys.version.encode('utf-8'))
+        for line in requirements.decode('utf-8').splitlines():
+            match = re.match(REQUIREMENT_NAME_RE_PATTERN, line)
+            if match is None:
+                # empty line or comment
+                continue
+            try:
+                version = metadata.version(match.group(1))
+            except metadata.PackageNotFoundError:
+                version = "not installed"
+            stamp_hash.update("{}=={}\n".format(match.group(1),
+                                                 version).encode('utf-8'))
+        return stamp_hash.hexdigest()
+
+    @staticmethod
+    def read_stamp(stamp_file_abspath):
+        try:
+            with open(stamp_file_abspath, 'r') as stamp_file:
+                return stamp_file.read().strip()
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def write_stamp(stamp_file_abspath, stamp):
+        with open(stamp_file_abspath, 'w') as stamp_file:
+            stamp_file.write(stamp)
 
     @staticmethod
     def upgrade_dependencies():
@@ -49,7 +118,7 @@ class DependencyManager:
         # upgrade/install dependencies such as robot framework
         subprocess.run(["python", "-m", "pip", "install", "--user",
                         "--upgrade", "--no-warn-script-location", "-r",
-                        os.path.join(os.path.curdir, "requirements.txt")],
+                        os.path.join(os.path.curdir, REQUIREMENTS_FILE_NAME)],
                        shell=True, check=True)
         print("Robot framework has been upgraded to the latest version")
         print("PyQT5 has been upgraded to the latest version")
@@ -1,13 +1,58 @@
-LISTENER_MESSAGE = 'Listener Message'
-PASS_MESSAGE = 'PASS'
-FAIL_MESSAGE = 'FAIL'
+import time
+
+import ProgressChannel
 
 
 class Listener:
-    ROBOT_LISTENER_API_VERSION = 3
+    ROBOT_LISTENER_API_VERSION = 2
+
+    def __init__(self):
+        self.progress_client = ProgressChannel.ProgressClient.from_environment()
+        # the time.perf_counter() at the start of each running test and
+        # keyword, innermost last. Robot's elapsed times are in whole ms,
+        # which is too coarse to time the keywords
+        self.start_times = []
+
+    def send(self, event_type, **fields):
+        if self.progress_client is not None:
+            self.progress_client.send(event_type, **fields)
+
+    def start_suite(self, name, attrs):
+        self.send(ProgressChannel.START_SUITE, name=name,
+                  longname=attrs['longname'], total_tests=attrs['totaltests'])
+
+    def end_suite(self, name, attrs):
+        self.send(ProgressChannel.END_SUITE, name=name,
+                  longname=attrs['longname'], status=attrs['status'],
+                  elapsed_ms=attrs['elapsedtime'])
+
+    def start_test(self, name, attrs):
+        self.start_times.append(time.perf_counter())
+        self.send(ProgressChannel.START_TEST, name=name,
+                  longname=attrs['longname'])
+
+    def end_test(self, name, attrs):
+        self.send(ProgressChannel.END_TEST, name=name,
+                  longname=attrs['longname'], status=attrs['status'],
+                  elapsed_ms=attrs['elapsedtime'],
+                  duration_ms=self.get_duration_ms())
+
+    def start_keyword(self, name, attrs):
+        self.start_times.append(time.perf_counter())
+
+    def end_keyword(self, name, attrs):
+        self.send(ProgressChannel.END_KEYWORD, name=attrs['kwname'],
+                  library=attrs['libname'], type=attrs['type'],
+                  status=attrs['status'], elapsed_ms=attrs['elapsedtime'],
+                  duration_ms=self.get_duration_ms())
+
+    def get_duration_ms(self):
+        """
+        :return: The duration of the test or keyword that has just ended, in
+            ms with sub-ms resolution
+        """
+        return (time.perf_counter() - self.start_times.pop()) * 1000
 
-    def end_test(self, data, result):
-        if result.passed:
-            print('\n{}:{}'.format(LISTENER_MESSAGE, PASS_MESSAGE))
-        else:
-            print('\n{}:{}'.format(LISTENER_MESSAGE, FAIL_MESSAGE))
+    def close(self):
+        if self.progress_client is not None:
+            self.progress_client.close()
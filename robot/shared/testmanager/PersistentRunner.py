@@ -0,0 +1,117 @@
+"""
+Runs a robot suite continuously inside a single long-lived python process.
+
+The suite is parsed once and the parsed model is then executed repeatedly,
+writing a new output file for every iteration. Because every iteration runs
+in the same process, libraries that keep module level state (such as the BBB
+connection in bbb_io_manager) are kept alive between iterations.
+
+This script accepts the same arguments as 'python -m robot' except for
+--output, --report and --log, which are generated for each iteration. The
+report and log of the iterations are not written if --report NONE and
+--log NONE are given (e.g. to only keep the output files of the iterations).
+
+Iterations are run until "STOP" is written to the stdin of this process.
+After each iteration has completed, a SUITE_COMPLETE event is sent over the
+progress channel (if the TestManager has started one) so that the TestManager
+can keep count of the completed suite runs.
+"""
+import datetime
+import os
+import sys
+import threading
+
+from robot.run import RobotFramework
+from robot.conf import RobotSettings
+from robot.model import ModelModifier
+from robot.output import LOGGER, pyloggingconf
+from robot.reporting import ResultWriter
+from robot.running import TestSuiteBuilder
+
+import ProgressChannel
+from bbbio import BBB_ENVIRONMENT_CONSTANTS
+
+STOP_REQUEST = "STOP"
+
+# Value of the --log and --report options that disables the file
+NO_OUTPUT_FILE = "NONE"
+
+
+def generate_datetime_str():
+    current_time = datetime.datetime.utcnow().isoformat("T")
+    current_time = current_time.replace(":", "-").replace(".", "-")
+    return current_time
+
+
+class PersistentRunner(RobotFramework):
+    def __init__(self):
+        super().__init__()
+        self.stop_requested = threading.Event()
+
+    def main(self, datasources, **options):
+        settings = RobotSettings(options)
+        LOGGER.register_console_logger(**settings.console_output_config)
+        builder = TestSuiteBuilder(settings['SuiteNames'],
+                                   included_extensions=settings.extension,
+                                   rpa=settings.rpa,
+                                   allow_empty_suite=settings.run_empty_suite)
+        suite = builder.build(*datasources)
+        settings.rpa = suite.rpa
+        if settings.pre_run_modifiers:
+            suite.visit(ModelModifier(settings.pre_run_modifiers,
+                                      settings.run_empty_suite, LOGGER))
+        suite.configure(**settings.suite_config)
+
+        progress_client = ProgressChannel.ProgressClient.from_environment()
+        return_code = 0
+        while not self.stop_requested.is_set():
+            return_code, output_path = self.run_iteration(suite, options)
+            if progress_client is not None:
+                progress_client.send(ProgressChannel.SUITE_COMPLETE,
+                                     output=output_path)
+        if progress_client is not None:
+            progress_client.close()
+        return return_code
+
+    @staticmethod
+    def run_iteration(suite, options):
+        """
+        Runs the already parsed 'suite' once, writing the output, report and
+        log files for the iteration in the output directory (except for the
+        report and log if they are disabled in the 'options')
+
+        :param suite: The parsed robot.running.TestSuite to run
+        :param options: The robot options given on the command line
+        :return: A tuple of the robot return code of the iteration and the
+            path to the output file of the iteration
+        """
+        run_datetime = generate_datetime_str()
+        iteration_options = dict(options)
+        iteration_options["output"] = "output-{}.xml".format(run_datetime)
+        for option in ("report", "log"):
+            if str(options.get(option)).upper() != NO_OUTPUT_FILE:
+                iteration_options[option] = "{}-{}.html".format(option,
+                                                                run_datetime)
+        settings = RobotSettings(iteration_options)
+        with pyloggingconf.robot_handler_enabled(settings.log_level):
+            result = suite.run(settings)
+            if settings.log or settings.report:
+                writer = ResultWriter(settings.output if settings.log
+                                      else result)
+                writer.write_results(settings.get_rebot_settings())
+        return result.return_code, settings.output
+
+    def wait_for_stop_request(self):
+        """Blocks until the TestManager asks for the iterations to stop"""
+        for line in sys.stdin:
+            if line.strip() == STOP_REQUEST:
+                break
+        # stdin is also closed if the TestManager exits unexpectedly
+        self.stop_requested.set()
+
+
+if __name__ == "__main__":
+    os.environ[BBB_ENVIRONMENT_CONSTANTS.PERSISTENT_CONNECTION_ENV_VAR] = "1"
+    runner = PersistentRunner()
+    threading.Thread(target=runner.wait_for_stop_request, daemon=True).start()
+    runner.execute_cli(sys.argv[1:])
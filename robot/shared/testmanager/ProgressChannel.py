@@ -0,0 +1,133 @@
+"""
+A local socket channel used by robot processes to report structured progress
+events (suite/test/keyword starts and ends) to the TestManager.
+
+Each event is sent as a single line of JSON. The TestManager starts a
+ProgressServer and passes its port to the robot process through the
+PORT_ENV_VAR environment variable. The robot process (i.e. the Listener and
+the PersistentRunner) then sends events using a ProgressClient.
+
+Robot's console output does not go through this channel and is printed
+directly by the robot process.
+"""
+import json
+import os
+import socket
+import threading
+
+PORT_ENV_VAR = "ACE_PROGRESS_CHANNEL_PORT"
+# Optional name of the source of the events (e.g. the test station name),
+# added to every event sent by a ProgressClient
+SOURCE_ENV_VAR = "ACE_PROGRESS_CHANNEL_SOURCE"
+HOST = "127.0.0.1"
+
+# ---- EVENT TYPES ----
+EVENT_TYPE = "event"
+EVENT_SOURCE = "source"
+START_SUITE = "start_suite"
+END_SUITE = "end_suite"
+START_TEST = "start_test"
+END_TEST = "end_test"
+END_KEYWORD = "end_keyword"
+# sent by the PersistentRunner after every suite run
+SUITE_COMPLETE = "suite_complete"
+
+# ---- TEST STATUSES ----
+PASS_STATUS = "PASS"
+FAIL_STATUS = "FAIL"
+
+
+class ProgressServer:
+    """
+    Receives progress events from any number of robot processes and calls
+    'event_handler' with each event (as a dict) in the order in which the
+    events were sent by each process.
+    """
+
+    def __init__(self, event_handler):
+        self.event_handler = event_handler
+        self.__server_socket = socket.socket(socket.AF_INET,
+                                             socket.SOCK_STREAM)
+        self.__server_socket.bind((HOST, 0))
+        self.__server_socket.listen()
+        self.port = self.__server_socket.getsockname()[1]
+        self.__connection_threads = []
+        self.__accept_thread = threading.Thread(target=self.__accept,
+                                                daemon=True)
+        self.__accept_thread.start()
+
+    def get_client_environment(self, source=None):
+        """
+        :param source: The optional source name that the ProgressClients
+            will add to their events
+        :return: A copy of the current environment variables with the
+            variables used by ProgressClients to connect to this server
+        """
+        environment = dict(os.environ)
+        environment[PORT_ENV_VAR] = str(self.port)
+        if source is not None:
+            environment[SOURCE_ENV_VAR] = source
+        return environment
+
+    def __accept(self):
+        while True:
+            try:
+                connection, _ = self.__server_socket.accept()
+            except OSError:
+                # server socket has been closed
+                return
+            connection_thread = threading.Thread(
+                target=self.__receive_events, args=(connection,), daemon=True)
+            self.__connection_threads.append(connection_thread)
+            connection_thread.start()
+
+    def __receive_events(self, connection):
+        with connection, connection.makefile('r', encoding='utf-8') as events:
+            for line in events:
+                if line.strip():
+                    self.event_handler(json.loads(line))
+
+    def close(self, timeout=5):
+        """
+        Stops accepting new connections and waits for the events already sent
+        by the connected processes to be handled
+
+        :param timeout: The maximum number of seconds to wait for each
+            connection to be closed by its robot process
+        """
+        self.__server_socket.close()
+        for connection_thread in self.__connection_threads:
+            connection_thread.join(timeout)
+
+
+class ProgressClient:
+    """
+    Sends progress events to the ProgressServer of the TestManager
+    """
+
+    def __init__(self, port, source=None):
+        self.source = source
+        self.__socket = socket.create_connection((HOST, port))
+        self.__socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    @staticmethod
+    def from_environment():
+        """
+        :return: A ProgressClient connected to the port given by the
+            PORT_ENV_VAR environment variable, or None if the variable is
+            not set
+        """
+        port = os.environ.get(PORT_ENV_VAR)
+        if not port:
+            return None
+        return ProgressClient(int(port), os.environ.get(SOURCE_ENV_VAR))
+
+    def send(self, event_type, **fields):
+        fields[EVENT_TYPE] = event_type
+        if self.source is not None:
+            fields[EVENT_SOURCE] = self.source
+        self.__socket.sendall(
+            (json.dumps(fields) + "\n").encode('utf-8'))
+
+    def close(self):
+        self.__socket.close()
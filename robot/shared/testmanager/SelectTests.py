@@ -1,5 +1,13 @@
+import json
+import os
+import sys
+
 from robot.api import SuiteVisitor, TestSuiteBuilder
 
+SUITE_INDEX_FILE_NAME = "suite_index.json"
+# the types of imports that are checked for changes in the suite index cache
+SUITE_INDEX_IMPORT_TYPES = ["Resource", "Variables"]
+
 
 class SelectTests(SuiteVisitor):
     def __init__(self, selected_test_list=None):
@@ -20,9 +28,133 @@ class SelectTests(SuiteVisitor):
         self.tests.append(test)
 
 
-def get_tests(suite_directory):
+class TestInfo:
+    """
+    The information about a test needed to list and select it, which can be
+    saved in the suite index cache (unlike a robot test model)
+    """
+
+    def __init__(self, name, longname, tags, source, lineno):
+        self.name = name
+        self.longname = longname
+        self.tags = tags
+        self.source = source
+        self.lineno = lineno
+
+    @staticmethod
+    def from_test(test):
+        return TestInfo(str(test.name), str(test.longname),
+                        [str(tag) for tag in test.tags], test.source,
+                        test.lineno)
+
+    def __str__(self):
+        return self.name
+
+
+def get_tests(suite_directory, suite_index_file_abspath=None):
+    """
+    Gets the tests of the suite in 'suite_directory'
+
+    Parsing the suite is slow, so when 'suite_index_file_abspath' is given,
+    the tests are cached in the suite index file and only parsed again once
+    one of the .robot files of the suite, or a resource or variable file
+    that they import, has changed (i.e. its modification time or size has
+    changed) or a .robot file has been added or removed.
+
+    :param suite_directory: The directory of the suite
+    :param suite_index_file_abspath: Optional path to the suite index cache
+    :return: The list of TestInfo of the tests in the suite
+    """
+    if suite_index_file_abspath is None:
+        return [TestInfo.from_test(test)
+                for test in parse_tests(suite_directory)[0]]
+
+    suite_directory = os.path.abspath(suite_directory)
+    suite_index = read_suite_index(suite_index_file_abspath)
+    cached_suite = suite_index.get(suite_directory)
+    if cached_suite is not None and \
+            cached_suite["files"] == get_file_stats(
+                get_robot_files(suite_directory) + cached_suite["imports"]):
+        return [TestInfo(**test) for test in cached_suite["tests"]]
+
+    tests, imports = parse_tests(suite_directory)
+    test_infos = [TestInfo.from_test(test) for test in tests]
+    suite_index[suite_directory] = {
+        "files": get_file_stats(get_robot_files(suite_directory) + imports),
+        "imports": imports,
+        "tests": [test_info.__dict__ for test_info in test_infos]
+    }
+    write_suite_index(suite_index_file_abspath, suite_index)
+    return test_infos
+
+
+def parse_tests(suite_directory):
+    """
+    Parses the suite in 'suite_directory'
+
+    :return: A tuple of the list of robot tests in the suite and the list of
+        paths to the resource and variable files imported by the suite
+    """
     builder = TestSuiteBuilder()
     testsuite = builder.build(suite_directory)
     finder = SelectTests()
     testsuite.visit(finder)
-    return finder.tests
+    return finder.tests, get_imported_files(testsuite)
+
+
+def get_imported_files(testsuite):
+    """
+    :return: The sorted list of paths to the resource and variable files
+        imported by 'testsuite' or any of its child suites that can be found
+    """
+    imported_files = set()
+    for suite_import in testsuite.resource.imports:
+        if suite_import.type not in SUITE_INDEX_IMPORT_TYPES:
+            continue
+        # imports are relative to the suite directory or the python path
+        for directory in [suite_import.directory] + sys.path:
+            import_path = os.path.join(directory, suite_import.name)
+            if os.path.isfile(import_path):
+                imported_files.add(os.path.abspath(import_path))
+                break
+    for child_suite in testsuite.suites:
+        imported_files.update(get_imported_files(child_suite))
+    return sorted(imported_files)
+
+
+def get_robot_files(suite_directory):
+    robot_files = []
+    for subdir, dirs, files in os.walk(suite_directory):
+        for file_name in files:
+            if file_name.endswith(".robot"):
+                robot_files.append(os.path.join(subdir, file_name))
+    return sorted(robot_files)
+
+
+def get_file_stats(file_paths):
+    """
+    :return: Dictionary of the modification time and size of each file in
+        'file_paths', which is None for a file that does not exist
+    """
+    file_stats = {}
+    for file_path in file_paths:
+        try:
+            stat = os.stat(file_path)
+            file_stats[file_path] = [stat.st_mtime_ns, stat.st_size]
+        except FileNotFoundError:
+            file_stats[file_path] = None
+    return file_stats
+
+
+def read_suite_index(suite_index_file_abspath):
+    try:
+        with open(suite_index_file_abspath, 'r') as suite_index_file:
+            return json.load(suite_index_file)
+    except (FileNotFoundError, json.decoder.JSONDecodeError):
+        # no cached suites yet, or the cache is not valid and is rebuilt
+        return {}
+
+
+def write_suite_index(suite_index_file_abspath, suite_index):
+    with open(suite_index_file_abspath, 'w') as suite_index_file:
+        json.dump(suite_index, suite_index_file)
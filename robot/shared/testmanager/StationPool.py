@@ -0,0 +1,96 @@
+"""
+The test stations used to run a suite on several DUTs at the same time.
+
+Each station is a BeagleBone (with its own IP address and port) connected to
+its own DUT (with its own serial number). The stations are read from a JSON
+file containing a list of stations, for example:
+
+    [
+        {"name": "Station 1", "ip_address": "192.168.7.2", "port": 8000,
+         "serial_number": "001"},
+        {"name": "Station 2", "ip_address": "192.168.8.2", "port": 8000,
+         "serial_number": "002"}
+    ]
+
+The TestManager runs one robot process per station. The BeagleBone endpoint
+of a station is passed to its robot process through environment variables
+that are read by bbb_io_manager.
+"""
+import json
+
+import ConfigManager
+from bbbio import BBB_ENVIRONMENT_CONSTANTS
+
+STATION_NAME_KEY = "name"
+STATION_IP_ADDRESS_KEY = "ip_address"
+STATION_PORT_KEY = "port"
+STATION_SERIAL_NUMBER_KEY = "serial_number"
+
+
+class Station:
+    def __init__(self, name, ip_address, port, serial_number):
+        self.name = name
+        self.ip_address = ip_address
+        self.port = port
+        self.serial_number = serial_number
+
+    def get_environment(self, environment):
+        """
+        :param environment: The environment variables to start the robot
+            process of this station with
+        :return: A copy of 'environment' with the BeagleBone endpoint of this
+            station added
+        """
+        station_environment = dict(environment)
+        station_environment[BBB_ENVIRONMENT_CONSTANTS.BBB_IP_ADDRESS_ENV_VAR] = \
+            self.ip_address
+        station_environment[BBB_ENVIRONMENT_CONSTANTS.BBB_PORT_ENV_VAR] = \
+            str(self.port)
+        return station_environment
+
+    def get_config_overrides(self):
+        """
+        :return: The config values that are specific to this station
+        """
+        return {ConfigManager.CONFIG_SERIAL_NUMBER: self.serial_number}
+
+    def __str__(self):
+        return "{} ({}:{}, SN {})".format(self.name, self.ip_address,
+                                          self.port, self.serial_number)
+
+
+def load_stations(stations_file_abspath):
+    """
+    Reads and validates the stations in the given stations file
+
+    :param stations_file_abspath: The path to the JSON stations file
+    :return: The list of Stations in the file
+    """
+    with open(stations_file_abspath, 'r') as stations_file:
+        stations_json = json.load(stations_file)
+    if not isinstance(stations_json, list) or not stations_json:
+        raise AssertionError("The stations file must contain a non-empty "
+                             "list of stations")
+
+    stations = []
+    for station_json in stations_json:
+        try:
+            station = Station(
+                name=ConfigManager.ConfigManager.validate_str(
+                    str(station_json[STATION_NAME_KEY])),
+                ip_address=ConfigManager.ConfigManager.validate_str(
+                    station_json[STATION_IP_ADDRESS_KEY]),
+                port=int(station_json[STATION_PORT_KEY]),
+                serial_number=ConfigManager.ConfigManager.validate_serial_number(
+                    str(station_json[STATION_SERIAL_NUMBER_KEY])))
+        except KeyError as e:
+            raise AssertionError("Station {} is missing the {} value".format(
+                station_json, e))
+        stations.append(station)
+
+    for key in ["name", "serial_number"]:
+        values = [getattr(station, key) for station in stations]
+        if len(set(values)) != len(values):
+            raise AssertionError("Each station must have a unique {}".format(
+                key))
+    return stations
@@ -1,27 +1,43 @@
-import datetime
 import os
 import subprocess
 import sys
 import copy
 import argparse
 import signal
+import threading
+import time
 
 from manual import MANUAL_TEST_CONSTANTS
 import Listener
+import PersistentRunner
+import ProgressChannel
 import SelectTests
+import StationPool
 from resultmanager.xml2excel import Xml2Excel, DEFAULT_FILENAME, BATCH_SERIAL_FILENAME
+from resultmanager.result_aggregator import ResultAggregator, DEFAULT_STATE_FILENAME
+from resultmanager.result_store import ResultStore, DEFAULT_DATABASE_FILENAME
 
 import ConfigManager
-from DependencyManager import DependencyManager
+from DependencyManager import DependencyManager, DEPENDENCY_STAMP_FILE_NAME
 
 from gui.GUI import GUI
 from PyQt5 import QtWidgets
 
 
+# Name of the output xml file that robot writes when --output is not given
+ROBOT_OUTPUT_FILENAME = "output.xml"
+# Value of the --log and --report robot options that disables the file
+ROBOT_NO_OUTPUT_FILE = "NONE"
+
+
 class TestManager:
     APPDATA_SUBDIRECTORY_NAME = "ACE Test Framework"
+    STOP_REQUEST_POLL_INTERVAL = 0.5
+    ROBOT_COMMAND = ["python", "-m", "robot"]
 
-    def __init__(self, in_gui_mode=True):
+    def __init__(self, in_gui_mode=True, persistent_runner=False,
+                 stations=None, lean_iterations=False,
+                 remove_passed_keywords=False):
         self.robot_directory = os.path.dirname(
             os.path.dirname(os.path.abspath(os.path.curdir)))
         self.base_directory = os.path.dirname(self.robot_directory)
@@ -31,19 +47,39 @@ class TestManager:
 
 
         self.__in_gui_mode = in_gui_mode
+        self.__persistent_runner = persistent_runner
+        self.__stations = stations
+        # when running tests continuously, only write the output xml file of
+        # each suite run, the log and report are generated at consolidation
+        self.__lean_iterations = lean_iterations
+        self.__remove_passed_keywords = remove_passed_keywords
         self.__gui = None
         self.robot_process = None
+        # the robot processes of each station (by station name) when running
+        # with a station pool
+        self.station_processes = {}
+        # the ResultAggregator of each station (by station name, or None when
+        # not running with a station pool) when running tests continuously
+        self.result_aggregators = {}
+        # the ResultStore that the results of every suite run are stored in,
+        # in the directory selected by the user to save test results in
+        self.result_store = None
+        self.__progress_lock = threading.Lock()
         self.stop_tests = False
         self.emergency_stop_flag = False
         self.suite_count = 0
         self.test_fail_count = 0
         self.test_pass_count = 0
+        self.current_test_name = None
+        self.last_test_elapsed_ms = None
 
         self.xml_formatter = None
 
     def setup_and_run_framework(self):
         """Entry point to the ace-test-framework"""
-        DependencyManager.install_dependencies()
+        DependencyManager.install_dependencies(os.path.join(
+            os.path.dirname(self.config_file_abspath),
+            DEPENDENCY_STAMP_FILE_NAME))
         if self.__in_gui_mode:
             self.config_manager.get_default_config()
             app = QtWidgets.QApplication(sys.argv)
@@ -57,16 +93,93 @@ class TestManager:
         return 0
 
     def run_suites(self, test_runner_worker=None):
-        suite_name = self.config_manager.get(ConfigManager.CONFIG_SUITE_NAME)
-        suite_directory = os.path.join(self.robot_directory, "suites",
-                                       suite_name)
+        if self.__stations:
+            self.run_station_pool(test_runner_worker)
+            return
+
+        suite_directory = self.get_suite_directory()
         main_test_output_directory = self.config_manager.get(
             ConfigManager.CONFIG_DIR_PATH)
 
+        self.result_store = ResultStore(os.path.join(
+            main_test_output_directory, DEFAULT_DATABASE_FILENAME))
+
         print("Starting tests now")
         run_continuously = self.config_manager.get_bool(
             ConfigManager.CONFIG_REPEAT_TESTS)
-        results_parent_directory = self.get_results_directory(main_test_output_directory)
+        output_directory, individual_output_directory, test_output_directory = \
+            self.setup_output_directories(main_test_output_directory,
+                                          run_continuously)
+        subprocess_args = self.generate_robot_args(test_output_directory)
+
+        if not run_continuously:
+            try:
+                subprocess_args.append("{}/*.robot".format(suite_directory))
+                self.run_process(subprocess_args, test_runner_worker)
+            except KeyboardInterrupt:
+                self.emergency_stop_flag = True
+            self.result_store.ingest(
+                os.path.join(test_output_directory, ROBOT_OUTPUT_FILENAME))
+            self.generate_excel_report(test_output_directory)
+            self.print_tests_complete_message(output_directory)
+
+            return
+
+        result_aggregator = ResultAggregator(
+            os.path.join(output_directory, DEFAULT_STATE_FILENAME),
+            self.result_store)
+        self.result_aggregators[None] = result_aggregator
+
+        if self.__persistent_runner:
+            try:
+                runner_args = self.generate_persistent_runner_args(
+                    subprocess_args, suite_directory, self.__lean_iterations)
+                self.run_persistent_process(runner_args, test_runner_worker)
+            except KeyboardInterrupt:
+                self.emergency_stop_flag = True
+            self.consolidate_reports(output_directory,
+                                     individual_output_directory,
+                                     result_aggregator=result_aggregator)
+            return
+
+        try:
+            while self.stop_tests is False:
+                run_datetime = TestManager.generate_datetime_str()
+                current_run_args = TestManager.generate_iteration_args(
+                    subprocess_args, suite_directory, run_datetime,
+                    self.__lean_iterations)
+                self.run_process(current_run_args, test_runner_worker)
+                result_aggregator.ingest(TestManager.get_iteration_output_path(
+                    test_output_directory, run_datetime))
+                if test_runner_worker is not None:
+                    test_runner_worker.progress.emit()
+        except KeyboardInterrupt:
+            self.emergency_stop_flag = True
+        self.consolidate_reports(output_directory, individual_output_directory,
+                                 result_aggregator=result_aggregator)
+
+    def setup_output_directories(self, main_test_output_directory,
+                                 run_continuously, station=None):
+        """
+        Creates the output directory for a run of the suite and saves the
+        config used for the run in it
+
+        :param main_test_output_directory: The directory selected by the user
+            to save test results in
+        :param run_continuously: True if the suite will be run continuously
+        :param station: The StationPool.Station the suite will be run on, or
+            None if not running with a station pool
+        :return: A tuple of the output directory, the directory for the
+            individual suite runs and the directory that robot should write
+            its output files to
+        """
+        config_overrides = None
+        serial_number = None
+        if station is not None:
+            config_overrides = station.get_config_overrides()
+            serial_number = station.serial_number
+        results_parent_directory = self.get_results_directory(
+            main_test_output_directory, serial_number)
         output_directory = os.path.join(results_parent_directory,
                                         TestManager.generate_datetime_str())
         try:
@@ -79,16 +192,31 @@ class TestManager:
 
         config_file_output_name = os.path.join(output_directory,
                                                ConfigManager.CONFIG_FILE_NAME)
-        self.config_manager.save_config(config_file_output_name)
+        self.config_manager.save_config(config_file_output_name,
+                                        config_overrides)
 
         if run_continuously:
             test_output_directory = individual_output_directory
         else:
             test_output_directory = output_directory
+        return output_directory, individual_output_directory, \
+            test_output_directory
 
-        subprocess_args = ["python", "-m", "robot", "--outputdir",
-                           test_output_directory,
-                           "--doc", self.config_manager.get_log_config_str()]
+    def generate_robot_args(self, test_output_directory, station=None):
+        """
+        :param test_output_directory: The directory robot should write its
+            output files to
+        :param station: The StationPool.Station the suite will be run on, or
+            None if not running with a station pool
+        :return: The subprocess arguments to run robot with (without the
+            suite to run)
+        """
+        config_overrides = None
+        if station is not None:
+            config_overrides = station.get_config_overrides()
+        subprocess_args = TestManager.ROBOT_COMMAND + [
+            "--outputdir", test_output_directory,
+            "--doc", self.config_manager.get_log_config_str(config_overrides)]
 
         if not self.__in_gui_mode:
             include_manual_tests = self.config_manager.get_bool(
@@ -103,33 +231,187 @@ class TestManager:
             selected_tests_list = self.__gui.select_tests_window.selected_tests_list
             subprocess_args.extend(["--prerunmodifier", "{}:{}".format(
                 SelectTests.__file__, selected_tests_list)])
+        return subprocess_args
 
-        if not run_continuously:
-            try:
-                subprocess_args.append("{}/*.robot".format(suite_directory))
-                self.run_process(subprocess_args, test_runner_worker)
-            except KeyboardInterrupt:
-                self.emergency_stop_flag = True
-            self.generate_excel_report(test_output_directory)
-            self.print_tests_complete_message(output_directory)
+    @staticmethod
+    def generate_persistent_runner_args(subprocess_args, suite_directory,
+                                        lean_iterations=False):
+        runner_args = ["python", PersistentRunner.__file__]
+        runner_args.extend(subprocess_args[len(TestManager.ROBOT_COMMAND):])
+        if lean_iterations:
+            runner_args.extend(["--report", ROBOT_NO_OUTPUT_FILE,
+                                "--log", ROBOT_NO_OUTPUT_FILE])
+        runner_args.append("{}/*.robot".format(suite_directory))
+        return runner_args
 
-            return
+    @staticmethod
+    def generate_iteration_args(subprocess_args, suite_directory, run_datetime,
+                                lean_iterations=False):
+        """
+        :param lean_iterations: True to only write the output xml file of the
+            suite run, without its report and log
+        :return: The subprocess arguments to run the suite once while running
+            tests continuously
+        """
+        current_run_args = copy.deepcopy(subprocess_args)
+        current_run_args.extend(
+            ["--output", "output-{}.xml".format(run_datetime)])
+        if lean_iterations:
+            current_run_args.extend(["--report", ROBOT_NO_OUTPUT_FILE,
+                                     "--log", ROBOT_NO_OUTPUT_FILE])
+        else:
+            current_run_args.extend(
+                ["--report", "report-{}.html".format(run_datetime),
+                 "--log", "log-{}.html".format(run_datetime)])
+        current_run_args.append("{}/*.robot".format(suite_directory))
+        return current_run_args
+
+    @staticmethod
+    def get_iteration_output_path(test_output_directory, run_datetime):
+        return os.path.join(test_output_directory,
+                            "output-{}.xml".format(run_datetime))
+
+    def run_station_pool(self, test_runner_worker=None):
+        """
+        Runs the suite on every station of the station pool at the same time,
+        with one robot process per station. The results of each station are
+        stored in the results directory of the serial number of its DUT.
+        """
+        suite_directory = self.get_suite_directory()
+        main_test_output_directory = self.config_manager.get(
+            ConfigManager.CONFIG_DIR_PATH)
 
+        self.result_store = ResultStore(os.path.join(
+            main_test_output_directory, DEFAULT_DATABASE_FILENAME))
+
+        print("Starting tests now on {} stations:".format(len(self.__stations)))
+        for station in self.__stations:
+            print("  {}".format(station))
+        run_continuously = self.config_manager.get_bool(
+            ConfigManager.CONFIG_REPEAT_TESTS)
+
+        # also used without the GUI to receive the completed suite runs of
+        # PersistentRunners
+        progress_server = ProgressChannel.ProgressServer(
+            lambda event: self.handle_progress_event(event,
+                                                     test_runner_worker))
+        output_directories = []
+        station_threads = []
+        for station in self.__stations:
+            output_directory, individual_output_directory, \
+                test_output_directory = self.setup_output_directories(
+                    main_test_output_directory, run_continuously, station)
+            output_directories.append(output_directory)
+            if run_continuously:
+                self.result_aggregators[station.name] = ResultAggregator(
+                    os.path.join(output_directory, DEFAULT_STATE_FILENAME),
+                    self.result_store)
+            station_thread = threading.Thread(
+                target=self.run_station,
+                args=(station, suite_directory, run_continuously,
+                      output_directory, individual_output_directory,
+                      test_output_directory, progress_server,
+                      test_runner_worker))
+            station_threads.append(station_thread)
+            station_thread.start()
         try:
-            while self.stop_tests is False:
-                current_run_args = copy.deepcopy(subprocess_args)
-                run_datetime = TestManager.generate_datetime_str()
-                current_run_args.extend(
-                    ["--output", "output-{}.xml".format(run_datetime),
-                     "--report", "report-{}.html".format(run_datetime),
-                     "--log", "log-{}.html".format(run_datetime)])
-                current_run_args.append("{}/*.robot".format(suite_directory))
-                self.run_process(current_run_args, test_runner_worker)
-                if test_runner_worker is not None:
-                    test_runner_worker.progress.emit()
+            for station_thread in station_threads:
+                station_thread.join()
         except KeyboardInterrupt:
             self.emergency_stop_flag = True
-        self.consolidate_reports(output_directory, individual_output_directory)
+            for station_thread in station_threads:
+                station_thread.join()
+        finally:
+            progress_server.close()
+
+        for station, output_directory in zip(self.__stations,
+                                             output_directories):
+            print("Results of {} are stored in {}".format(station.name,
+                                                          output_directory))
+        self.print_tests_complete_message(
+            os.path.commonpath(output_directories))
+
+    def run_station(self, station, suite_directory, run_continuously,
+                    output_directory, individual_output_directory,
+                    test_output_directory, progress_server,
+                    test_runner_worker):
+        """
+        Runs the suite on a single station of the station pool. This is run
+        in its own thread for each station.
+        """
+        environment = station.get_environment(
+            progress_server.get_client_environment(station.name))
+        result_aggregator = self.result_aggregators.get(station.name)
+        subprocess_args = self.generate_robot_args(test_output_directory,
+                                                   station)
+
+        try:
+            if not run_continuously:
+                subprocess_args.append("{}/*.robot".format(suite_directory))
+                self.run_station_process(station, subprocess_args, environment)
+                self.result_store.ingest(os.path.join(test_output_directory,
+                                                      ROBOT_OUTPUT_FILENAME))
+                self.report_suite_complete(test_runner_worker)
+            elif self.__persistent_runner:
+                runner_args = self.generate_persistent_runner_args(
+                    subprocess_args, suite_directory, self.__lean_iterations)
+                threading.Thread(target=self.forward_stop_request,
+                                 args=(station.name,), daemon=True).start()
+                self.run_station_process(station, runner_args, environment,
+                                         stdin=subprocess.PIPE)
+            else:
+                while self.stop_tests is False:
+                    run_datetime = TestManager.generate_datetime_str()
+                    current_run_args = TestManager.generate_iteration_args(
+                        subprocess_args, suite_directory, run_datetime,
+                        self.__lean_iterations)
+                    self.run_station_process(station, current_run_args,
+                                             environment)
+                    result_aggregator.ingest(
+                        TestManager.get_iteration_output_path(
+                            test_output_directory, run_datetime))
+                    self.report_suite_complete(test_runner_worker)
+        except KeyboardInterrupt:
+            self.emergency_stop_flag = True
+
+        if run_continuously:
+            self.consolidate_reports(output_directory,
+                                     individual_output_directory,
+                                     print_complete_message=False,
+                                     result_aggregator=result_aggregator)
+        else:
+            self.generate_excel_report(test_output_directory)
+
+    def run_station_process(self, station, subprocess_args, environment,
+                            stdin=None):
+        station_process = subprocess.Popen(subprocess_args, shell=True,
+                                           stdin=stdin, env=environment,
+                                           universal_newlines=True)
+        self.station_processes[station.name] = station_process
+        station_process.wait()
+
+    def report_suite_complete(self, test_runner_worker):
+        with self.__progress_lock:
+            self.suite_count += 1
+        if test_runner_worker is not None:
+            test_runner_worker.progress.emit()
+
+    def get_robot_processes(self):
+        """
+        :return: The list of robot processes that have been started, i.e. the
+            robot process of every station when running with a station pool,
+            otherwise the single robot process (if it has been started)
+        """
+        if self.__stations:
+            return list(self.station_processes.values())
+        if self.robot_process is None:
+            return []
+        return [self.robot_process]
+
+    def get_robot_process(self, station_name=None):
+        if station_name is None:
+            return self.robot_process
+        return self.station_processes.get(station_name)
 
     def run_process(self, subprocess_args, test_runner_worker):
         if test_runner_worker is not None:
@@ -138,74 +420,192 @@ class TestManager:
             self.run_process_without_communication(subprocess_args)
         self.suite_count += 1
 
-    def run_process_with_live_count(self, subprocess_args, test_runner_worker):
-        for message in self.run_process_with_communication(subprocess_args):
-            split_message = message.split(':')
-            if split_message[0].strip() == Listener.LISTENER_MESSAGE:
-                if split_message[1].strip() == Listener.FAIL_MESSAGE:
-                    self.test_fail_count += 1
-                    test_runner_worker.progress.emit()
-                elif split_message[1].strip() == Listener.PASS_MESSAGE:
+    def run_persistent_process(self, runner_args, test_runner_worker):
+        """
+        Runs the suite continuously in a single PersistentRunner process until
+        the tests are stopped. The PersistentRunner parses the suite once and
+        keeps the BBB connection open between suite runs, so there is no
+        per-run process startup, suite parsing or BBB reconnection overhead.
+
+        :param runner_args: The subprocess arguments to start the
+            PersistentRunner with
+        :param test_runner_worker: The GUI worker to report progress to, or
+            None if running without the GUI
+        """
+        self.robot_process = None
+        threading.Thread(target=self.forward_stop_request, daemon=True).start()
+        # the progress channel is also used without the GUI to receive the
+        # output file of each completed suite run
+        self.run_process_with_live_count(runner_args, test_runner_worker,
+                                         stdin=subprocess.PIPE)
+
+    def forward_stop_request(self, station_name=None):
+        """
+        Waits for the tests to be stopped, then asks the running
+        PersistentRunner to stop once its current suite run is finished
+
+        :param station_name: The name of the station running the
+            PersistentRunner, or None if not running with a station pool
+        """
+        while not self.stop_tests:
+            robot_process = self.get_robot_process(station_name)
+            if robot_process is not None and robot_process.poll() is not None:
+                return
+            time.sleep(TestManager.STOP_REQUEST_POLL_INTERVAL)
+        while self.get_robot_process(station_name) is None:
+            time.sleep(TestManager.STOP_REQUEST_POLL_INTERVAL)
+        robot_process = self.get_robot_process(station_name)
+        try:
+            robot_process.stdin.write(
+                "{}\n".format(PersistentRunner.STOP_REQUEST))
+            robot_process.stdin.flush()
+        except OSError:
+            # the runner has already exited
+            pass
+
+    def run_process_with_live_count(self, subprocess_args, test_runner_worker,
+                                    stdin=None):
+        """
+        Runs the robot process while receiving its progress events over a
+        ProgressChannel. The console output of the robot process is not
+        relayed through this process.
+
+        :param test_runner_worker: The GUI worker to report progress to, or
+            None if running without the GUI
+        """
+        progress_server = ProgressChannel.ProgressServer(
+            lambda event: self.handle_progress_event(event,
+                                                     test_runner_worker))
+        try:
+            self.run_process_without_communication(
+                subprocess_args, stdin,
+                env=progress_server.get_client_environment())
+        finally:
+            progress_server.close()
+
+    def handle_progress_event(self, event, test_runner_worker):
+        """
+        Updates the live counts from a progress event sent by the robot
+        process and reports the progress to the GUI
+
+        :param event: dict: The progress event
+        :param test_runner_worker: The GUI worker to report progress to, or
+            None if running without the GUI
+        """
+        event_type = event[ProgressChannel.EVENT_TYPE]
+        if event_type == ProgressChannel.SUITE_COMPLETE:
+            result_aggregator = self.result_aggregators.get(
+                event.get(ProgressChannel.EVENT_SOURCE))
+            if result_aggregator is not None:
+                result_aggregator.ingest(event['output'])
+        with self.__progress_lock:
+            if event_type == ProgressChannel.START_TEST:
+                self.current_test_name = event['name']
+                if ProgressChannel.EVENT_SOURCE in event:
+                    # running with a station pool
+                    self.current_test_name = "{}: {}".format(
+                        event[ProgressChannel.EVENT_SOURCE], event['name'])
+            elif event_type == ProgressChannel.END_TEST:
+                if event['status'] == ProgressChannel.PASS_STATUS:
                     self.test_pass_count += 1
-                    test_runner_worker.progress.emit()
+                else:
+                    self.test_fail_count += 1
+                self.last_test_elapsed_ms = event['elapsed_ms']
+            elif event_type == ProgressChannel.SUITE_COMPLETE:
+                self.suite_count += 1
             else:
-                print(message, end="")
+                return
+        if test_runner_worker is not None:
+            test_runner_worker.progress.emit()
 
-    def run_process_with_communication(self, subprocess_args):
+    def run_process_without_communication(self, subprocess_args, stdin=None,
+                                          env=None):
         self.robot_process = subprocess.Popen(subprocess_args, shell=True,
-                                              stdout=subprocess.PIPE,
+                                              stdin=stdin, env=env,
                                               universal_newlines=True)
-        for stdout_line in iter(self.robot_process.stdout.readline, ""):
-            yield stdout_line
-        self.robot_process.stdout.close()
         self.robot_process.wait()
 
-    def run_process_without_communication(self, subprocess_args):
-        self.robot_process = subprocess.Popen(subprocess_args, shell=True,)
-        self.robot_process.wait()
+    def get_suite_directory(self):
+        suite_name = self.config_manager.get(ConfigManager.CONFIG_SUITE_NAME)
+        return os.path.join(self.robot_directory, "suites", suite_name)
 
     def get_tests(self):
-        suite_name = self.config_manager.get(ConfigManager.CONFIG_SUITE_NAME)
-        suite_directory = os.path.join(self.robot_directory, "suites",
-                                       suite_name)
-        return SelectTests.get_tests(suite_directory)
+        return SelectTests.get_tests(
+            self.get_suite_directory(),
+            os.path.join(os.path.dirname(self.config_file_abspath),
+                         SelectTests.SUITE_INDEX_FILE_NAME))
 
     @staticmethod
     def generate_datetime_str():
-        current_time = datetime.datetime.utcnow().isoformat("T")
-        current_time = current_time.replace(":", "-").replace(".", "-")
-        return current_time
+        return PersistentRunner.generate_datetime_str()
 
-    def consolidate_reports(self, output_directory, individual_output_directory):
+    def consolidate_reports(self, output_directory, individual_output_directory,
+                            print_complete_message=True, result_aggregator=None):
         print("Consolidating all test reports...")
         merge_reports_subprocess_args = [
             "python", "-m", "robot.rebot", "--outputdir", output_directory,
-            "--name", "bnc_card",
-            "{}/*.xml".format(individual_output_directory)]
+            "--name", "bnc_card"]
+        if self.__remove_passed_keywords:
+            # the output xml file of each suite run is kept as it is, so the
+            # keywords of a passed test can still be seen in its own report
+            merge_reports_subprocess_args.extend(
+                ["--removekeywords", "passed"])
+        merge_reports_subprocess_args.append(
+            "{}/*.xml".format(individual_output_directory))
         subprocess.run(merge_reports_subprocess_args, shell=True,
                        check=False)
-        self.generate_excel_report(output_directory)
-        self.print_tests_complete_message(output_directory)
+        self.generate_excel_report(output_directory, result_aggregator)
+        if print_complete_message:
+            self.print_tests_complete_message(output_directory)
 
-    def get_results_directory(self, high_level_directory):
+    @staticmethod
+    def generate_iteration_reports(output_file_path):
+        """
+        Generates the report and log of a single suite run from its output
+        xml file, e.g. of a suite run that was run with lean iterations
+
+        :param output_file_path: The path to the output-<datetime>.xml file
+            of the suite run
+        :return: The rebot return code
+        """
+        output_directory, output_filename = os.path.split(
+            os.path.abspath(output_file_path))
+        run_name = os.path.splitext(output_filename)[0]
+        run_datetime = run_name[len("output-"):] \
+            if run_name.startswith("output-") else run_name
+        generate_reports_subprocess_args = [
+            "python", "-m", "robot.rebot", "--outputdir", output_directory,
+            "--output", ROBOT_NO_OUTPUT_FILE,
+            "--report", "report-{}.html".format(run_datetime),
+            "--log", "log-{}.html".format(run_datetime),
+            output_file_path]
+        return subprocess.run(generate_reports_subprocess_args, shell=True,
+                              check=False).returncode
+
+    def get_results_directory(self, high_level_directory, serial_number=None):
         """
         Method that finds or creates required directories for storing test results
 
         Takes high level directory, batch number, and serial number then stores results in the
         form: high_level_dir/BN<batchNo>/SN<batchNo>-<serialNo>
 
+        :param serial_number: The serial number to use instead of the
+            configured serial number (e.g. the serial number of a station)
         :return: Path to results directory
         """
+        if serial_number is None:
+            serial_number = self.config_manager.get(ConfigManager.CONFIG_SERIAL_NUMBER)
         batch_num_dir_name = "BN{}".format(self.config_manager.get(ConfigManager.CONFIG_BATCH_MO_NUMBER))
         serial_num_dir_name = "SN{}-{}".format(self.config_manager.get(ConfigManager.CONFIG_BATCH_MO_NUMBER),
-                                               self.config_manager.get(ConfigManager.CONFIG_SERIAL_NUMBER))
+                                               serial_number)
         results_path = os.path.join(high_level_directory, batch_num_dir_name, serial_num_dir_name)
         os.makedirs(results_path, exist_ok=True, mode=0o660)
         
         return results_path
 
-    def generate_excel_report(self, output_directory):
-        self.xml_formatter = Xml2Excel(output_directory, output_directory, BATCH_SERIAL_FILENAME)
+    def generate_excel_report(self, output_directory, result_aggregator=None):
+        self.xml_formatter = Xml2Excel(output_directory, output_directory, BATCH_SERIAL_FILENAME,
+                                       result_aggregator)
         self.xml_formatter.run()
 
     def get_excel_filename(self):
@@ -280,7 +680,37 @@ def sigint_signal_handler(signal, frame):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Run ACE Test Framework')
     parser.add_argument('--nogui', action="store_true")
+    parser.add_argument('--persistent-runner', action="store_true",
+                        help="When running tests continuously, parse the "
+                             "suite once and run it repeatedly in a single "
+                             "robot process")
+    parser.add_argument('--stations', metavar="STATIONS_FILE",
+                        help="Run the tests on every station (BeagleBone and "
+                             "DUT) listed in the given JSON stations file at "
+                             "the same time")
+    parser.add_argument('--lean-iterations', action="store_true",
+                        help="When running tests continuously, only write "
+                             "the output xml file of each suite run. The "
+                             "report and log are generated once for all of "
+                             "the suite runs when the tests are complete")
+    parser.add_argument('--remove-passed-keywords', action="store_true",
+                        help="Remove the keywords of the passed tests from "
+                             "the consolidated report and log of the suite "
+                             "runs")
+    parser.add_argument('--iteration-reports', metavar="OUTPUT_XML_FILE",
+                        help="Generate the report and log of a single suite "
+                             "run from its output xml file, then exit")
     args = parser.parse_args()
+    if args.iteration_reports:
+        sys.exit(TestManager.generate_iteration_reports(
+            args.iteration_reports))
+    stations = None
+    if args.stations:
+        stations = StationPool.load_stations(args.stations)
     signal.signal(signal.SIGINT, sigint_signal_handler)
-    test_manager = TestManager(in_gui_mode=(not args.nogui))
+    test_manager = TestManager(in_gui_mode=(not args.nogui),
+                               persistent_runner=args.persistent_runner,
+                               stations=stations,
+                               lean_iterations=args.lean_iterations,
+                               remove_passed_keywords=args.remove_passed_keywords)
     test_manager.setup_and_run_framework()
@@ -63,6 +63,7 @@ class GUI(QtWidgets.QStackedWidget):
 
     def report_progress(self):
         self.running_tests_window.set_counts()
+        self.running_tests_window.set_current_test_text()
 
     def finish(self):
         self.tests_complete_window.set_counts()
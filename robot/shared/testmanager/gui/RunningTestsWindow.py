@@ -20,6 +20,14 @@ class RunningTestsWindow(BasicTestStatsWindow.BasicTestStatsWindow):
         self.running_tests_text.setFont(font)
         self.running_tests_text.setStyleSheet("color: rgb(29, 116, 255);")
         self.verticalLayout.addWidget(self.running_tests_text, 0, QtCore.Qt.AlignHCenter)
+
+        # Current test text
+        self.current_test_text = QtWidgets.QLabel(self.centralwidget)
+        font.setPointSize(10)
+        self.current_test_text.setFont(font)
+        self.current_test_text.setWordWrap(True)
+        self.current_test_text.setAlignment(QtCore.Qt.AlignHCenter)
+        self.verticalLayout.addWidget(self.current_test_text)
         lower_spacer_item = QtWidgets.QSpacerItem(20, 40, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Expanding)
         self.verticalLayout.addItem(lower_spacer_item)
 
@@ -37,6 +45,16 @@ class RunningTestsWindow(BasicTestStatsWindow.BasicTestStatsWindow):
     def set_text(self):
         self.running_tests_text.setText("Running Tests...")
 
+    def set_current_test_text(self):
+        test_manager = self.window.test_manager
+        if test_manager.current_test_name is None:
+            return
+        current_test_text = "Current test: {}".format(test_manager.current_test_name)
+        if test_manager.last_test_elapsed_ms is not None:
+            current_test_text += "\nPrevious test time: {:.1f} s".format(
+                test_manager.last_test_elapsed_ms / 1000)
+        self.current_test_text.setText(current_test_text)
+
     def add_buttons(self, running_continuously):
         if running_continuously:
             # set up stop tests after current suite is finished button
@@ -55,8 +73,9 @@ class RunningTestsWindow(BasicTestStatsWindow.BasicTestStatsWindow):
         self.running_tests_text.setText("Tests have stopped. Failing remaining tests...")
         if running_continuously:
             self.stop_tests_after_suite_button.button.setDisabled(True)
-        if self.window.test_manager.robot_process.poll() is None:
-            # send a ctrl+c signal to the running robot process to automatically
-            # fail all remaining tests and stop running additional suites
-            self.window.test_manager.stop_tests = True
-            os.kill(self.window.test_manager.robot_process.pid, signal.CTRL_C_EVENT)
+        for robot_process in self.window.test_manager.get_robot_processes():
+            if robot_process.poll() is None:
+                # send a ctrl+c signal to the running robot process to automatically
+                # fail all remaining tests and stop running additional suites
+                self.window.test_manager.stop_tests = True
+                os.kill(robot_process.pid, signal.CTRL_C_EVENT)
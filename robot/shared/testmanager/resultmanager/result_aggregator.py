@@ -0,0 +1,113 @@
+from resultmanager.xml_parser import *
+from xml.etree import ElementTree
+import json
+import os
+
+# Default name of the state file stored in the output directory of a run
+DEFAULT_STATE_FILENAME = "result_summary.json"
+
+
+class ResultAggregator:
+    def __init__(self, state_file_path, result_store=None):
+        """
+        Constructor for ResultAggregator class
+
+        Keeps running pass/fail counts of each test (in the same form as
+        Xml2Excel.get_test_results_dict()) over the suite runs of a
+        continuous run. The results of each suite run are added as soon as
+        its output xml file has been written, and the counts are saved to
+        the state file after every suite run, so the results so far are
+        kept even if the test framework exits unexpectedly.
+
+        If the state file already exists, the saved results are loaded.
+
+        :param state_file_path: Path to the .json file to save the counts in
+        :param result_store: Optional ResultStore that the results of each
+            suite run are also stored in
+        """
+        self.state_file_path = state_file_path
+        self.result_store = result_store
+        self.suite_info = None
+        self.test_results = {}
+        self.overall_result = True
+        self.ingested_files = []
+        if os.path.isfile(state_file_path):
+            self.load_state()
+
+    def ingest(self, xml_file_path):
+        """
+        Method that adds the results of a suite run to the counts and saves
+        them to the state file
+
+        An xml file that has already been added is ignored.
+
+        :param xml_file_path: String path to the output .xml file of the run
+        :return: True if the results were added
+        """
+        xml_file_name = os.path.basename(xml_file_path)
+        if xml_file_name in self.ingested_files:
+            return False
+        try:
+            suite = parse_xml(xml_file_path)
+        except (OSError, ElementTree.ParseError, IndexError,
+                ValueError) as e:
+            # e.g. the run was stopped before the output file was written
+            print("Could not add the results of {}: {}".format(
+                xml_file_path, e))
+            return False
+        if self.result_store is not None:
+            self.result_store.ingest(xml_file_path, suite)
+
+        if self.suite_info is None:
+            suite_info = dict(suite.__dict__)
+            del suite_info['tests']
+            self.suite_info = suite_info
+        for test in suite.tests:
+            if not count_test_status(self.test_results, test):
+                self.overall_result = False
+        self.ingested_files.append(xml_file_name)
+        self.save_state()
+        return True
+
+    def get_suite_count(self):
+        return len(self.ingested_files)
+
+    def get_suite_info(self):
+        """
+        :return: SuiteRunInfo object of the first suite run added, without
+            its tests
+        """
+        return SuiteRunInfo(dict(self.suite_info))
+
+    def get_test_results_dict(self):
+        """
+        :return: Dictionary of results. Dictionary is in the form:
+        key = Test Name, value = {"PASS": number of passes, "FAIL": number of fails}
+        """
+        return self.test_results
+
+    def save_state(self):
+        """
+        Method that saves the counts to the state file
+
+        The counts are written to a temporary file which then replaces the
+        state file, so the state file is never left partially written.
+        """
+        state = {
+            "suite_info": self.suite_info,
+            "test_results": self.test_results,
+            "overall_result": self.overall_result,
+            "ingested_files": self.ingested_files
+        }
+        temp_file_path = self.state_file_path + ".tmp"
+        with open(temp_file_path, 'w') as state_file:
+            json.dump(state, state_file)
+        os.replace(temp_file_path, self.state_file_path)
+
+    def load_state(self):
+        with open(self.state_file_path, 'r') as state_file:
+            state = json.load(state_file)
+        self.suite_info = state["suite_info"]
+        self.test_results = state["test_results"]
+        self.overall_result = state["overall_result"]
+        self.ingested_files = state["ingested_files"]
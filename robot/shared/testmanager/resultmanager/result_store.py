@@ -0,0 +1,364 @@
+from resultmanager.xml_parser import *
+from contextlib import closing
+from xml.etree import ElementTree
+import argparse
+import json
+import os
+import sqlite3
+
+# Default name of the database stored in the directory selected by the user
+# to save test results in, i.e. shared by every batch and serial number
+DEFAULT_DATABASE_FILENAME = "results.sqlite3"
+
+# Seconds to wait for another station (or process) to finish writing
+DATABASE_TIMEOUT = 30
+
+# The number of passes and failures of the grouped test results. As in
+# xml_parser.count_test_status, any other status is neither
+PASS_COUNT_SQL = "SUM(test_results.status = '{}')".format(PASS_STATUS)
+FAIL_COUNT_SQL = "SUM(test_results.status = '{}')".format(FAIL_STATUS)
+FAILURE_RATE_SQL = ("AVG(CASE WHEN test_results.status IN ('{0}', '{1}') "
+                    "THEN test_results.status = '{1}' END)").format(
+    PASS_STATUS, FAIL_STATUS)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS suite_runs (
+    id INTEGER PRIMARY KEY,
+    xml_file_path TEXT NOT NULL UNIQUE,
+    suite_name TEXT,
+    batch_mo_number TEXT,
+    serial_number TEXT,
+    part_number TEXT,
+    work_order_job_number TEXT,
+    staff_name TEXT,
+    date_time TEXT,
+    suite_info TEXT
+);
+CREATE TABLE IF NOT EXISTS test_results (
+    id INTEGER PRIMARY KEY,
+    suite_run_id INTEGER NOT NULL REFERENCES suite_runs (id),
+    test_name TEXT NOT NULL,
+    status TEXT,
+    execution_time TEXT,
+    tags TEXT
+);
+CREATE TABLE IF NOT EXISTS analog_readings (
+    id INTEGER PRIMARY KEY,
+    test_result_id INTEGER NOT NULL REFERENCES test_results (id),
+    pin_number TEXT NOT NULL,
+    sample_count INTEGER,
+    minimum REAL,
+    maximum REAL,
+    mean REAL,
+    stddev REAL
+);
+CREATE INDEX IF NOT EXISTS suite_runs_batch_serial
+    ON suite_runs (batch_mo_number, serial_number, date_time);
+CREATE INDEX IF NOT EXISTS suite_runs_date_time ON suite_runs (date_time);
+CREATE INDEX IF NOT EXISTS test_results_test_name
+    ON test_results (test_name, status);
+CREATE INDEX IF NOT EXISTS test_results_suite_run
+    ON test_results (suite_run_id);
+CREATE INDEX IF NOT EXISTS analog_readings_test_result
+    ON analog_readings (test_result_id);
+"""
+
+# The columns of suite_runs that are taken from the SuiteRunInfo
+SUITE_INFO_COLUMNS = ["suite_name", "batch_mo_number", "serial_number",
+                      "part_number", "work_order_job_number", "staff_name",
+                      "date_time"]
+ANALOG_READING_COLUMNS = ["sample_count", "minimum", "maximum", "mean",
+                          "stddev"]
+
+
+class ResultStore:
+    def __init__(self, database_path):
+        """
+        Constructor for ResultStore class
+
+        Stores the results of every suite run (the SuiteRunInfo, the
+        TestStats of each test and the analog readings of each test) in a
+        SQLite database, indexed by batch number, serial number, test name
+        and time, so that results can be queried across boards without
+        parsing the output xml files again.
+
+        The database is created if it does not exist yet. Each call opens its
+        own connection, so a ResultStore can be used from the threads of
+        several stations at once.
+
+        :param database_path: Path to the SQLite database file
+        """
+        self.database_path = database_path
+        with closing(self.connect()) as connection:
+            with connection:
+                connection.executescript(SCHEMA)
+
+    def connect(self):
+        connection = sqlite3.connect(self.database_path,
+                                     timeout=DATABASE_TIMEOUT)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def ingest(self, xml_file_path, suite=None):
+        """
+        Method that stores the results of a suite run
+
+        An xml file that has already been stored is ignored.
+
+        :param xml_file_path: String path to the output .xml file of the run
+        :param suite: The SuiteRunInfo parsed from the xml file, if it has
+            already been parsed
+        :return: True if the results were stored
+        """
+        xml_file_path = os.path.abspath(xml_file_path)
+        if suite is None:
+            try:
+                suite = parse_xml(xml_file_path)
+            except (OSError, ElementTree.ParseError, IndexError,
+                    ValueError) as e:
+                # e.g. the run was stopped before the output file was written
+                print("Could not store the results of {}: {}".format(
+                    xml_file_path, e))
+                return False
+        suite_info = dict(suite.__dict__)
+        del suite_info['tests']
+        try:
+            with closing(self.connect()) as connection:
+                with connection:
+                    return self.insert_suite_run(connection, xml_file_path,
+                                                 suite, suite_info)
+        except sqlite3.Error as e:
+            print("Could not store the results of {}: {}".format(
+                xml_file_path, e))
+            return False
+
+    @staticmethod
+    def insert_suite_run(connection, xml_file_path, suite, suite_info):
+        """
+        :return: True if the suite run was inserted, False if it was already
+            stored
+        """
+        cursor = connection.execute(
+            "INSERT OR IGNORE INTO suite_runs (xml_file_path, {}, suite_info) "
+            "VALUES (?, {}, ?)".format(
+                ", ".join(SUITE_INFO_COLUMNS),
+                ", ".join("?" * len(SUITE_INFO_COLUMNS))),
+            [xml_file_path] +
+            [suite_info.get(column) for column in SUITE_INFO_COLUMNS] +
+            [json.dumps(suite_info)])
+        if cursor.rowcount == 0:
+            return False
+        suite_run_id = cursor.lastrowid
+        for test in suite.tests:
+            test_result_id = connection.execute(
+                "INSERT INTO test_results (suite_run_id, test_name, status, "
+                "execution_time, tags) VALUES (?, ?, ?, ?, ?)",
+                (suite_run_id, test.name, test.status, test.execution_time,
+                 json.dumps(test.tag_list))).lastrowid
+            connection.executemany(
+                "INSERT INTO analog_readings (test_result_id, pin_number, "
+                "{}) VALUES (?, ?, {})".format(
+                    ", ".join(ANALOG_READING_COLUMNS),
+                    ", ".join("?" * len(ANALOG_READING_COLUMNS))),
+                [[test_result_id, analog_reading['pin_number']] +
+                 [analog_reading.get(column)
+                  for column in ANALOG_READING_COLUMNS]
+                 for analog_reading in getattr(test, 'analog_readings', [])])
+        return True
+
+    def query(self, batch_mo_number=None, serial_number=None, test_name=None,
+              start_date_time=None, end_date_time=None):
+        """
+        :return: ResultStoreQuery of the suite runs matching the given
+            filters. See ResultStoreQuery
+        """
+        return ResultStoreQuery(self, batch_mo_number, serial_number,
+                                test_name, start_date_time, end_date_time)
+
+
+class ResultStoreQuery:
+    def __init__(self, result_store, batch_mo_number=None, serial_number=None,
+                 test_name=None, start_date_time=None, end_date_time=None):
+        """
+        Constructor for ResultStoreQuery class
+
+        Selects the stored results of the suite runs (and tests) matching the
+        filters. Has the same methods as ResultAggregator, so an Xml2Excel
+        report can be rendered from a query instead of from xml files.
+
+        :param result_store: The ResultStore to query
+        :param batch_mo_number: Optional batch number of the suite runs
+        :param serial_number: Optional serial number of the suite runs
+        :param test_name: Optional name of the tests
+        :param start_date_time: Optional earliest date time of the suite runs,
+            in the robot format (e.g. '20210131 23:59:59.999')
+        :param end_date_time: Optional latest date time of the suite runs
+        """
+        self.result_store = result_store
+        conditions = []
+        self.parameters = []
+        for condition, value in [
+                ("suite_runs.batch_mo_number = ?", batch_mo_number),
+                ("suite_runs.serial_number = ?", serial_number),
+                ("test_results.test_name = ?", test_name),
+                ("suite_runs.date_time >= ?", start_date_time),
+                ("suite_runs.date_time <= ?", end_date_time)]:
+            if value is not None:
+                conditions.append(condition)
+                self.parameters.append(value)
+        self.where_clause = ""
+        if conditions:
+            self.where_clause = "WHERE " + " AND ".join(conditions)
+        self.__test_results = None
+        self.__overall_result = True
+
+    def execute(self, select, group_by=""):
+        """
+        :param select: The SELECT clause (including FROM and the join of the
+            test results and suite runs) of the query
+        :param group_by: Optional GROUP BY (and ORDER BY) clause
+        :return: The list of sqlite3.Row of the query filtered by this
+            ResultStoreQuery
+        """
+        with closing(self.result_store.connect()) as connection:
+            return connection.execute(
+                "{} {} {}".format(select, self.where_clause, group_by),
+                self.parameters).fetchall()
+
+    def get_suite_count(self):
+        return self.execute(
+            "SELECT COUNT(DISTINCT suite_runs.id) FROM suite_runs "
+            "JOIN test_results ON test_results.suite_run_id = suite_runs.id"
+        )[0][0]
+
+    def get_suite_info(self):
+        """
+        :return: SuiteRunInfo object of the first matching suite run, without
+            its tests
+        """
+        rows = self.execute(
+            "SELECT suite_runs.suite_info FROM suite_runs "
+            "JOIN test_results ON test_results.suite_run_id = suite_runs.id",
+            "ORDER BY suite_runs.date_time LIMIT 1")
+        return SuiteRunInfo(json.loads(rows[0]['suite_info']))
+
+    def get_test_results_dict(self):
+        """
+        :return: Dictionary of results. Dictionary is in the form:
+        key = Test Name, value = {"PASS": number of passes, "FAIL": number of fails}
+        """
+        if self.__test_results is not None:
+            return self.__test_results
+        test_results = {}
+        for row in self.get_failure_rates():
+            test_results[row['test_name']] = {PASS_STATUS: row['pass_count'],
+                                              FAIL_STATUS: row['fail_count']}
+            if row['fail_count']:
+                self.__overall_result = False
+        self.__test_results = test_results
+        return test_results
+
+    @property
+    def overall_result(self):
+        """
+        :return: False if any matching test failed, otherwise True
+        """
+        self.get_test_results_dict()
+        return self.__overall_result
+
+    def get_failure_rates(self):
+        """
+        :return: A list of sqlite3.Row with the 'test_name', 'pass_count',
+            'fail_count' and 'failure_rate' of each matching test, in the
+            order the tests were first run. Skipped and not run tests are
+            neither passes nor failures, and are not part of the failure
+            rate (which is NULL if the test never passed or failed)
+        """
+        return self.execute(
+            "SELECT test_results.test_name, "
+            "{} AS pass_count, {} AS fail_count, {} AS failure_rate "
+            "FROM test_results "
+            "JOIN suite_runs ON test_results.suite_run_id = suite_runs.id"
+            .format(PASS_COUNT_SQL, FAIL_COUNT_SQL, FAILURE_RATE_SQL),
+            "GROUP BY test_results.test_name "
+            "ORDER BY MIN(test_results.id)")
+
+    def get_yield_by_serial_number(self):
+        """
+        :return: A list of sqlite3.Row with the 'batch_mo_number',
+            'serial_number', 'suite_count' and 'passed_suite_count' (the
+            suite runs in which no matching test failed) of each board
+        """
+        return self.execute(
+            "SELECT batch_mo_number, serial_number, "
+            "COUNT(*) AS suite_count, "
+            "SUM(fail_count = 0) AS passed_suite_count FROM ("
+            "SELECT suite_runs.batch_mo_number, suite_runs.serial_number, "
+            "{} AS fail_count "
+            "FROM suite_runs "
+            "JOIN test_results ON test_results.suite_run_id = suite_runs.id"
+            .format(FAIL_COUNT_SQL),
+            "GROUP BY suite_runs.id) "
+            "GROUP BY batch_mo_number, serial_number "
+            "ORDER BY batch_mo_number, serial_number")
+
+    def get_analog_readings(self):
+        """
+        :return: A list of sqlite3.Row with the 'date_time',
+            'batch_mo_number', 'serial_number', 'test_name', 'pin_number' and
+            the statistics of each matching analog reading, oldest first,
+            e.g. to plot the trend of an analog input
+        """
+        return self.execute(
+            "SELECT suite_runs.date_time, suite_runs.batch_mo_number, "
+            "suite_runs.serial_number, test_results.test_name, "
+            "analog_readings.pin_number, {} FROM analog_readings "
+            "JOIN test_results "
+            "ON analog_readings.test_result_id = test_results.id "
+            "JOIN suite_runs ON test_results.suite_run_id = suite_runs.id"
+            .format(", ".join("analog_readings." + column
+                              for column in ANALOG_READING_COLUMNS)),
+            "ORDER BY suite_runs.date_time, analog_readings.id")
+
+
+if __name__ == "__main__":
+    # Run from the robot/shared/testmanager folder, e.g.:
+    # python -m resultmanager.result_store <dir_path>/results.sqlite3 --batch 12345678 --ingest <results directory>
+    parser = argparse.ArgumentParser(
+        description="Stores robot results in the result database and "
+                    "queries them")
+    parser.add_argument("database_path", help="Path to the result database")
+    parser.add_argument("--ingest", metavar="RESULTS_PATH",
+                        help="Store the results of every output .xml file in "
+                             "the directory (e.g. results from before the "
+                             "result database was used)")
+    parser.add_argument("--batch", help="Only include this batch number")
+    parser.add_argument("--serial", help="Only include this serial number")
+    parser.add_argument("--test", help="Only include this test name")
+    parser.add_argument("--start", help="Only include suite runs from this "
+                                        "robot date time on")
+    parser.add_argument("--end", help="Only include suite runs up to this "
+                                      "robot date time")
+    parser.add_argument("--excel", metavar="REPORT_DIRECTORY",
+                        help="Write an excel report of the results to the "
+                             "directory")
+    args = parser.parse_args()
+
+    result_store = ResultStore(args.database_path)
+    if args.ingest:
+        from resultmanager.xml2excel import Xml2Excel
+        for xml_file_path in Xml2Excel.get_xml_files(args.ingest):
+            result_store.ingest(xml_file_path)
+    result_query = result_store.query(args.batch, args.serial, args.test,
+                                      args.start, args.end)
+    if result_query.get_suite_count() == 0:
+        print("No results")
+    elif args.excel:
+        from resultmanager.xml2excel import Xml2Excel, BATCH_SERIAL_FILENAME
+        Xml2Excel(None, args.excel, BATCH_SERIAL_FILENAME,
+                  result_query).run()
+    else:
+        for row in result_query.get_failure_rates():
+            print("{:6.1%} failed ({} of {}): {}".format(
+                row['failure_rate'] or 0.0, row['fail_count'],
+                row['pass_count'] + row['fail_count'], row['test_name']))
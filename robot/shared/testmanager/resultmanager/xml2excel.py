@@ -1,6 +1,7 @@
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, PatternFill, Color
 from resultmanager.xml_parser import *
+from concurrent.futures import ProcessPoolExecutor
 import os
 
 # Default strings for output filename formatting
@@ -12,9 +13,18 @@ SHEET_TITLE = "TEST RESULTS SHEET: "
 FAIL_COLOUR_HEX = 'FC4242'
 PASS_COLOUR_HEX = '92D050'
 
+# Below this number of xml files, starting worker processes costs more than
+# parsing the files in this process
+PARALLEL_PARSE_MIN_FILES = 4
+# Number of chunks of xml files given to each worker process
+PARALLEL_PARSE_CHUNKS_PER_WORKER = 4
+# Maximum number of worker processes allowed by ProcessPoolExecutor on Windows
+PARALLEL_PARSE_MAX_WORKERS = 61
+
 
 class Xml2Excel:
-    def __init__(self,  robot_results_path, xlsx_report_dir, xlsx_filename_format=DEFAULT_FILENAME):
+    def __init__(self,  robot_results_path, xlsx_report_dir, xlsx_filename_format=DEFAULT_FILENAME,
+                 result_aggregator=None):
         """
         Constructor for Xml2Excel class
 
@@ -22,6 +32,9 @@ class Xml2Excel:
         :param robot_results_path: Path where robot xml files are located
         :param xlsx_report_dir: Path where the excel file will be stored
         :param xlsx_filename_format: Indicates format for saving file
+        :param result_aggregator: Optional ResultAggregator holding the results
+            of the xml files, in which case the xml files are not parsed again,
+            or a ResultStoreQuery of the results to report
         """
         self.results_path = robot_results_path
         self.xlsx_report_dir = xlsx_report_dir
@@ -32,6 +45,7 @@ class Xml2Excel:
         self.workbook = Workbook()
         self.worksheet = self.workbook.active
         self.suites = []
+        self.result_aggregator = result_aggregator
 
 
     def run(self):
@@ -110,13 +124,26 @@ class Xml2Excel:
         Method that uses xml_parser.py to get a list of
         parsed test suites
 
-        Sets self.suites to a list of the parsed suite data
+        Sets self.suites to a list of the parsed suite data, in the same
+        order as the xml files returned by get_xml_files(). When there are
+        many xml files (e.g. after running tests continuously) they are
+        parsed in parallel by a pool of worker processes.
         """
-        suites = []
+        if self.uses_result_aggregator():
+            self.suites = [self.result_aggregator.get_suite_info()]
+            return
         xml_files = Xml2Excel.get_xml_files(self.results_path)
-        for file_path in xml_files:
-            suites.append(parse_xml(file_path))
-        self.suites = suites
+        if len(xml_files) < PARALLEL_PARSE_MIN_FILES:
+            self.suites = [parse_xml(file_path) for file_path in xml_files]
+            return
+        max_workers = min(os.cpu_count() or 1, len(xml_files),
+                          PARALLEL_PARSE_MAX_WORKERS)
+        chunksize = max(1, len(xml_files) // (
+            max_workers * PARALLEL_PARSE_CHUNKS_PER_WORKER))
+        with ProcessPoolExecutor(max_workers) as executor:
+            # map returns the results in the order of xml_files
+            self.suites = list(executor.map(parse_xml, xml_files,
+                                            chunksize=chunksize))
 
     def get_test_results_dict(self):
         """
@@ -126,23 +153,27 @@ class Xml2Excel:
         :return: Dictionary of results. Dictionary is in the form:
         key = Test Name, value = {"PASS": number of passes, "FAIL": number of fails}
         """
+        if self.uses_result_aggregator():
+            self.overall_result = self.result_aggregator.overall_result
+            return self.result_aggregator.get_test_results_dict()
         test_results = {}
         for suite in self.suites:
             test_list = suite.tests
             for test in test_list:
-                if test.name not in test_results:
-                    # insert in dictionary
-                    test_results[test.name] = {"PASS": 0, "FAIL": 0}
-                # increment stats depending on test status
-                if test.status == 'PASS':
-                    test_results[test.name]['PASS'] = test_results[test.name]['PASS'] + 1
-                else:
+                if not count_test_status(test_results, test):
                     self.overall_result = False
-                    test_results[test.name]['FAIL'] = test_results[test.name]['FAIL'] + 1
         # TODO get suite total stats
         # TODO get suite stats by tag
         return test_results
 
+    def uses_result_aggregator(self):
+        """
+        :return: True if the results are taken from self.result_aggregator
+            instead of parsing the xml files
+        """
+        return self.result_aggregator is not None and \
+            self.result_aggregator.get_suite_count() > 0
+
 
     def insert_overall_test_results(self):
         """
@@ -301,6 +332,10 @@ class Xml2Excel:
         If .xml file path is passed instead of a directory, method will just return
         .xml file path
 
+        The files are returned in a deterministic order: the files of a
+        directory (sorted by name) come before the files of its
+        subdirectories (also sorted by name)
+
         :param path: String pointing to device directory or .xml file
         :return: list of .xml file paths
         """
@@ -309,7 +344,9 @@ class Xml2Excel:
             xml_files.append(path)
             return xml_files
         for subdir, dirs, files in os.walk(path):
-            for file_name in files:
+            # sorting dirs in place makes os.walk visit them in sorted order
+            dirs.sort()
+            for file_name in sorted(files):
                 if file_name.endswith('.xml'):
                     xml_files.append(os.path.join(subdir, file_name))
         return xml_files
@@ -1,9 +1,20 @@
-from xml.dom import minidom, Node
+from xml.etree import ElementTree
 import json
+import re
 
 
 UNKNOWN_VALUE_ENTRY = "N/A"
 
+# Matches the message logged by bbb_io_manager.get_bbb_analog_input_statistics
+# (see bbb_io_manager.ANALOG_STATISTICS_MESSAGE_FORMAT) with the pin number
+# and the JSON statistics of the analog input
+ANALOG_STATISTICS_MESSAGE_RE = re.compile(r'^Analog input (\S+): (\{.*\})$')
+
+# Status of a passed and of a failed test in the output xml files. Tests with
+# any other status (e.g. SKIP or NOT RUN) are neither passes nor failures
+PASS_STATUS = 'PASS'
+FAIL_STATUS = 'FAIL'
+
 class TestStats:
     def __init__(self):
         self.test_status = UNKNOWN_VALUE_ENTRY
@@ -11,6 +22,9 @@ class TestStats:
         self.name = UNKNOWN_VALUE_ENTRY
         self.test_number = UNKNOWN_VALUE_ENTRY
         self.tag_list = UNKNOWN_VALUE_ENTRY
+        # dicts of the statistics of the analog inputs checked by the test,
+        # with the 'pin_number' of the analog input
+        self.analog_readings = []
 
 
 class SuiteRunInfo():
@@ -31,75 +45,137 @@ class SuiteRunInfo():
         self.tests = []
 
 
-def get_test_list(xml_minidom):
+def count_test_status(test_results, test):
     """
-    Function that gets a list of TestStats objects using a xml_minidom object.
-    Parses necessary data from xml minidom object
+    Function that adds the status of a test to the pass/fail counts of the
+    test results
 
-    :param xml_minidom: xml_minidom object
-    :return: List of TestStats objects
+    :param test_results: Dictionary of results, in the form:
+        key = Test Name, value = {"PASS": number of passes, "FAIL": number of fails}
+    :param test: TestStats object
+    :return: False if the test failed, otherwise True
     """
-    test_list = []
-    for element in xml_minidom.getElementsByTagName('test'):
-        test = TestStats()
-        # Get Test Name
-        test.name = element.attributes['name'].value
-        # Get Test Status (stored in last 'status' DOM)
-        test_status = element.getElementsByTagName('status')
-        last_index = len(test_status) - 1
-        test.status = test_status[last_index].attributes['status'].value
-        # Get Test Execution Time
-        test.execution_time = test_status[last_index].attributes['endtime'].value
-
-        test.tag_list = []
-        for x in element.childNodes:
-            if x.nodeType == Node.ELEMENT_NODE and x.tagName == 'tag':
-                for node in x.childNodes:
-                    test.tag_list.append(node.data)
-
-        test_list.append(test)
-
-    return test_list
+    if test.name not in test_results:
+        test_results[test.name] = {PASS_STATUS: 0, FAIL_STATUS: 0}
+    if test.status in (PASS_STATUS, FAIL_STATUS):
+        test_results[test.name][test.status] += 1
+    return test.status != FAIL_STATUS
 
 
-def get_suite_info(xml_minidom):
+def parse_test(test_element, status_element, tag_list, analog_readings):
     """
-    Function that creates SuiteRunInfo object using xml minidom object
-    Parses necessary data from xml minidom object
-
-    :param xml_minidom: xml_minidom object
-    :return: SuiteRunInfo object
+    Function that creates a TestStats object from a parsed 'test' element
+
+    :param test_element: The 'test' element
+    :param status_element: The last 'status' element inside the test, which
+        holds the status of the test itself
+    :param tag_list: The list of tags of the test
+    :param analog_readings: The list of analog input statistics logged by
+        the test
+    :return: TestStats object
     """
-    suites = xml_minidom.getElementsByTagName('suite')
-    suite_info = []
-    for suite in suites:
-        doc = suite.getElementsByTagName('doc')
-        if doc:
-            last_index = len(doc) - 1  # suite doc stored in last element
-            if doc[last_index].hasChildNodes():
-                children = doc[last_index].childNodes
-                for child in children:
-                    suite_info.append(child.data)
-
-    # Convert string to python dictionary
-    result = json.loads(suite_info[0])
-    suite_info = SuiteRunInfo(result)
-    return suite_info
+    test = TestStats()
+    # Get Test Name
+    test.name = test_element.get('name')
+    # Get Test Status (stored in last 'status' element)
+    test.status = status_element.get('status')
+    # Get Test Execution Time
+    test.execution_time = status_element.get('endtime')
+    test.tag_list = tag_list
+    test.analog_readings = analog_readings
+    return test
+
+
+def parse_analog_reading(message):
+    """
+    :param message: The text of a 'msg' element
+    :return: The dict of the analog input statistics logged in the message,
+        or None if the message does not log analog input statistics
+    """
+    match = ANALOG_STATISTICS_MESSAGE_RE.match(message)
+    if match is None:
+        return None
+    try:
+        analog_reading = json.loads(match.group(2))
+    except ValueError:
+        return None
+    analog_reading['pin_number'] = match.group(1)
+    return analog_reading
 
 
 def parse_xml(xml_file_path):
     """
     Function that parses xml file and returns a SuiteRunInfo Object
 
-    Creates a minidom object for the xml file and parses using function
-    found in this file
+    The xml file is streamed using iterparse and every element is discarded
+    once it has been parsed, so the memory used does not depend on the size
+    of the xml file (e.g. when keyword level logging is enabled).
+
+    The suite info is taken from the doc of the top level suite (i.e. the
+    last 'doc' inside it), which holds the test config in JSON.
 
     :param xml_file_path: String path to a .xml file
     :return: SuiteRunInfo object
     """
-    xml_file = minidom.parse(xml_file_path)
-    suite_info = get_suite_info(xml_file)
-    test_list = get_test_list(xml_file)
+    test_list = []
+    # doc text of each suite, in the order the suites are started
+    suite_docs = []
+    # indices into suite_docs of the suites currently being parsed
+    open_suites = []
+    element_stack = []
+    test_status_element = None
+    test_tag_list = None
+    test_analog_readings = None
+
+    for event, element in ElementTree.iterparse(xml_file_path,
+                                                events=('start', 'end')):
+        if event == 'start':
+            if element.tag == 'suite':
+                open_suites.append(len(suite_docs))
+                suite_docs.append(None)
+            elif element.tag == 'test':
+                test_status_element = None
+                test_tag_list = []
+                test_analog_readings = []
+            element_stack.append(element)
+            continue
+
+        element_stack.pop()
+        parent = element_stack[-1] if element_stack else None
+        if element.tag == 'status':
+            if test_tag_list is not None:
+                test_status_element = element
+        elif element.tag == 'tag':
+            if parent is not None and parent.tag == 'test' and element.text:
+                test_tag_list.append(element.text)
+        elif element.tag == 'msg':
+            if test_analog_readings is not None and element.text:
+                analog_reading = parse_analog_reading(element.text)
+                if analog_reading is not None:
+                    test_analog_readings.append(analog_reading)
+        elif element.tag == 'doc':
+            for suite_index in open_suites:
+                suite_docs[suite_index] = element.text
+        elif element.tag == 'test':
+            test_list.append(parse_test(element, test_status_element,
+                                        test_tag_list, test_analog_readings))
+            test_status_element = None
+            test_tag_list = None
+            test_analog_readings = None
+        elif element.tag == 'suite':
+            open_suites.pop()
+
+        # discard the parsed element, keeping the last test status until
+        # the test has been parsed
+        if element is not test_status_element:
+            element.clear()
+        if parent is not None:
+            parent.remove(element)
+
+    suite_info = [doc for doc in suite_docs if doc]
+    # Convert string to python dictionary
+    result = json.loads(suite_info[0])
+    suite_info = SuiteRunInfo(result)
     suite_info.tests = test_list
     suite_info.date_time = suite_info.tests[-1].execution_time
-    return suite_info
\ No newline at end of file
+    return suite_info
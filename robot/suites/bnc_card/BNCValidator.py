@@ -2,6 +2,79 @@ from ace_bbsm import BBB_IO_CONSTANTS as BIC
 import BNC_CAPE_VALIDATION_CONSTANTS as CAPE_CONSTS
 import BNC_CONFIG
 
+# Value of the IO Expander configuration and output registers on power up
+# (according to the IO Expander datasheet): all pins are inputs and all
+# output values are 1
+IO_EXPANDER_DEFAULT_REGISTER_VALUE = 0xFF
+
+
+class IOExpanderState:
+    """
+    The state of the IO Expander on the BNC Card at a given point of a list
+    of IO specifications, as configured by the I2C specifications before
+    that point. The state is updated one specification at a time, so a list
+    of IO specifications is validated in a single forward pass.
+    """
+
+    def __init__(self, io_specifications):
+        self.io_specifications = io_specifications
+        self.config_register = IO_EXPANDER_DEFAULT_REGISTER_VALUE
+        self.output_register = IO_EXPANDER_DEFAULT_REGISTER_VALUE
+        self.output_register_set = False
+        self.__sets_output_in_config_register = None
+
+    def update(self, spec):
+        """
+        Updates the state with the IO specification that has just been
+        validated
+
+        :param spec: The specification that will be executed after the
+            specifications already included in the state
+        """
+        if not BNCValidator.is_io_expander_spec(spec):
+            return
+        data_addr = spec[BIC.I2C_DATA_ADDRESS]
+        if data_addr == BNC_CONFIG.I2C_IO_EXPANDER_CONFIG_REGISTER:
+            self.config_register = int(spec[BIC.I2C_DATA], 16)
+        elif data_addr == BNC_CONFIG.I2C_IO_EXPANDER_OUTPUT_REGISTER:
+            self.output_register = int(spec[BIC.I2C_DATA], 16)
+            self.output_register_set = True
+
+    def is_in_output_mode(self, bit_location):
+        """
+        :param bit_location: an 8 bit hex str representing the
+            IO Expander pin that will be in input mode or output mode
+        :return: True if the IO Expander pin at bit_location is in output
+            mode (a 0 bit in the configuration register). Otherwise False.
+        """
+        return (self.config_register & int(bit_location, 16)) == 0
+
+    def get_bit_value(self, bit_location):
+        """
+        :param bit_location: an 8 bit hex str representing the
+            IO Expander bit whose value is going to be retrieved
+        :return: 1 if the IO Expander output register has a 1 value at the
+            bit_location. Otherwise 0
+        """
+        if (self.output_register & int(bit_location, 16)) != 0:
+            return 1
+        return 0
+
+    def sets_output_in_config_register(self):
+        """
+        :return: True if any of the IO specifications (before or after the
+            current point) sets at least one IO Expander pin as an output
+            in the configuration register. Computed once, on first use.
+        """
+        if self.__sets_output_in_config_register is None:
+            self.__sets_output_in_config_register = any(
+                BNCValidator.is_io_expander_spec(spec) and
+                spec[BIC.I2C_DATA_ADDRESS] ==
+                BNC_CONFIG.I2C_IO_EXPANDER_CONFIG_REGISTER and
+                int(spec[BIC.I2C_DATA], 16) != 255
+                for spec in self.io_specifications)
+        return self.__sets_output_in_config_register
+
 
 class BNCValidator:
 
@@ -25,11 +98,14 @@ class BNCValidator:
         :return: None, if the suite is valid, otherwise raises an
             AssertionError
         """
+        expander_state = IOExpanderState(io_specifications)
         for spec_num in range(len(io_specifications)):
-            BNCValidator.validate_spec(spec_num, io_specifications)
+            BNCValidator.validate_spec(spec_num, io_specifications,
+                                       expander_state)
+            expander_state.update(io_specifications[spec_num])
 
     @staticmethod
-    def validate_spec(spec_num, io_specifications):
+    def validate_spec(spec_num, io_specifications, expander_state):
         """
         Validates that the input or output at the index 'spec_num'
         in the io_specifications is valid for the BNC Card test suite.
@@ -37,20 +113,24 @@ class BNCValidator:
         :param spec_num: The index of the specification to be validated
         :param io_specifications: the list of input, output, and I2C
             specifications that will be executed on the BBB
+        :param expander_state: The IOExpanderState before the specification
+            at index 'spec_num' is run
         :return: None, if the specification is valid, otherwise raises an
             AssertionError
         """
         spec = io_specifications[spec_num]
         if spec[BIC.SPEC_TYPE] == BIC.SPEC_TYPE_INPUT:
-            BNCValidator.validate_spec_input(spec_num, io_specifications)
+            BNCValidator.validate_spec_input(spec_num, io_specifications,
+                                             expander_state)
         elif spec[BIC.SPEC_TYPE] == BIC.SPEC_TYPE_OUTPUT:
-            BNCValidator.validate_spec_output(spec_num, io_specifications)
+            BNCValidator.validate_spec_output(spec_num, io_specifications,
+                                              expander_state)
         else:
             raise AssertionError(
                 "spec type {} is invalid".format(spec[BIC.SPEC_TYPE]))
 
     @staticmethod
-    def validate_spec_input(spec_num, io_specifications):
+    def validate_spec_input(spec_num, io_specifications, expander_state):
         """
         Validates that the input at the index 'spec_num'
         in the io_specifications is valid for the BNC Card test suite.
@@ -59,13 +139,16 @@ class BNCValidator:
             be validated.
         :param io_specifications: the list of input, output, and I2C
             specifications that will be executed on the BBB
+        :param expander_state: The IOExpanderState before the specification
+            at index 'spec_num' is run
         :return: None, if the specification is valid, otherwise raises an
             AssertionError
         """
         spec = io_specifications[spec_num]
         if spec[BIC.INPUT_TYPE] == BIC.DIGITAL_3V3:
             BNCValidator.validate_spec_input_digital(spec_num,
-                                                     io_specifications)
+                                                     io_specifications,
+                                                     expander_state)
         elif spec[BIC.INPUT_TYPE] == BIC.ANALOG_1V8:
             BNCValidator.validate_spec_input_analog(spec_num,
                                                     io_specifications)
@@ -74,7 +157,8 @@ class BNCValidator:
                 "{}-type input not supported".format(spec[BIC.INPUT_TYPE]))
 
     @staticmethod
-    def validate_spec_input_digital(spec_num, io_specifications):
+    def validate_spec_input_digital(spec_num, io_specifications,
+                                    expander_state):
         """
         Validates that the digital input at the index 'spec_num'
         in the io_specifications is valid for the BNC Card test suite.
@@ -83,6 +167,8 @@ class BNCValidator:
             be validated.
         :param io_specifications: the list of input, output, and I2C
             specifications that will be executed on the BBB
+        :param expander_state: The IOExpanderState before the specification
+            at index 'spec_num' is run
         :return: None, if the specification is valid, otherwise raises an
             AssertionError
         """
@@ -102,7 +188,7 @@ class BNCValidator:
             else:
                 nin_out_bit_location = BNC_CONFIG.I2C_BNC7_USER2_NIN_OUT
             if not BNCValidator.is_user_io_in_output_mode(
-                    spec_num, io_specifications, nin_out_bit_location):
+                    expander_state, nin_out_bit_location):
                 raise AssertionError(
                     "{} is set as input but the corresponding user IO on the "
                     "BNC card has been set to input mode, causing undefined "
@@ -118,7 +204,7 @@ class BNCValidator:
             else:
                 nin_out_bit_location = BNC_CONFIG.I2C_BNC7_USER2_NIN_OUT
             if BNCValidator.is_user_io_in_output_mode(
-                    spec_num, io_specifications, nin_out_bit_location):
+                    expander_state, nin_out_bit_location):
                 raise AssertionError(
                     "{} is set as input but the corresponding user IO on the "
                     "BNC card has been set to output mode, causing undefined "
@@ -143,7 +229,7 @@ class BNCValidator:
                                  " the BNC tests".format(pin_number))
 
     @staticmethod
-    def validate_spec_output(spec_num, io_specifications):
+    def validate_spec_output(spec_num, io_specifications, expander_state):
         """
         Validates that the output specification at the index 'spec_num'
         in the io_specifications is valid for the BNC Card test suite.
@@ -152,21 +238,26 @@ class BNCValidator:
             be validated.
         :param io_specifications: the list of input and output
             specifications that will be executed on the BBB
+        :param expander_state: The IOExpanderState before the specification
+            at index 'spec_num' is run
         :return: None, if the specification is valid, otherwise raises an
             AssertionError
         """
         spec = io_specifications[spec_num]
         if spec[BIC.OUTPUT_TYPE] == BIC.DIGITAL_3V3:
             BNCValidator.validate_spec_output_digital(spec_num,
-                                                      io_specifications)
+                                                      io_specifications,
+                                                      expander_state)
         elif spec[BIC.OUTPUT_TYPE] == BIC.I2C:
-            BNCValidator.validate_spec_output_i2c(spec_num, io_specifications)
+            BNCValidator.validate_spec_output_i2c(spec_num, io_specifications,
+                                                  expander_state)
         else:
             raise AssertionError(
                 "{}-type output not supported".format(spec[BIC.OUTPUT_TYPE]))
 
     @staticmethod
-    def validate_spec_output_digital(spec_num, io_specifications):
+    def validate_spec_output_digital(spec_num, io_specifications,
+                                     expander_state):
         """
         Validates that the digital output specification at the index 'spec_num'
         in the io_specifications is valid for the BNC Card test suite.
@@ -175,6 +266,8 @@ class BNCValidator:
             be validated.
         :param io_specifications: the list of input and output
             specifications that will be executed on the BBB
+        :param expander_state: The IOExpanderState before the specification
+            at index 'spec_num' is run
         :return: None, if the specification is valid, otherwise raises an
             AssertionError
         """
@@ -193,7 +286,7 @@ class BNCValidator:
             else:
                 nin_out_bit_location = BNC_CONFIG.I2C_BNC7_USER2_NIN_OUT
             if BNCValidator.is_user_io_in_output_mode(
-                    spec_num, io_specifications, nin_out_bit_location):
+                    expander_state, nin_out_bit_location):
                 raise AssertionError(
                     "{} is set as output but the corresponding user IO on the "
                     "BNC card has been set to output mode, possibly causing "
@@ -209,124 +302,45 @@ class BNCValidator:
             else:
                 nin_out_bit_location = BNC_CONFIG.I2C_BNC7_USER2_NIN_OUT
             if not BNCValidator.is_user_io_in_output_mode(
-                    spec_num, io_specifications, nin_out_bit_location):
+                    expander_state, nin_out_bit_location):
                 raise AssertionError(
                     "{} is set as output but the corresponding user IO on the "
                     "BNC card has been set to input mode, possibly causing "
                     "contention".format(pin_number))
 
     @staticmethod
-    def is_user_io_in_output_mode(spec_num, io_specifications,
-                                  nin_out_bit_location):
+    def is_user_io_in_output_mode(expander_state, nin_out_bit_location):
         """
         Determines whether a User IO configured by the IO Expander is in
         input mode or output mode.
         Specifically checks whether the User IO configured by the 8 bit
         hex str 'nin_out_bit_location' (with exactly 1 bit high) has been
-        configured as an output prior to the execution of the 'spec_num'
-        IO specification (zero indexed).
+        configured as an output in the 'expander_state'.
 
         For a User IO to be in output mode, there must be two prior I2C
         specifications: one that sets the IO Expander pin to be an output
         and one that drives a value of 1 on the pin.
 
-        :param spec_num: The index before which the state of the User IO
-            is to be checked
-        :param io_specifications: the list of input and output
-            specifications that will be executed on the BBB
+        :param expander_state: The IOExpanderState in which the state of
+            the User IO is to be checked
         :param nin_out_bit_location: an 8 bit hex str representing the
             IO Expander bit that controls whether the User IO is in
             input mode or output mode
         :return: If the nin_out_bit_location does not control a User IO
             pin mode, then throws an AssertionError. Returns True if is
-            the User IO will be in output mode before the io_specification
-            at index spec_num is run. Otherwise returns False.
+            the User IO is in output mode in the 'expander_state'.
+            Otherwise returns False.
         """
         if nin_out_bit_location not in [BNC_CONFIG.I2C_BNC8_USER1_NIN_OUT,
                                         BNC_CONFIG.I2C_BNC7_USER2_NIN_OUT]:
             raise AssertionError("Invalid nin_out_bit_location")
         # check that the configuration register has been set so that
         # pin is in output mode
-        if not BNCValidator.is_i2c_in_output_mode(
-                spec_num, io_specifications, nin_out_bit_location):
+        if not expander_state.is_in_output_mode(nin_out_bit_location):
             return False
         # check that the output register has been set so that the
         # IO Expander drives a 1 on the pin
-        return BNCValidator.get_i2c_spec_bit_value(
-                spec_num, io_specifications, nin_out_bit_location) == 1
-
-    @staticmethod
-    def is_i2c_in_output_mode(spec_num, io_specifications, bit_location):
-        """
-        Determines whether an IO Expander pin will be set as an input
-        or output prior to the index 'spec_num' IO specification being
-        executed
-
-        :param spec_num: The index before which the state of the IO Expander
-            pin is to be checked
-        :param io_specifications: the list of input and output
-            specifications that will be executed on the BBB
-        :param bit_location: an 8 bit hex str representing the
-            IO Expander pin that will be in input mode or output mode
-        :return: Returns True if is the IO Expander pin at bit_location
-            will be in output mode before the io_specification
-            at index 'spec_num' is run. Otherwise returns False.
-        """
-        bit_int_value = int(bit_location, 16)
-        for prev_spec in io_specifications[spec_num-1::-1]:
-            # find the most recent I2C command that modified the
-            # IO Expander configuration register
-            if BNCValidator.is_io_expander_spec(prev_spec):
-                nin_out_bit_value = (int(prev_spec[BIC.I2C_DATA], 16) &
-                                     bit_int_value)
-                data_addr = prev_spec[BIC.I2C_DATA_ADDRESS]
-                if data_addr == BNC_CONFIG.I2C_IO_EXPANDER_CONFIG_REGISTER:
-                    # this is the most recent I2C command that modified the
-                    # IO Expander configuration register
-                    if nin_out_bit_value == 0:
-                        # 0 bit means output
-                        return True
-                    else:
-                        # 1 bit means input
-                        return False
-        # by default, is in input mode
-        return False
-
-    @staticmethod
-    def get_i2c_spec_bit_value(spec_num, io_specifications, bit_location):
-        """
-        Determines the value of the bit at the given 'bit_location'
-        in the output register
-
-        Note that this only checks the configured value and does not check
-        whether the pin is configured as an output. Use the
-        'is_i2c_in_output_mode' method for that
-
-        :param spec_num: The index before which the value of the IO Expander
-            output register is to be checked
-        :param io_specifications: the list of input and output
-            specifications that will be executed on the BBB
-        :param bit_location: an 8 bit hex str representing the
-            IO Expander bit whose value is going to be retrieved
-        :return: Returns 1 if is the IO Expander output register has a
-            1 value at the bit_location according to the specification.
-            Otherwise returns 0
-        """
-        bit_int_value = int(bit_location, 16)
-        for prev_spec in io_specifications[spec_num - 1::-1]:
-            # find the most recent I2C command that modified the
-            # IO Expander output register
-            if BNCValidator.is_io_expander_spec(prev_spec):
-                data_addr = prev_spec[BIC.I2C_DATA_ADDRESS]
-                if data_addr == BNC_CONFIG.I2C_IO_EXPANDER_OUTPUT_REGISTER:
-                    # this is the most recent I2C command that modified the
-                    # IO Expander output register
-                    if (int(prev_spec[BIC.I2C_DATA], 16) & bit_int_value) != 0:
-                        return 1
-                    return 0
-        # no value specified. Default (according to IO Expander datasheet)
-        # is 1
-        return 1
+        return expander_state.get_bit_value(nin_out_bit_location) == 1
 
     @staticmethod
     def is_io_expander_spec(spec):
@@ -350,7 +364,7 @@ class BNCValidator:
         return True
 
     @staticmethod
-    def validate_spec_output_i2c(spec_num, io_specifications):
+    def validate_spec_output_i2c(spec_num, io_specifications, expander_state):
         """
         Validates that the I2C specification at the index 'spec_num'
         in the io_specifications is valid for the BNC Card test suite.
@@ -359,6 +373,8 @@ class BNCValidator:
             be validated.
         :param io_specifications: the list of input and output
             specifications that will be executed on the BBB
+        :param expander_state: The IOExpanderState before the specification
+            at index 'spec_num' is run
         :return: None, if the specification is valid, otherwise raises an
             AssertionError
         """
@@ -384,7 +400,8 @@ class BNCValidator:
         )
         if is_setting_io_expander_config_register:
             BNCValidator.validate_i2c_io_expander_config(spec_num,
-                                                         io_specifications)
+                                                         io_specifications,
+                                                         expander_state)
         is_setting_io_expander_output_register = (
             BNCValidator.is_io_expander_spec(spec) and
             data_address == BNC_CONFIG.I2C_IO_EXPANDER_OUTPUT_REGISTER
@@ -392,10 +409,12 @@ class BNCValidator:
 
         if is_setting_io_expander_output_register:
             BNCValidator.validate_i2c_io_expander_output(spec_num,
-                                                         io_specifications)
+                                                         io_specifications,
+                                                         expander_state)
 
     @staticmethod
-    def validate_i2c_io_expander_config(spec_num, io_specifications):
+    def validate_i2c_io_expander_config(spec_num, io_specifications,
+                                        expander_state):
         """
         Verifies that when there is a change to the config register in the
         IO specification, there is also a corresponding output register
@@ -407,6 +426,8 @@ class BNCValidator:
         :param spec_num: Index of the specification to be checked
         :param io_specifications: the list of input and output
             specifications that will be executed on the BBB
+        :param expander_state: The IOExpanderState before the specification
+            at index 'spec_num' is run
         :return: True, if the specification is valid, otherwise raises an
             AssertionError
         """
@@ -417,18 +438,15 @@ class BNCValidator:
             return True
         # otherwise this is setting at least one output
         # check that a previous step set the output I2C values
-        for prev_spec in io_specifications[0:spec_num]:
-            if not BNCValidator.on_same_i2c_device(prev_spec, spec):
-                continue
-            prev_data_addr = prev_spec[BIC.I2C_DATA_ADDRESS]
-            if prev_data_addr == BNC_CONFIG.I2C_IO_EXPANDER_OUTPUT_REGISTER:
-                # previously set output values, good to go
-                return True
+        if expander_state.output_register_set:
+            # previously set output values, good to go
+            return True
         raise AssertionError("Never set output values for IO Expander "
                              "but tried to set a pin as output")
 
     @staticmethod
-    def validate_i2c_io_expander_output(spec_num, io_specifications):
+    def validate_i2c_io_expander_output(spec_num, io_specifications,
+                                        expander_state):
         """
         Verifies that when there is a change to the output register in the
         IO specification, there is also a corresponding config register
@@ -439,21 +457,14 @@ class BNCValidator:
         :param spec_num: Index of the specification to be checked
         :param io_specifications: the list of input and output
             specifications that will be executed on the BBB
+        :param expander_state: The IOExpanderState before the specification
+            at index 'spec_num' is run
         :return: True, if the specification is valid, otherwise raises an
             AssertionError
         """
-        current_spec = io_specifications[spec_num]
-        other_io_specifications = (
-            io_specifications[:spec_num] + io_specifications[spec_num+1:])
-        for other_spec in other_io_specifications:
-            if not BNCValidator.on_same_i2c_device(other_spec, current_spec):
-                continue
-            prev_data_addr = other_spec[BIC.I2C_DATA_ADDRESS]
-            if prev_data_addr == BNC_CONFIG.I2C_IO_EXPANDER_CONFIG_REGISTER:
-                # other_spec is for config register
-                if int(other_spec[BIC.I2C_DATA], 16) != 255:
-                    # Setting at least one pin as output
-                    return True
+        if expander_state.sets_output_in_config_register():
+            # Setting at least one pin as output
+            return True
 
         raise AssertionError("Never set config values for IO Expander "
                              "but tried to set a pin as output")
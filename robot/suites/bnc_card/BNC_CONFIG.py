@@ -131,6 +131,37 @@ OE_LD = "P8_26"
 # output low to shift from 5V to 3.3V
 DIR_L3 = "P9_23"
 
+# The outputs that enable or set the direction of the level shifters and line
+# drivers for all signals. Checks that set these outputs to the same values,
+# and otherwise use different pins, are electrically independent and can be
+# fused into a single request (see bbbio/bbb_io_fusion.py)
+FUSION_SHARED_OUTPUT_PINS = [OE_LS, OE_LD, DIR_L3]
+
+# The [BBB output, BBB input] pins of the signal paths from a BNC connector to
+# the pin header
+BNC_TO_PIN_HEADER_PATHS = [
+    [B_REF_IN_TO_EUT_L3V3, P_REF_IN_TO_BBB],
+    [B_SYNC_IN_TO_EUT_L3V3, P_SYNC_IN_TO_BBB],
+]
+USER_IO_BNC_TO_PIN_HEADER_PATHS = [
+    [B_USER1_BI_DIR_L3V3, P_USER1_IN_TO_BBB],
+    [B_USER2_BI_DIR_L3V3, P_USER2_IN_TO_BBB],
+]
+
+# The [BBB output, BBB input] pins of the signal paths from the pin header to
+# a BNC connector
+PIN_HEADER_TO_BNC_PATHS = [
+    [P_REF_OUT_TO_LD, B_REF_OUT_TO_BBB_L3V3],
+    [P_TDC_OUT_TO_LD, B_TDC_OUT_TO_BBB_L3V3],
+    [P_VETO_OUT_TO_LD, B_VETO_OUT_TO_BBB_L3V3],
+    [P_SYNC_OUT_TO_LD, B_SYNC_OUT_TO_BBB_L3V3],
+]
+
+# The number of samples read from an analog input for each check. The checks
+# are made on the mean of the samples, so that a single noisy reading does not
+# fail the check
+ANALOG_SAMPLE_COUNT = 8
+
 TERMINATION_RESISTOR_ENABLED_ANALOG_MAXIMUM = 0.076
 TERMINATION_RESISTOR_DISABLED_ANALOG_MINIMUM = 0.623
 TERMINATION_RESISTOR_DISABLED_ANALOG_MAXIMUM = 0.723
@@ -0,0 +1,288 @@
+"""
+A model of the BNC card and its signal conditioning board for the BBB
+simulator (see bbbio/bbb_simulator.py), so that the BNC card suite can be run
+without a BeagleBone or a BNC card.
+
+Run this file to start a simulated BBB with a BNC card attached, e.g.:
+
+    python bnc_card_simulator.py --port 8000 --latency-ms 5 --jitter-ms 2
+
+then run the suite with the ACE_BBB_SIMULATOR environment variable set (and
+ACE_BBB_IP_ADDRESS/ACE_BBB_PORT if the simulator is not on the default port).
+
+The model only covers the behaviour checked by the suite:
+- BNC inputs are passed through to the pin header while the level shifters
+  are enabled (User IOs also need level shifter 3 to shift from 3.3V to 5V
+  and the User IO to be in input mode)
+- Pin header inputs are negated on the BNC outputs while the line drivers
+  and level shifters are enabled (User IOs also need to be in output mode)
+- VETO_OUT passes the pin header input through in open drain mode (due to
+  its pull up resistor) and negates it in driven mode
+- The termination resistor analog inputs read as enabled or disabled
+  depending on the IO expander, while the BNC connector is driven high
+- The current and voltage sensing analog inputs read a nominal value
+"""
+import argparse
+import random
+
+from ace_bbsm import BBB_IO_CONSTANTS
+
+import BNC_CONFIG
+from bbb_simulator import BBBDeviceModel, BBBSimulatorError, \
+    BBBSimulatorServer, DEFAULT_HOST, DEFAULT_PORT
+
+LOW = BBB_IO_CONSTANTS.DIGITAL_LOW
+HIGH = BBB_IO_CONSTANTS.DIGITAL_HIGH
+
+# PCA9534 IO expander registers and their power-up values
+IO_EXPANDER_OUTPUT_REGISTER = int(BNC_CONFIG.I2C_IO_EXPANDER_OUTPUT_REGISTER, 16)
+IO_EXPANDER_POLARITY_INVERSION_REGISTER = 0x02
+IO_EXPANDER_CONFIG_REGISTER = int(BNC_CONFIG.I2C_IO_EXPANDER_CONFIG_REGISTER, 16)
+IO_EXPANDER_DEFAULT_REGISTERS = {
+    IO_EXPANDER_OUTPUT_REGISTER: 0xFF,
+    IO_EXPANDER_POLARITY_INVERSION_REGISTER: 0x00,
+    IO_EXPANDER_CONFIG_REGISTER: 0xFF
+}
+
+# BBB output driving a BNC input -> BBB input on the pin header
+BNC_INPUTS = {
+    BNC_CONFIG.B_REF_IN_TO_EUT_L3V3: BNC_CONFIG.P_REF_IN_TO_BBB,
+    BNC_CONFIG.B_SYNC_IN_TO_EUT_L3V3: BNC_CONFIG.P_SYNC_IN_TO_BBB
+}
+
+# BBB input on a BNC output -> BBB output driving the pin header
+BNC_OUTPUTS = {
+    BNC_CONFIG.B_REF_OUT_TO_BBB_L3V3: BNC_CONFIG.P_REF_OUT_TO_LD,
+    BNC_CONFIG.B_TDC_OUT_TO_BBB_L3V3: BNC_CONFIG.P_TDC_OUT_TO_LD,
+    BNC_CONFIG.B_SYNC_OUT_TO_BBB_L3V3: BNC_CONFIG.P_SYNC_OUT_TO_LD
+}
+
+
+class UserIO:
+    def __init__(self, bnc_pin, pin_header_output_pin, pin_header_input_pin,
+                 nin_out_bit):
+        """
+        :param bnc_pin: The bidirectional BBB pin on the BNC connector
+        :param pin_header_output_pin: The BBB output driving the pin header
+        :param pin_header_input_pin: The BBB input on the pin header
+        :param nin_out_bit: The IO expander bit that sets the User IO to
+            output mode
+        """
+        self.bnc_pin = bnc_pin
+        self.pin_header_output_pin = pin_header_output_pin
+        self.pin_header_input_pin = pin_header_input_pin
+        self.nin_out_bit = nin_out_bit
+
+
+USER_IOS = [
+    UserIO(BNC_CONFIG.B_USER1_BI_DIR_L3V3, BNC_CONFIG.P_USER1_OUT_TO_LD,
+           BNC_CONFIG.P_USER1_IN_TO_BBB,
+           int(BNC_CONFIG.I2C_BNC8_USER1_NIN_OUT, 16)),
+    UserIO(BNC_CONFIG.B_USER2_BI_DIR_L3V3, BNC_CONFIG.P_USER2_OUT_TO_LD,
+           BNC_CONFIG.P_USER2_IN_TO_BBB,
+           int(BNC_CONFIG.I2C_BNC7_USER2_NIN_OUT, 16))
+]
+
+# termination resistor analog input -> (BBB output driving the BNC
+# connector, IO expander bit that enables the termination resistor)
+TERMINATION_RESISTORS = {
+    BNC_CONFIG.TR_REF_IN_TO_AIN: (BNC_CONFIG.B_REF_IN_TO_EUT_L3V3,
+                                  int(BNC_CONFIG.I2C_BNC1_500HM_EN, 16)),
+    BNC_CONFIG.TR_SYNC_IN_TO_AIN: (BNC_CONFIG.B_SYNC_IN_TO_EUT_L3V3,
+                                   int(BNC_CONFIG.I2C_BNC6_500HM_EN, 16)),
+    BNC_CONFIG.TR_USER1_TO_AIN: (BNC_CONFIG.B_USER1_BI_DIR_L3V3,
+                                 int(BNC_CONFIG.I2C_BNC8_500_HM_EN, 16)),
+    BNC_CONFIG.TR_USER2_TO_AIN: (BNC_CONFIG.B_USER2_BI_DIR_L3V3,
+                                 int(BNC_CONFIG.I2C_BNC7_500_HM_EN, 16))
+}
+TERMINATION_RESISTOR_ENABLED_ANALOG_VALUE = 0.030
+TERMINATION_RESISTOR_DISABLED_ANALOG_VALUE = 0.673
+
+# analog input -> nominal value, in the middle of the range accepted by the
+# suite
+SENSE_ANALOG_VALUES = {
+    BNC_CONFIG.ADC_3V3_C_SENSE_TO_AIN:
+        (BNC_CONFIG.ADC_3V3_C_SENSE_ANALOG_MINIMUM +
+         BNC_CONFIG.ADC_3V3_C_SENSE_ANALOG_MAXIMUM) / 2,
+    BNC_CONFIG.ADC_5V_C_SENSE_TO_AIN:
+        (BNC_CONFIG.ADC_5V_C_SENSE_ANALOG_MINIMUM +
+         BNC_CONFIG.ADC_5V_C_SENSE_ANALOG_MAXIMUM) / 2,
+    BNC_CONFIG.VDD_5V_TO_AIN:
+        (BNC_CONFIG.VDD_5V_ANALOG_MINIMUM +
+         BNC_CONFIG.VDD_5V_ANALOG_MAXIMUM) / 2
+}
+
+
+def negate(value):
+    return HIGH if value == LOW else LOW
+
+
+class BNCCardModel(BBBDeviceModel):
+    def __init__(self, analog_noise=0.0, seed=None):
+        """
+        :param analog_noise: The maximum random deviation added to every
+            analog input value
+        :param seed: Optional seed of the analog noise
+        """
+        super().__init__()
+        self.analog_noise = analog_noise
+        self.__random = random.Random(seed)
+        # unlike the BBB IOs, the IO expander keeps its registers between
+        # requests
+        self.io_expander_registers = dict(IO_EXPANDER_DEFAULT_REGISTERS)
+        self.i2cbus = int(BNC_CONFIG.I2C_IO_EXPANDER_I2CBUS)
+        self.io_expander_chip_address = int(
+            BNC_CONFIG.I2C_IO_EXPANDER_CHIP_ADDRESS, 16)
+
+    def write_i2c(self, i2cbus, chip_address, data_address, data):
+        if i2cbus != self.i2cbus or \
+                chip_address != self.io_expander_chip_address:
+            super().write_i2c(i2cbus, chip_address, data_address, data)
+        if data_address not in self.io_expander_registers:
+            raise BBBSimulatorError(
+                "IO expander register {:#04x} is not writable".format(
+                    data_address))
+        self.io_expander_registers[data_address] = data & 0xFF
+
+    def is_io_expander_output_high(self, bit):
+        """
+        :return: True if the IO expander IO 'bit' is an output and is high
+        """
+        return not (self.io_expander_registers[IO_EXPANDER_CONFIG_REGISTER] &
+                    bit) and \
+            bool(self.io_expander_registers[IO_EXPANDER_OUTPUT_REGISTER] & bit)
+
+    def is_driven_low(self, pin_number):
+        return self.get_driven_value(pin_number) == LOW
+
+    def are_level_shifters_enabled(self):
+        return self.is_driven_low(BNC_CONFIG.OE_LS)
+
+    def are_line_drivers_enabled(self):
+        return self.is_driven_low(BNC_CONFIG.OE_LD)
+
+    def is_level_shifter_3_to_5v(self):
+        return self.get_driven_value(BNC_CONFIG.DIR_L3) == HIGH
+
+    def get_pin_header_output(self, pin_number):
+        """
+        :return: The value driven onto the pin header through the line
+            drivers by the BBB output 'pin_number', or None
+        """
+        if not self.are_line_drivers_enabled():
+            return None
+        return self.get_driven_value(pin_number)
+
+    def get_bnc_input(self, pin_number):
+        """
+        :return: The value driven onto a BNC connector through the level
+            shifters by the BBB output 'pin_number', or None
+        """
+        if not self.are_level_shifters_enabled():
+            return None
+        return self.get_driven_value(pin_number)
+
+    def read_digital_input(self, pin_number):
+        value = self.__get_digital_value(pin_number)
+        return LOW if value is None else value
+
+    def __get_digital_value(self, pin_number):
+        if not self.are_level_shifters_enabled():
+            return None
+        for bnc_pin, pin_header_pin in BNC_INPUTS.items():
+            if pin_number == pin_header_pin:
+                return self.get_bnc_input(bnc_pin)
+        if pin_number in BNC_OUTPUTS:
+            pin_header_value = self.get_pin_header_output(
+                BNC_OUTPUTS[pin_number])
+            return None if pin_header_value is None \
+                else negate(pin_header_value)
+        if pin_number == BNC_CONFIG.B_VETO_OUT_TO_BBB_L3V3:
+            return self.__get_veto_out()
+        for user_io in USER_IOS:
+            output_mode = self.is_io_expander_output_high(user_io.nin_out_bit)
+            if pin_number == user_io.pin_header_input_pin and \
+                    not output_mode and self.is_level_shifter_3_to_5v():
+                return self.get_bnc_input(user_io.bnc_pin)
+            if pin_number == user_io.bnc_pin and output_mode and \
+                    not self.is_level_shifter_3_to_5v():
+                pin_header_value = self.get_pin_header_output(
+                    user_io.pin_header_output_pin)
+                return None if pin_header_value is None \
+                    else negate(pin_header_value)
+        return None
+
+    def __get_veto_out(self):
+        pin_header_value = self.get_pin_header_output(
+            BNC_CONFIG.P_VETO_OUT_TO_LD)
+        if pin_header_value is None:
+            return None
+        if self.is_io_expander_output_high(
+                int(BNC_CONFIG.I2C_BNC4_VETO_OUT_OC, 16)):
+            # driven mode
+            return negate(pin_header_value)
+        # open drain mode: the NMOS is off for a high input, so the output
+        # is pulled up
+        return pin_header_value
+
+    def read_analog_input(self, pin_number):
+        return round(max(0.0, self.__get_analog_value(pin_number) +
+                         self.__random.uniform(-self.analog_noise,
+                                               self.analog_noise)), 4)
+
+    def __get_analog_value(self, pin_number):
+        if pin_number in SENSE_ANALOG_VALUES:
+            return SENSE_ANALOG_VALUES[pin_number]
+        if pin_number in TERMINATION_RESISTORS:
+            bnc_pin, enable_bit = TERMINATION_RESISTORS[pin_number]
+            is_user_io = bnc_pin in [user_io.bnc_pin for user_io in USER_IOS]
+            if self.get_bnc_input(bnc_pin) != HIGH or \
+                    (is_user_io and not self.is_level_shifter_3_to_5v()):
+                return 0.0
+            if self.is_io_expander_output_high(enable_bit):
+                return TERMINATION_RESISTOR_ENABLED_ANALOG_VALUE
+            return TERMINATION_RESISTOR_DISABLED_ANALOG_VALUE
+        return 0.0
+
+
+def start_bnc_card_simulator(host=DEFAULT_HOST, port=0, latency=0.0,
+                             jitter=0.0, analog_noise=0.0, seed=None):
+    """
+    Starts a simulated BBB with a BNC card attached in a background thread
+
+    :return: The started BBBSimulatorServer. See 'BBBSimulatorServer.port'
+        for the port that it listens on
+    """
+    server = BBBSimulatorServer(BNCCardModel(analog_noise, seed), host, port,
+                                latency, jitter, seed)
+    server.start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Simulates a BBB with a BNC card attached")
+    parser.add_argument("--host", default=DEFAULT_HOST,
+                        help="The address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help="The port to listen on (0 for any free port)")
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="The mean delay of each response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0,
+                        help="The maximum random deviation from the latency")
+    parser.add_argument("--analog-noise", type=float, default=0.0,
+                        help="The maximum random deviation added to every "
+                             "analog input value")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed of the random delays and noise")
+    args = parser.parse_args()
+
+    simulator = BBBSimulatorServer(
+        BNCCardModel(args.analog_noise, args.seed), args.host, args.port,
+        args.latency_ms / 1000, args.jitter_ms / 1000, args.seed)
+    print("Simulating a BBB with a BNC card at {}:{}".format(
+        simulator.host, simulator.port), flush=True)
+    try:
+        simulator.serve_forever()
+    except KeyboardInterrupt:
+        simulator.close()